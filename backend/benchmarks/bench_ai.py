@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+AI path benchmark: p50/p95/p99 latency of /api/advice and /api/deals/batch
+under parallel load, without calling Gemini.
+
+The script boots a uvicorn worker with a local LLM stand-in (see
+``utils/llm_backends.py``), seeds users with fixed expenses and planned
+purchases, then requests advice and batched deals for each of them. Later
+rounds show the effect of the caches. Seeded data is identical on every run,
+so replies recorded once against Gemini replay deterministically:
+
+    python benchmarks/bench_ai.py --latency lognormal:0.8:0.4 --failure-rate 0.05
+    GEMINI_API_KEY=... python benchmarks/bench_ai.py --backend record --fixtures fixtures.jsonl --users 5
+    python benchmarks/bench_ai.py --backend replay --fixtures fixtures.jsonl --users 5
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench_concurrency import BACKEND_DIR, percentile, wait_for_server
+
+ITEMS = ["AirPods Pro 2", "Desk Lamp", "Yoga Mat", "Rice Cooker", "Kindle Paperwhite", "Backpack", "Monitor 27 inch"]
+CATEGORIES = ["food", "transport", "entertainment", "shopping", "utilities"]
+
+
+async def seed_user(client, index):
+    """One user with deterministic expenses and planned purchases."""
+    user = (await client.post("/api/user", json={
+        "stipend": 1500.0 + index, "savings_goal": 250.0, "budget_cycle_start": "2025-01-01",
+    })).json()
+    expenses = [
+        {"user_id": user["id"], "amount": float(5 + (index * 7 + n * 13) % 140), "category": CATEGORIES[n % len(CATEGORIES)],
+         "description": f"bench {n}", "date": f"2025-01-{1 + n % 28:02d}"}
+        for n in range(30)
+    ]
+    (await client.post("/api/expenses/bulk", json={"items": expenses})).raise_for_status()
+    for n in range(3):
+        (await client.post("/api/planned-purchases", json={
+            "user_id": user["id"], "item_name": ITEMS[(index + n) % len(ITEMS)], "expected_price": 40.0 + 10 * n,
+            "priority": ("high", "medium", "low")[n], "desired_date": "2025-03-01",
+        })).raise_for_status()
+    return user["id"]
+
+
+async def run_round(client, user_ids, concurrency):
+    latencies = {"advice": [], "deals_batch": []}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(kind, url):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    tasks = []
+    for user_id in user_ids:
+        tasks.append(timed("advice", f"/api/advice/{user_id}"))
+        tasks.append(timed("deals_batch", f"/api/deals/batch/{user_id}"))
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    return latencies, time.perf_counter() - started
+
+
+async def main(args):
+    workdir = tempfile.mkdtemp(prefix="budgetly-bench-ai-")
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "bench"),
+        CACHE_BACKEND="memory",
+        DEAL_PREFETCH_ENABLED="false",  # keep the measured requests cold
+        LLM_BACKEND=args.backend,
+        LLM_STUB_LATENCY=args.latency,
+        LLM_STUB_FAILURE_RATE=str(args.failure_rate),
+        LLM_STUB_SEED=str(args.seed),
+        LLM_FIXTURES_PATH=os.path.abspath(args.fixtures),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=args.app_dir,
+        env=env,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=120) as client:
+            await wait_for_server(client)
+            user_ids = [await seed_user(client, i) for i in range(args.users)]
+
+            print(f"backend:      {args.backend}" + (f" (latency {args.latency}, failure rate {args.failure_rate})" if args.backend == "stub" else ""))
+            print(f"users:        {args.users} @ concurrency {args.concurrency}")
+            for round_no in range(1, args.rounds + 1):
+                latencies, elapsed = await run_round(client, user_ids, args.concurrency)
+                print(f"round {round_no}:      {2 * len(user_ids) / elapsed:.1f} req/s")
+                for kind, samples in latencies.items():
+                    print(
+                        f"  {kind:<12} p50={percentile(samples, 50):8.1f}ms  "
+                        f"p95={percentile(samples, 95):8.1f}ms  p99={percentile(samples, 99):8.1f}ms"
+                    )
+            llm = (await client.get("/api/metrics")).json()["llm"]
+            print(f"llm backend:  {llm['backend']}")
+            print(f"breaker:      {llm['breaker']['state']} (failures {llm['breaker']['failures']}, rejected {llm['breaker']['rejected']})")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-dir", default=BACKEND_DIR, help="backend directory containing main.py")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--backend", choices=["stub", "record", "replay"], default="stub")
+    parser.add_argument("--latency", default="lognormal:0.8:0.4", help="stub latency: fixed:S, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fixtures", default="llm_fixtures.jsonl", help="record/replay fixture file")
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=16)
+    asyncio.run(main(parser.parse_args()))
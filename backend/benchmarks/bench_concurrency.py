@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark: p50/p95/p99 latency of /health and heavy DB endpoints
+under parallel load.
+
+The script boots a uvicorn worker against a throwaway SQLite database, seeds
+one user with many expenses, then fires concurrent requests at the dashboard
+while probing /health. Point ``--app-dir`` at another checkout to compare
+before/after numbers:
+
+    python benchmarks/bench_concurrency.py
+    python benchmarks/bench_concurrency.py --app-dir /path/to/old/backend
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed_expenses(db_path, user_id, count):
+    """Insert ``count`` expenses straight into SQLite (much faster than the API)."""
+    rng = random.Random(7)
+    categories = ["food", "transport", "entertainment", "shopping", "utilities"]
+    rows = [
+        (user_id, round(rng.uniform(1, 150), 2), rng.choice(categories), "bench",
+         (date.today() - timedelta(days=rng.randint(0, 700))).isoformat())
+        for _ in range(count)
+    ]
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO expenses (user_id, amount, category, description, expense_date, created_at) "
+        "VALUES (?, ?, ?, ?, ?, datetime('now'))",
+        rows,
+    )
+    # Newer schemas keep per-day rollups next to the raw rows; backfill them too
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'expense_rollups'").fetchone():
+        conn.execute("DELETE FROM expense_rollups WHERE user_id = ?", (user_id,))
+        conn.execute(
+            "INSERT INTO expense_rollups "
+            "(user_id, day, category, expense_count, total_amount, min_amount, max_amount) "
+            "SELECT user_id, expense_date, category, COUNT(id), SUM(amount), MIN(amount), MAX(amount) "
+            "FROM expenses WHERE user_id = ? GROUP BY user_id, expense_date, category",
+            (user_id,),
+        )
+    conn.commit()
+    conn.close()
+
+
+async def wait_for_server(client):
+    for _ in range(100):
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def run_load(client, user_id, total_requests, concurrency):
+    latencies = {"dashboard": [], "health": []}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(kind, url):
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies[kind].append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+
+    tasks = []
+    for i in range(total_requests):
+        # Every fourth request is a health probe that should never wait on the DB
+        if i % 4 == 0:
+            tasks.append(timed("health", "/health"))
+        else:
+            tasks.append(timed("dashboard", f"/api/dashboard/{user_id}"))
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    return latencies, time.perf_counter() - started
+
+
+async def main(args):
+    workdir = tempfile.mkdtemp(prefix="budgetly-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "bench"))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=args.app_dir,
+        env=env,
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{args.port}", timeout=120) as client:
+            await wait_for_server(client)
+            user = (await client.post("/api/user", json={
+                "stipend": 2000.0, "savings_goal": 300.0, "budget_cycle_start": date.today().isoformat()
+            })).json()
+            seed_expenses(db_path, user["id"], args.expenses)
+
+            latencies, elapsed = await run_load(client, user["id"], args.requests, args.concurrency)
+
+        print(f"app dir:      {args.app_dir}")
+        print(f"expenses:     {args.expenses}")
+        print(f"requests:     {args.requests} @ concurrency {args.concurrency}")
+        print(f"throughput:   {args.requests / elapsed:.1f} req/s")
+        for kind, samples in latencies.items():
+            print(
+                f"{kind:<10}    p50={percentile(samples, 50):8.1f}ms  "
+                f"p95={percentile(samples, 95):8.1f}ms  p99={percentile(samples, 99):8.1f}ms"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-dir", default=BACKEND_DIR, help="backend directory containing main.py")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--expenses", type=int, default=5000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: how long a fresh interpreter takes to import the app.
+
+Each run imports ``main`` in a new Python process (so nothing is cached in
+``sys.modules``) against a throwaway SQLite database and reports the median
+and best wall time, plus whether the Gemini SDK was imported as a side
+effect. Point ``--app-dir`` at another checkout to compare before/after:
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --app-dir /path/to/old/backend --runs 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "sdk_loaded": any(name.startswith("google.generativeai") for name in sys.modules),
+}))
+"""
+
+SDK_PROBE = """
+import json, time
+start = time.perf_counter()
+import google.generativeai
+print(json.dumps({"seconds": time.perf_counter() - start}))
+"""
+
+
+def run_probe(code, app_dir, env):
+    output = subprocess.run(
+        [sys.executable, "-c", code], cwd=app_dir, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarise(label, samples):
+    print(f"{label:<28} median {statistics.median(samples) * 1000:8.1f} ms   best {min(samples) * 1000:8.1f} ms")
+
+
+def main(args):
+    workdir = tempfile.mkdtemp(prefix="budgetly-startup-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    if args.without_key:
+        env.pop("GEMINI_API_KEY", None)
+    else:
+        env.setdefault("GEMINI_API_KEY", "bench")
+
+    # First import creates the database; keep it out of the samples
+    run_probe(PROBE, args.app_dir, env)
+
+    results = [run_probe(PROBE, args.app_dir, env) for _ in range(args.runs)]
+    summarise("import main", [r["seconds"] for r in results])
+    print(f"{'Gemini SDK imported at boot':<28} {any(r['sdk_loaded'] for r in results)}")
+
+    sdk = [run_probe(SDK_PROBE, args.app_dir, env)["seconds"] for _ in range(args.runs)]
+    summarise("import google.generativeai", sdk)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-dir", default=BACKEND_DIR, help="backend directory containing main.py")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--without-key", action="store_true", help="unset GEMINI_API_KEY to check boot without it")
+    main(parser.parse_args())
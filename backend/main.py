@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -7,7 +8,8 @@ import os
 
 from models import Base, engine
 from routes import users, expenses, summary
-from routes import planned_purchases, advice, deals
+from routes import planned_purchases, advice, deals, metrics
+from utils.advice_jobs import advice_jobs
 
 # Load environment variables (first look for .env in project root)
 load_dotenv(find_dotenv())
@@ -15,11 +17,19 @@ load_dotenv(find_dotenv())
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the advice job workers for the lifetime of the app"""
+    await advice_jobs.start()
+    yield
+    await advice_jobs.stop()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="NYUAD Smart Budgeting Assistant",
     description="A personal budgeting assistant for NYUAD students",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -38,6 +48,7 @@ app.include_router(summary.router, prefix="/api", tags=["summary"])
 app.include_router(planned_purchases.router, prefix="/api", tags=["planned_purchases"])
 app.include_router(advice.router, prefix="/api", tags=["advice"])
 app.include_router(deals.router, prefix="/api", tags=["deals"])
+app.include_router(metrics.router, prefix="/api", tags=["metrics"])
 
 @app.get("/")
 async def root():
@@ -0,0 +1,66 @@
+"""Initial schema: users, expenses, planned_purchases
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-07-01
+
+Databases created earlier by ``Base.metadata.create_all`` already have these
+tables, so each one is only created when missing.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("stipend", sa.Float(), nullable=False),
+            sa.Column("savings_goal", sa.Float(), nullable=False),
+            sa.Column("budget_cycle_start", sa.Date(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+
+    if "expenses" not in existing:
+        op.create_table(
+            "expenses",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("amount", sa.Float(), nullable=False),
+            sa.Column("category", sa.String(50), nullable=False),
+            sa.Column("description", sa.Text()),
+            sa.Column("expense_date", sa.Date(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+        )
+        op.create_index("ix_expenses_id", "expenses", ["id"])
+
+    if "planned_purchases" not in existing:
+        op.create_table(
+            "planned_purchases",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("item_name", sa.String(100), nullable=False),
+            sa.Column("expected_price", sa.Float(), nullable=False),
+            sa.Column("priority", sa.String(10), nullable=False),
+            sa.Column("desired_date", sa.Date(), nullable=False),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("updated_at", sa.DateTime()),
+        )
+        op.create_index("ix_planned_purchases_id", "planned_purchases", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_table("planned_purchases")
+    op.drop_table("expenses")
+    op.drop_table("users")
@@ -0,0 +1,30 @@
+"""Composite indexes for per-user expense and planned purchase queries
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-07-01
+"""
+
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_expenses_user_date_created",
+        "expenses",
+        ["user_id", "expense_date", "created_at"],
+        if_not_exists=True,
+    )
+    op.create_index("ix_expenses_user_category", "expenses", ["user_id", "category"], if_not_exists=True)
+    op.create_index("ix_planned_purchases_user_id", "planned_purchases", ["user_id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_planned_purchases_user_id", table_name="planned_purchases")
+    op.drop_index("ix_expenses_user_category", table_name="expenses")
+    op.drop_index("ix_expenses_user_date_created", table_name="expenses")
@@ -0,0 +1,41 @@
+"""Per-user daily/category expense rollups
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-07-01
+
+Creates expense_rollups and backfills it from the existing expenses.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if "expense_rollups" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "expense_rollups",
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("category", sa.String(50), primary_key=True),
+            sa.Column("expense_count", sa.Integer(), nullable=False),
+            sa.Column("total_amount", sa.Float(), nullable=False),
+            sa.Column("min_amount", sa.Float(), nullable=False),
+            sa.Column("max_amount", sa.Float(), nullable=False),
+        )
+    op.execute("DELETE FROM expense_rollups")
+    op.execute(
+        "INSERT INTO expense_rollups "
+        "(user_id, day, category, expense_count, total_amount, min_amount, max_amount) "
+        "SELECT user_id, expense_date, category, COUNT(id), SUM(amount), MIN(amount), MAX(amount) "
+        "FROM expenses GROUP BY user_id, expense_date, category"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("expense_rollups")
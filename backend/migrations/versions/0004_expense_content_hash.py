@@ -0,0 +1,33 @@
+"""Content hash on expenses for idempotent bulk imports
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-07-01
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("expenses")}
+    if "content_hash" not in columns:
+        op.add_column("expenses", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.create_index(
+        "ix_expenses_user_content_hash",
+        "expenses",
+        ["user_id", "content_hash"],
+        unique=True,
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_expenses_user_content_hash", table_name="expenses")
+    with op.batch_alter_table("expenses") as batch:
+        batch.drop_column("content_hash")
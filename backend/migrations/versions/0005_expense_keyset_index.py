@@ -0,0 +1,26 @@
+"""Index backing keyset pagination on (expense_date, id)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2025-07-01
+"""
+
+from alembic import op
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_expenses_user_date_id",
+        "expenses",
+        ["user_id", "expense_date", "id"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_expenses_user_date_id", table_name="expenses")
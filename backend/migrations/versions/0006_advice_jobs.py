@@ -0,0 +1,53 @@
+"""Persistent queue of asynchronous advice jobs
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2025-07-01
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text("status IN ('queued', 'running')")
+
+
+def upgrade() -> None:
+    if "advice_jobs" not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table(
+            "advice_jobs",
+            sa.Column("id", sa.String(32), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("status", sa.String(10), nullable=False),
+            sa.Column("priority", sa.Integer(), nullable=False),
+            sa.Column("result", sa.Text(), nullable=True),
+            sa.Column("error", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("started_at", sa.DateTime(), nullable=True),
+            sa.Column("finished_at", sa.DateTime(), nullable=True),
+        )
+    op.create_index(
+        "ix_advice_jobs_user_active",
+        "advice_jobs",
+        ["user_id"],
+        unique=True,
+        sqlite_where=ACTIVE,
+        postgresql_where=ACTIVE,
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_advice_jobs_status_priority",
+        "advice_jobs",
+        ["status", "priority", "created_at"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_advice_jobs_status_priority", table_name="advice_jobs")
+    op.drop_index("ix_advice_jobs_user_active", table_name="advice_jobs")
+    op.drop_table("advice_jobs")
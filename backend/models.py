@@ -1,15 +1,31 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Text, Index, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from datetime import datetime
 import os
 
+def _async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching async driver."""
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql:") or url.startswith("postgres:"):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
 # Database configuration
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./budgetly.db")
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the request path so DB I/O never blocks the event loop.
+# The sync engine above is kept for table creation, scripts, tests and the
+# CPU-heavy rollup reads that run on worker threads (utils.rollups).
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", _async_database_url(DATABASE_URL))
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 class User(Base):
@@ -42,13 +58,43 @@ class Expense(Base):
     description = Column(Text, nullable=True, comment="Expense description")
     expense_date = Column(Date, nullable=False, comment="Date of expense")
     created_at = Column(DateTime, default=datetime.utcnow)
+    content_hash = Column(String(64), nullable=True, comment="Dedupe hash for bulk imports")
     
     # Relationship with user
     user = relationship("User", back_populates="expenses")
     
+    # Every hot query filters on user_id; recent expenses sort by date then
+    # created_at, paginated listings by date then id (keyset cursor).
+    # Keep in sync with migrations/versions.
+    __table_args__ = (
+        Index("ix_expenses_user_date_created", "user_id", "expense_date", "created_at"),
+        Index("ix_expenses_user_date_id", "user_id", "expense_date", "id"),
+        Index("ix_expenses_user_category", "user_id", "category"),
+        Index("ix_expenses_user_content_hash", "user_id", "content_hash", unique=True),
+    )
+    
     def __repr__(self):
         return f"<Expense(id={self.id}, amount={self.amount}, category={self.category})>"
 
+# ---------------------------------------------------------------------------
+# ExpenseRollup model
+# ---------------------------------------------------------------------------
+
+class ExpenseRollup(Base):
+    """Per-user daily/category totals, maintained in the same transaction as expense writes."""
+    __tablename__ = "expense_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True, comment="Expense date")
+    category = Column(String(50), primary_key=True, comment="Expense category")
+    expense_count = Column(Integer, nullable=False, comment="Number of expenses in the bucket")
+    total_amount = Column(Float, nullable=False, comment="Sum of expense amounts in the bucket")
+    min_amount = Column(Float, nullable=False, comment="Smallest expense in the bucket")
+    max_amount = Column(Float, nullable=False, comment="Largest expense in the bucket")
+
+    def __repr__(self):
+        return f"<ExpenseRollup(user_id={self.user_id}, day={self.day}, category={self.category}, total={self.total_amount})>"
+
 # ---------------------------------------------------------------------------
 # PlannedPurchase model
 # ---------------------------------------------------------------------------
@@ -69,14 +115,47 @@ class PlannedPurchase(Base):
     # Relationship with user
     user = relationship("User", back_populates="planned_purchases")
 
+    __table_args__ = (
+        Index("ix_planned_purchases_user_id", "user_id"),
+    )
+
     def __repr__(self):
         return f"<PlannedPurchase(id={self.id}, item_name={self.item_name}, expected_price={self.expected_price})>"
 
+# ---------------------------------------------------------------------------
+# AdviceJob model
+# ---------------------------------------------------------------------------
+
+class AdviceJob(Base):
+    """Queued or finished AI advice request, processed by utils.advice_jobs."""
+    __tablename__ = "advice_jobs"
+
+    id = Column(String(32), primary_key=True, comment="Opaque job id (uuid4 hex)")
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String(10), nullable=False, comment="queued / running / succeeded / failed")
+    priority = Column(Integer, nullable=False, default=1, comment="0 = high, 1 = normal, 2 = low")
+    result = Column(Text, nullable=True, comment="Advice JSON once succeeded")
+    error = Column(Text, nullable=True, comment="Failure detail")
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    # At most one active job per user (dedupe across workers); recovery scans
+    # by status. Keep in sync with migrations/versions.
+    __table_args__ = (
+        Index(
+            "ix_advice_jobs_user_active", "user_id", unique=True,
+            sqlite_where=text("status IN ('queued', 'running')"),
+            postgresql_where=text("status IN ('queued', 'running')"),
+        ),
+        Index("ix_advice_jobs_status_priority", "status", "priority", "created_at"),
+    )
+
+    def __repr__(self):
+        return f"<AdviceJob(id={self.id}, user_id={self.user_id}, status={self.status})>"
+
 # Database dependency
-def get_db():
-    """Database session dependency"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close() 
\ No newline at end of file
+async def get_db():
+    """Async database session dependency"""
+    async with AsyncSessionLocal() as db:
+        yield db 
\ No newline at end of file
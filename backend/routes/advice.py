@@ -1,22 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from models import get_db, User, Expense, PlannedPurchase
-from utils.ai_advisor import generate_advice
+from models import get_db, User
+from schemas import AdviceJobStatus
+from utils.advice_jobs import ACTIVE_STATUSES, QueueFullError, advice_jobs, job_record
+from utils.ai_advisor import generate_advice, load_advice_inputs, stream_advice
+from utils.sse import SSE_HEADERS, SSE_MEDIA_TYPE, encode_events
 
 router = APIRouter()
 
+# Longest a single poll may block waiting for a job to finish
+MAX_JOB_WAIT_SECONDS = 30
+
+
+@router.post("/advice/{user_id}/jobs", response_model=AdviceJobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def submit_advice_job(
+    user_id: int,
+    response: Response,
+    priority: str = Query("normal", pattern="^(high|normal|low)$"),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Queue advice generation and return the job at once; poll its Location for
+    the result. A user's queued or running job is returned instead of a new
+    one, and advice cached for the current data finishes the job immediately (200).
+    """
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    try:
+        job, _ = await advice_jobs.submit(db, user, priority)
+    except QueueFullError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "5"})
+
+    if job.status not in ACTIVE_STATUSES:
+        response.status_code = status.HTTP_200_OK
+    response.headers["Location"] = f"/api/advice/jobs/{job.id}"
+    return job_record(job)
+
+
+@router.get("/advice/jobs/{job_id}", response_model=AdviceJobStatus)
+async def get_advice_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=MAX_JOB_WAIT_SECONDS, description="Seconds to long-poll for completion"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Status of an advice job and, once it has succeeded, the advice."""
+    job = await advice_jobs.wait(db, job_id, wait)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Advice job not found")
+    return job_record(job)
+
 
 @router.get("/advice/{user_id}")
-async def get_ai_advice(user_id: int, db: Session = Depends(get_db)):
-    """Return AI-generated budgeting advice for the user, including cuts and planned purchase verdicts."""
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_ai_advice(user_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Return AI-generated budgeting advice for the user, including cuts and planned purchase verdicts.
+    Blocks for the whole LLM call; prefer POST /advice/{user_id}/jobs.
+    """
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    expenses = db.query(Expense).filter(Expense.user_id == user_id).all()
-    planned = db.query(PlannedPurchase).filter(PlannedPurchase.user_id == user_id).all()
+    expenses, planned = await load_advice_inputs(db, user_id)
+
+    advice = await generate_advice(user, expenses, planned)
+
+    return advice
+
+
+@router.get("/advice/{user_id}/stream")
+async def stream_ai_advice(user_id: int, db: AsyncSession = Depends(get_db)):
+    """Stream advice as Server-Sent Events: heuristic verdicts first, then each AI item as it is generated."""
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    advice = generate_advice(user, expenses, planned)
+    expenses, planned = await load_advice_inputs(db, user_id)
 
-    return advice 
\ No newline at end of file
+    return StreamingResponse(
+        encode_events(stream_advice(user, expenses, planned)),
+        media_type=SSE_MEDIA_TYPE,
+        headers=SSE_HEADERS,
+    )
@@ -1,21 +1,78 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any
 
-from models import get_db, PlannedPurchase
-from utils.deal_finder import find_deals
-from schemas import DealSuggestion
+from models import get_db, PlannedPurchase, User
+from utils.deal_finder import find_deals, find_deals_batch, stream_deals_batch
+from utils.prefetch import deal_prefetcher
+from schemas import DealSuggestion, PurchaseDeals
+from utils.sse import SSE_HEADERS, SSE_MEDIA_TYPE, encode_events
 
 router = APIRouter()
 
+@router.get("/deals/batch/{user_id}", response_model=List[PurchaseDeals])
+async def get_deals_batch(user_id: int, db: AsyncSession = Depends(get_db)):
+    """Deals for every planned purchase of a user, fetched with one batched LLM call"""
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    purchases = (await db.scalars(
+        select(PlannedPurchase).where(PlannedPurchase.user_id == user_id).order_by(PlannedPurchase.id)
+    )).all()
+    for p in purchases:
+        deal_prefetcher.record_view(p.item_name)
+    deals_by_item = await find_deals_batch([p.item_name for p in purchases])
+
+    return [
+        {
+            "purchase_id": p.id,
+            "item_name": p.item_name,
+            "deals": _with_specificity_hint(p.item_name, deals_by_item[p.item_name]),
+        }
+        for p in purchases
+    ]
+
+@router.get("/deals/batch/{user_id}/stream")
+async def stream_deals_for_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    """Stream deals for every planned purchase as Server-Sent Events, one `deals` event per purchase as it is ready"""
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+
+    purchases = (await db.scalars(
+        select(PlannedPurchase).where(PlannedPurchase.user_id == user_id).order_by(PlannedPurchase.id)
+    )).all()
+    by_item: Dict[str, List[PlannedPurchase]] = {}
+    for p in purchases:
+        deal_prefetcher.record_view(p.item_name)
+        by_item.setdefault(p.item_name, []).append(p)
+
+    async def events():
+        async for item_name, deals in stream_deals_batch(list(by_item)):
+            for p in by_item[item_name]:
+                yield "deals", {
+                    "purchase_id": p.id,
+                    "item_name": p.item_name,
+                    "deals": _with_specificity_hint(p.item_name, deals),
+                }
+        yield "done", {"purchases": len(purchases)}
+
+    return StreamingResponse(encode_events(events()), media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+
 @router.get("/deals/{purchase_id}", response_model=List[DealSuggestion])
-async def get_deals(purchase_id: int, db: Session = Depends(get_db)):
-    purchase = db.query(PlannedPurchase).filter(PlannedPurchase.id == purchase_id).first()
+async def get_deals(purchase_id: int, db: AsyncSession = Depends(get_db)):
+    purchase = await db.get(PlannedPurchase, purchase_id)
     if not purchase:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Planned purchase not found")
 
-    deals = find_deals(purchase.item_name)
-    
+    deal_prefetcher.record_view(purchase.item_name)
+    deals = await find_deals(purchase.item_name)
+    return _with_specificity_hint(purchase.item_name, deals)
+
+def _with_specificity_hint(item_name: str, deals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     # Check if all deals have vague pricing (indicating the item might be too general)
     vague_price_count = sum(1 for deal in deals if isinstance(deal.get('price'), str) and 'varies' in deal.get('price', '').lower())
     
@@ -24,7 +81,7 @@ async def get_deals(purchase_id: int, db: Session = Depends(get_db)):
         # Add a helpful suggestion as the first deal
         suggestion_deal = {
             "merchant": "💡 Suggestion",
-            "item_name": f"Be more specific about '{purchase.item_name}'",
+            "item_name": f"Be more specific about '{item_name}'",
             "price": "Try adding brand, model, size, or other details to get better price estimates",
             "url": "https://www.google.com/search?q=how+to+write+specific+product+descriptions"
         }
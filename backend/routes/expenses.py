@@ -1,20 +1,49 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Form, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import date
+import time
 
 from models import get_db, User, Expense
-from schemas import ExpenseCreate, Expense as ExpenseSchema
+from schemas import ExpenseCreate, Expense as ExpenseSchema, ExpenseBulkCreate, ExpenseBulkResult, ExpenseImportResult
+from utils.rollups import record_expense_added, refresh_rollup_buckets
+from utils.ingest import ExpenseIngestor, validate_items
+from utils.statement_import import detect_format, iter_csv_expenses, iter_ofx_expenses
+from utils.pagination import NEXT_CURSOR_HEADER, next_cursor, paginate_expenses
+from utils.exports import NDJSON_MEDIA_TYPE, listing_record, stream_expenses_ndjson
 
 router = APIRouter()
 
+async def _fetch_page(db: AsyncSession, query, response: Response, limit: int, offset: int, cursor: Optional[str], format: str = "json"):
+    """Run a keyset-paginated listing and expose the next cursor as a header.
+
+    With ``format=ndjson`` the page is streamed instead and the next cursor
+    is carried in the trailing summary record.
+    """
+    try:
+        query = paginate_expenses(query, limit, cursor=cursor, offset=offset)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if format.lower() == "ndjson":
+        return StreamingResponse(
+            stream_expenses_ndjson(query, record=listing_record, page_limit=limit),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+    expenses = (await db.scalars(query)).all()
+    cursor = next_cursor(expenses, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return expenses
+
 @router.post("/", response_model=ExpenseSchema, status_code=status.HTTP_201_CREATED)
-async def create_expense(expense_data: ExpenseCreate, db: Session = Depends(get_db)):
+async def create_expense(expense_data: ExpenseCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new expense record
     """
     # Verify user exists
-    user = db.query(User).filter(User.id == expense_data.user_id).first()
+    user = await db.get(User, expense_data.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -31,25 +60,29 @@ async def create_expense(expense_data: ExpenseCreate, db: Session = Depends(get_
     )
     
     db.add(expense)
-    db.commit()
-    db.refresh(expense)
+    await record_expense_added(db, expense)
+    await db.commit()
+    await db.refresh(expense)
     
     return expense
 
 @router.get("/", response_model=List[ExpenseSchema])
 async def get_expenses(
+    response: Response,
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
     category: Optional[str] = Query(None, description="Filter by category"),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     limit: int = Query(100, le=1000, description="Maximum number of expenses to return"),
     offset: int = Query(0, ge=0, description="Number of expenses to skip"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    format: str = Query("json", description="json, or ndjson to stream one expense per line"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get expenses with optional filtering
     """
-    query = db.query(Expense)
+    query = select(Expense)
     
     # Apply filters
     if user_id is not None:
@@ -70,17 +103,15 @@ async def get_expenses(
         except Exception:
             pass
     
-    # Apply pagination
-    expenses = query.order_by(Expense.expense_date.desc()).offset(offset).limit(limit).all()
-    
-    return expenses
+    # Apply keyset pagination (offset is still honoured for older clients)
+    return await _fetch_page(db, query, response, limit, offset, cursor, format)
 
 @router.get("/id/{expense_id}", response_model=ExpenseSchema)
-async def get_expense(expense_id: int, db: Session = Depends(get_db)):
+async def get_expense(expense_id: int, db: AsyncSession = Depends(get_db)):
     """
     Get a specific expense by ID
     """
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = await db.get(Expense, expense_id)
     if not expense:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -93,12 +124,12 @@ async def get_expense(expense_id: int, db: Session = Depends(get_db)):
 async def update_expense(
     expense_id: int,
     expense_data: ExpenseCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update an existing expense
     """
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = await db.get(Expense, expense_id)
     if not expense:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -106,13 +137,15 @@ async def update_expense(
         )
     
     # Verify user exists
-    user = db.query(User).filter(User.id == expense_data.user_id).first()
+    user = await db.get(User, expense_data.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
+    old_bucket = (expense.user_id, expense.expense_date, expense.category)
+    
     # Update expense fields
     expense.user_id = expense_data.user_id
     expense.amount = expense_data.amount
@@ -120,25 +153,29 @@ async def update_expense(
     expense.description = expense_data.description
     expense.expense_date = expense_data.expense_date
     
-    db.commit()
-    db.refresh(expense)
+    await db.flush()
+    await refresh_rollup_buckets(db, [old_bucket, (expense.user_id, expense.expense_date, expense.category)])
+    await db.commit()
+    await db.refresh(expense)
     
     return expense
 
 @router.delete("/id/{expense_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_expense(expense_id: int, db: Session = Depends(get_db)):
+async def delete_expense(expense_id: int, db: AsyncSession = Depends(get_db)):
     """
     Delete an expense
     """
-    expense = db.query(Expense).filter(Expense.id == expense_id).first()
+    expense = await db.get(Expense, expense_id)
     if not expense:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Expense not found"
         )
     
-    db.delete(expense)
-    db.commit()
+    await db.delete(expense)
+    await db.flush()
+    await refresh_rollup_buckets(db, [(expense.user_id, expense.expense_date, expense.category)])
+    await db.commit()
     
     return None
 
@@ -146,26 +183,25 @@ async def delete_expense(expense_id: int, db: Session = Depends(get_db)):
 async def get_recent_expenses(
     user_id: int,
     limit: int = Query(5, le=50, description="Number of recent expenses to return"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get recent expenses for a specific user
     """
     # Verify user exists
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    expenses = (
-        db.query(Expense)
-        .filter(Expense.user_id == user_id)
+    expenses = (await db.scalars(
+        select(Expense)
+        .where(Expense.user_id == user_id)
         .order_by(Expense.expense_date.desc(), Expense.created_at.desc())
         .limit(limit)
-        .all()
-    )
+    )).all()
     
     return expenses
 
@@ -173,34 +209,33 @@ async def get_recent_expenses(
 async def get_expenses_by_category(
     user_id: int,
     category: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get all expenses for a specific user and category
     """
     # Verify user exists
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    expenses = (
-        db.query(Expense)
-        .filter(Expense.user_id == user_id, Expense.category.ilike(f"%{category}%"))
+    expenses = (await db.scalars(
+        select(Expense)
+        .where(Expense.user_id == user_id, Expense.category.ilike(f"%{category}%"))
         .order_by(Expense.expense_date.desc())
-        .all()
-    )
+    )).all()
     
     return expenses
 
 @router.post("/expenses", response_model=ExpenseSchema, status_code=status.HTTP_201_CREATED)
-async def create_expense_explicit(expense_data: ExpenseCreate, db: Session = Depends(get_db)):
+async def create_expense_explicit(expense_data: ExpenseCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new expense record (explicit /expenses path)
     """
-    user = db.query(User).filter(User.id == expense_data.user_id).first()
+    user = await db.get(User, expense_data.user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -214,24 +249,113 @@ async def create_expense_explicit(expense_data: ExpenseCreate, db: Session = Dep
         expense_date=expense_data.expense_date
     )
     db.add(expense)
-    db.commit()
-    db.refresh(expense)
+    await record_expense_added(db, expense)
+    await db.commit()
+    await db.refresh(expense)
     return expense
 
+@router.post("/expenses/bulk", response_model=ExpenseBulkResult)
+async def create_expenses_bulk(payload: ExpenseBulkCreate, db: AsyncSession = Depends(get_db)):
+    """
+    Create many expenses in one request.
+
+    Items are validated individually; invalid items and unknown users are
+    reported per index without aborting the rest of the batch. With
+    ``dedupe`` set, items already imported earlier are skipped, so re-sending
+    the same batch is idempotent.
+    """
+    ingestor = ExpenseIngestor(db, dedupe=payload.dedupe)
+    result = await ingestor.ingest(validate_items(payload.items))
+    await db.commit()
+    return result
+
+@router.post("/expenses/import", response_model=ExpenseImportResult)
+async def import_bank_statement(
+    file: UploadFile = File(..., description="CSV or OFX bank export"),
+    user_id: int = Form(...),
+    format: Optional[str] = Form(None, pattern="^(csv|ofx)$", description="Detected from the file when omitted"),
+    date_column: Optional[str] = Form(None),
+    amount_column: Optional[str] = Form(None),
+    description_column: Optional[str] = Form(None),
+    category_column: Optional[str] = Form(None),
+    date_format: Optional[str] = Form(None, description="strptime format, e.g. %d/%m/%Y"),
+    default_category: str = Form("other", min_length=1, max_length=50),
+    negative_is_expense: bool = Form(True, description="Debits are negative in the export"),
+    dedupe: bool = Form(True, description="Skip transactions imported before"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Import a bank statement export row by row.
+
+    The file is parsed as a stream and inserted in chunks, so memory use does
+    not grow with the file size. Rejected rows are reported by row number.
+    """
+    user = await db.get(User, user_id)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    stream = file.file
+    file_format = format or detect_format(file.filename, stream.read(1024))
+    stream.seek(0)
+    
+    stats = {"skipped": 0}
+    if file_format == "ofx":
+        rows = iter_ofx_expenses(
+            stream, user_id, default_category=default_category,
+            negative_is_expense=negative_is_expense, stats=stats
+        )
+    else:
+        mapping = {
+            "date": date_column,
+            "amount": amount_column,
+            "description": description_column,
+            "category": category_column,
+        }
+        rows = iter_csv_expenses(
+            stream, user_id, mapping=mapping, date_format=date_format, default_category=default_category,
+            negative_is_expense=negative_is_expense, stats=stats
+        )
+    
+    started = time.perf_counter()
+    ingestor = ExpenseIngestor(db, dedupe=dedupe, max_errors=100)
+    try:
+        result = await ingestor.ingest(rows)
+    except ValueError as e:
+        # Raised for unusable headers / column mappings
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    await db.commit()
+    elapsed = time.perf_counter() - started
+    
+    rows_read = result["received"] + stats["skipped"]
+    return {
+        **result,
+        "format": file_format,
+        "skipped": stats["skipped"],
+        "elapsed_seconds": round(elapsed, 3),
+        "rows_per_second": round(rows_read / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
 @router.get("/expenses", response_model=List[ExpenseSchema])
 async def get_expenses_explicit(
+    response: Response,
     user_id: Optional[int] = Query(None, description="Filter by user ID"),
     category: Optional[str] = Query(None, description="Filter by category"),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     limit: int = Query(100, le=1000, description="Maximum number of expenses to return"),
     offset: int = Query(0, ge=0, description="Number of expenses to skip"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    format: str = Query("json", description="json, or ndjson to stream one expense per line"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Get expenses with optional filtering (explicit /expenses path)
     """
-    query = db.query(Expense)
+    query = select(Expense)
     if user_id is not None:
         query = query.filter(Expense.user_id == user_id)
     if category:
@@ -246,14 +370,13 @@ async def get_expenses_explicit(
             query = query.filter(Expense.expense_date <= end_date)
         except Exception:
             pass
-    expenses = query.order_by(Expense.expense_date.desc()).offset(offset).limit(limit).all()
-    return expenses
+    return await _fetch_page(db, query, response, limit, offset, cursor, format)
 
 @router.get("/expenses/categories", response_model=List[str])
-async def get_expense_categories(db: Session = Depends(get_db)):
+async def get_expense_categories(db: AsyncSession = Depends(get_db)):
     """Return a deduplicated list of existing expense categories. If none exist yet, return common defaults."""
-    categories = db.query(Expense.category).distinct().all()
-    category_list = [c[0] for c in categories]
+    categories = (await db.scalars(select(Expense.category).distinct())).all()
+    category_list = list(categories)
     defaults = ["food", "transport", "entertainment", "shopping", "utilities", "health", "education"]
     for d in defaults:
         if d not in category_list:
@@ -264,15 +387,18 @@ async def get_expense_categories(db: Session = Depends(get_db)):
 @router.get("/expenses/{user_id}", response_model=List[ExpenseSchema])
 async def get_user_expenses_legacy(
     user_id: int,
+    response: Response,
     category: Optional[str] = Query(None),
     start_date: Optional[str] = Query(None),
     end_date: Optional[str] = Query(None),
     limit: int = Query(100, le=1000),
     offset: int = Query(0, ge=0),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description=f"Opaque cursor from the {NEXT_CURSOR_HEADER} header of the previous page"),
+    format: str = Query("json", description="json, or ndjson to stream one expense per line"),
+    db: AsyncSession = Depends(get_db)
 ):
     """Return expenses for a specific user (legacy path used by frontend)."""
-    query = db.query(Expense).filter(Expense.user_id == user_id)
+    query = select(Expense).where(Expense.user_id == user_id)
     if category:
         query = query.filter(Expense.category.ilike(f"%{category}%"))
     if start_date:
@@ -285,5 +411,4 @@ async def get_user_expenses_legacy(
             query = query.filter(Expense.expense_date <= end_date)
         except Exception:
             pass
-    expenses = query.order_by(Expense.expense_date.desc()).offset(offset).limit(limit).all()
-    return expenses 
\ No newline at end of file
+    return await _fetch_page(db, query, response, limit, offset, cursor, format) 
\ No newline at end of file
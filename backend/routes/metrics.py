@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+
+from utils.advice_jobs import advice_jobs
+from utils.ai_client import resilience_stats
+from utils.cache import cache_stats
+from utils.singleflight import single_flight_stats
+from utils.item_matching import similarity_index_stats
+from utils.prefetch import deal_prefetcher
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    """
+    Runtime state of in-process components (cache sizes, hit/miss/eviction
+    counters, coalesced AI calls, fuzzy item-match hit rates, deal prefetching,
+    LLM circuit breaker, advice job queue)
+    """
+    return {
+        "caches": cache_stats(),
+        "single_flight": single_flight_stats(),
+        "item_matching": similarity_index_stats(),
+        "deal_prefetch": deal_prefetcher.stats(),
+        "llm": resilience_stats(),
+        "advice_jobs": advice_jobs.stats(),
+    }
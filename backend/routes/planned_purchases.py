@@ -1,18 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 from datetime import date
 
 from models import get_db, User, PlannedPurchase
 from schemas import PlannedPurchaseCreate, PlannedPurchase as PlannedPurchaseSchema
+from utils.prefetch import deal_prefetcher
 
 router = APIRouter()
 
 
 @router.post("/planned-purchases", response_model=PlannedPurchaseSchema, status_code=status.HTTP_201_CREATED)
-async def create_planned_purchase(purchase_data: PlannedPurchaseCreate, db: Session = Depends(get_db)):
+async def create_planned_purchase(
+    purchase_data: PlannedPurchaseCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+):
     """Add a new planned purchase for a user"""
-    user = db.query(User).filter(User.id == purchase_data.user_id).first()
+    user = await db.get(User, purchase_data.user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
@@ -25,24 +31,27 @@ async def create_planned_purchase(purchase_data: PlannedPurchaseCreate, db: Sess
     )
 
     db.add(purchase)
-    db.commit()
-    db.refresh(purchase)
+    await db.commit()
+    await db.refresh(purchase)
+
+    # Warm the deal cache after the response is sent so the first view is a hit
+    background_tasks.add_task(deal_prefetcher.prefetch, purchase.item_name)
     return purchase
 
 
 @router.get("/planned-purchases/{user_id}", response_model=List[PlannedPurchaseSchema])
-async def list_planned_purchases(user_id: int, db: Session = Depends(get_db)):
+async def list_planned_purchases(user_id: int, db: AsyncSession = Depends(get_db)):
     """List all planned purchases for a user"""
-    purchases = db.query(PlannedPurchase).filter(PlannedPurchase.user_id == user_id).all()
+    purchases = (await db.scalars(select(PlannedPurchase).where(PlannedPurchase.user_id == user_id))).all()
     return purchases
 
 
 @router.delete("/planned-purchases/{purchase_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_planned_purchase(purchase_id: int, db: Session = Depends(get_db)):
+async def delete_planned_purchase(purchase_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a planned purchase"""
-    purchase = db.query(PlannedPurchase).filter(PlannedPurchase.id == purchase_id).first()
+    purchase = await db.get(PlannedPurchase, purchase_id)
     if not purchase:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Planned purchase not found")
-    db.delete(purchase)
-    db.commit()
+    await db.delete(purchase)
+    await db.commit()
     return None 
\ No newline at end of file
@@ -1,77 +1,80 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import List, Dict
-import io
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Optional
 from datetime import date, datetime
 
 from models import get_db, User, Expense
 from schemas import BudgetSummary, Recommendation
 from utils.calculations import calculate_budget_summary, get_expense_statistics
+from utils.rollups import load_expense_aggregate
+from utils.exports import (
+    COLUMNAR_FORMATS, COLUMNAR_TABLES, NDJSON_MEDIA_TYPE, import_pyarrow,
+    stream_columnar_export, stream_expenses_csv, stream_expenses_ndjson,
+)
 from utils.recommendations import generate_recommendations, get_spending_insights
 
 router = APIRouter()
 
 @router.get("/summary/{user_id}", response_model=BudgetSummary)
-async def get_budget_summary(user_id: int, db: Session = Depends(get_db)):
+async def get_budget_summary(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Get comprehensive budget summary for a user
     """
     # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    # Get user's expenses
-    expenses = db.query(Expense).filter(Expense.user_id == user_id).all()
-    
-    # Calculate budget summary
-    summary_data = calculate_budget_summary(user, expenses)
+    # Read pre-aggregated rollups rather than every expense row
+    aggregate = await load_expense_aggregate(user_id)
+    summary_data = calculate_budget_summary(user, aggregate)
     
     return BudgetSummary(**summary_data)
 
 @router.get("/recommendations/{user_id}", response_model=List[Recommendation])
-async def get_recommendations(user_id: int, db: Session = Depends(get_db)):
+async def get_recommendations(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Get personalized financial recommendations for a user
     """
     # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    # Get user's expenses
-    expenses = db.query(Expense).filter(Expense.user_id == user_id).all()
+    # Get user's rolled-up expenses
+    aggregate = await load_expense_aggregate(user_id)
     
     # Generate recommendations
-    recommendations = generate_recommendations(user, expenses)
+    recommendations = generate_recommendations(user, aggregate)
     
     return [Recommendation(**rec) for rec in recommendations]
 
 @router.get("/insights/{user_id}")
-async def get_spending_insights_endpoint(user_id: int, db: Session = Depends(get_db)):
+async def get_spending_insights_endpoint(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Get detailed spending insights and analysis
     """
     # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    # Get user's expenses
-    expenses = db.query(Expense).filter(Expense.user_id == user_id).all()
+    # Get user's rolled-up expenses
+    aggregate = await load_expense_aggregate(user_id)
     
     # Get insights
-    insights = get_spending_insights(user, expenses)
+    insights = get_spending_insights(user, aggregate)
     
     return {
         "user_id": user_id,
@@ -86,13 +89,13 @@ async def get_expense_report(
     format: str = "json",
     start_date: date = None,
     end_date: date = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Get expense report for a user in JSON or CSV format
+    Get expense report for a user in JSON, NDJSON or CSV format
     """
     # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -100,46 +103,40 @@ async def get_expense_report(
         )
     
     # Build query
-    query = db.query(Expense).filter(Expense.user_id == user_id)
+    query = select(Expense).where(Expense.user_id == user_id)
     
     # Apply date filters
     if start_date:
-        query = query.filter(Expense.expense_date >= start_date)
+        query = query.where(Expense.expense_date >= start_date)
     if end_date:
-        query = query.filter(Expense.expense_date <= end_date)
-    
-    # Get expenses
-    expenses = query.order_by(Expense.expense_date.desc()).all()
+        query = query.where(Expense.expense_date <= end_date)
     
     if format.lower() == "csv":
-        # Create CSV report without pandas
-        if not expenses:
-            # Return empty CSV
-            csv_content = "Date,Category,Description,Amount\n"
-            return StreamingResponse(
-                io.StringIO(csv_content),
-                media_type="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=expenses_{user_id}.csv"}
-            )
-        
-        # Create CSV content manually
-        csv_lines = ["Date,Category,Description,Amount"]
-        for expense in expenses:
-            description = expense.description or ""
-            # Escape quotes in description
-            description = description.replace('"', '""')
-            csv_lines.append(f'"{expense.expense_date}","{expense.category}","{description}",{expense.amount}')
-        
-        csv_content = "\n".join(csv_lines)
-        
+        # Stream rows straight from the cursor instead of materialising the file
+        csv_query = query.with_only_columns(
+            Expense.expense_date, Expense.category, Expense.description, Expense.amount
+        ).order_by(Expense.expense_date.desc())
         return StreamingResponse(
-            io.StringIO(csv_content),
+            stream_expenses_csv(csv_query),
             media_type="text/csv",
             headers={"Content-Disposition": f"attachment; filename=expenses_{user_id}.csv"}
         )
     
+    if format.lower() == "ndjson":
+        # One expense per line as rows arrive, totals in a trailing record
+        summary = {
+            "user_id": user_id,
+            "period_start": start_date or user.budget_cycle_start,
+            "period_end": end_date or date.today(),
+        }
+        return StreamingResponse(
+            stream_expenses_ndjson(query.order_by(Expense.expense_date.desc()), summary=summary),
+            media_type=NDJSON_MEDIA_TYPE
+        )
+    
     else:
         # Return JSON report
+        expenses = (await db.scalars(query.order_by(Expense.expense_date.desc()))).all()
         total_amount = sum(expense.amount for expense in expenses)
         
         return {
@@ -160,24 +157,73 @@ async def get_expense_report(
             ]
         }
 
+def _columnar_response(table: str, format: str, user_id: Optional[int] = None) -> StreamingResponse:
+    """Validate export options and stream the table as Parquet or Arrow."""
+    if table not in COLUMNAR_TABLES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown table. Choose from: {', '.join(COLUMNAR_TABLES)}"
+        )
+    if format not in COLUMNAR_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown format. Choose from: {', '.join(COLUMNAR_FORMATS)}"
+        )
+    try:
+        import_pyarrow()
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    
+    media_type, extension = COLUMNAR_FORMATS[format]
+    filename = f"{table}_{user_id if user_id is not None else 'all'}.{extension}"
+    return StreamingResponse(
+        stream_columnar_export(table, format, user_id=user_id),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@router.get("/export")
+async def export_all_users(table: str = "expenses", format: str = "parquet"):
+    """
+    Export a table for every user as Parquet or Arrow IPC for analytics
+    """
+    return _columnar_response(table, format)
+
+@router.get("/export/{user_id}")
+async def export_user(
+    user_id: int,
+    table: str = "expenses",
+    format: str = "parquet",
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Export one user's expenses, planned purchases or profile as Parquet or Arrow IPC
+    """
+    if not await db.get(User, user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return _columnar_response(table, format, user_id=user_id)
+
 @router.get("/statistics/{user_id}")
-async def get_expense_statistics_endpoint(user_id: int, db: Session = Depends(get_db)):
+async def get_expense_statistics_endpoint(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Get detailed expense statistics for a user
     """
     # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    # Get user's expenses
-    expenses = db.query(Expense).filter(Expense.user_id == user_id).all()
+    # Get user's rolled-up expenses
+    aggregate = await load_expense_aggregate(user_id)
     
     # Get statistics
-    stats = get_expense_statistics(expenses)
+    stats = get_expense_statistics(aggregate)
     
     return {
         "user_id": user_id,
@@ -185,35 +231,34 @@ async def get_expense_statistics_endpoint(user_id: int, db: Session = Depends(ge
     }
 
 @router.get("/dashboard/{user_id}")
-async def get_dashboard_data(user_id: int, db: Session = Depends(get_db)):
+async def get_dashboard_data(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Get comprehensive dashboard data for a user
     """
     # Get user
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    # Get user's expenses
-    expenses = db.query(Expense).filter(Expense.user_id == user_id).all()
+    # Aggregate once (from rollups) and let every helper read from the same totals
+    aggregate = await load_expense_aggregate(user_id)
     
     # Calculate all data
-    budget_summary = calculate_budget_summary(user, expenses)
-    recommendations = generate_recommendations(user, expenses)
-    insights = get_spending_insights(user, expenses)
-    statistics = get_expense_statistics(expenses)
+    budget_summary = calculate_budget_summary(user, aggregate)
+    recommendations = generate_recommendations(user, aggregate)
+    insights = get_spending_insights(user, aggregate)
+    statistics = get_expense_statistics(aggregate)
     
     # Get recent expenses
-    recent_expenses = (
-        db.query(Expense)
-        .filter(Expense.user_id == user_id)
+    recent_expenses = (await db.scalars(
+        select(Expense)
+        .where(Expense.user_id == user_id)
         .order_by(Expense.expense_date.desc(), Expense.created_at.desc())
         .limit(5)
-        .all()
-    )
+    )).all()
     
     return {
         "user": {
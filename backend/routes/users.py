@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from typing import List
 from datetime import date
 
-from models import get_db, User
+from models import get_db, User, ExpenseRollup, AdviceJob
 from schemas import UserCreate, User as UserSchema
 
 router = APIRouter()
 
 @router.post("/user", response_model=UserSchema, status_code=status.HTTP_201_CREATED)
-async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def create_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Create a new user profile with stipend, savings goal, and budget cycle start date
     """
@@ -22,24 +24,24 @@ async def create_user(user_data: UserCreate, db: Session = Depends(get_db)):
         )
         
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         
         return db_user
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create user: {str(e)}"
         )
 
 @router.get("/user/{user_id}", response_model=UserSchema)
-async def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Get user profile by ID
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if not user:
         raise HTTPException(
@@ -50,23 +52,23 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
     return user
 
 @router.get("/users", response_model=List[UserSchema])
-async def get_all_users(db: Session = Depends(get_db)):
+async def get_all_users(db: AsyncSession = Depends(get_db)):
     """
     Get all users (for development/testing purposes)
     """
-    users = db.query(User).all()
+    users = (await db.scalars(select(User))).all()
     return users
 
 @router.put("/user/{user_id}", response_model=UserSchema)
 async def update_user(
     user_id: int, 
     user_data: UserCreate, 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Update user profile
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if not user:
         raise HTTPException(
@@ -79,24 +81,29 @@ async def update_user(
         user.savings_goal = user_data.savings_goal
         user.budget_cycle_start = user_data.budget_cycle_start
         
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
         
         return user
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update user: {str(e)}"
         )
 
 @router.delete("/user/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_user(user_id: int, db: Session = Depends(get_db)):
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
     """
-    Delete user and all associated expenses
+    Delete user and all associated expenses, rollups and advice jobs
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    # Eager-load the cascaded collections; lazy loads are not allowed under asyncio
+    user = await db.scalar(
+        select(User)
+        .where(User.id == user_id)
+        .options(selectinload(User.expenses), selectinload(User.planned_purchases))
+    )
     
     if not user:
         raise HTTPException(
@@ -105,11 +112,13 @@ async def delete_user(user_id: int, db: Session = Depends(get_db)):
         )
     
     try:
-        db.delete(user)
-        db.commit()
+        await db.execute(delete(ExpenseRollup).where(ExpenseRollup.user_id == user_id))
+        await db.execute(delete(AdviceJob).where(AdviceJob.user_id == user_id))
+        await db.delete(user)
+        await db.commit()
         
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to delete user: {str(e)}"
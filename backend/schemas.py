@@ -42,6 +42,29 @@ class Expense(ExpenseBase):
     class Config:
         from_attributes = True
 
+# Bulk Expense Schemas
+class ExpenseBulkCreate(BaseModel):
+    # Items are validated one by one so a bad row is reported instead of rejecting the batch
+    items: List[dict] = Field(..., min_length=1, max_length=10000, description="Raw ExpenseCreate payloads")
+    dedupe: bool = Field(False, description="Skip items already imported (content-hash match)")
+
+class ExpenseBulkError(BaseModel):
+    index: int
+    error: str
+
+class ExpenseBulkResult(BaseModel):
+    received: int
+    created: int
+    duplicates: int
+    rejected: int
+    errors: List[ExpenseBulkError]
+
+class ExpenseImportResult(ExpenseBulkResult):
+    format: str
+    skipped: int = Field(..., description="Rows that were not expenses (e.g. incoming payments)")
+    elapsed_seconds: float
+    rows_per_second: float
+
 # Summary Schemas
 class BudgetSummary(BaseModel):
     stipend: float
@@ -120,4 +143,25 @@ class DealSuggestion(BaseModel):
     url: str
 
     class Config:
-        from_attributes = True 
\ No newline at end of file
+        from_attributes = True
+
+class PurchaseDeals(BaseModel):
+    purchase_id: int
+    item_name: str
+    deals: List[DealSuggestion]
+
+
+# ---------------------------------------------------------------------------
+# Advice Job Schema
+# ---------------------------------------------------------------------------
+
+class AdviceJobStatus(BaseModel):
+    id: str
+    user_id: int
+    status: str = Field(..., description="queued / running / succeeded / failed")
+    priority: str = Field(..., description="high / normal / low")
+    result: Optional[Dict] = Field(None, description="Advice (cuts, next_purchases) once succeeded")
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -0,0 +1,5 @@
+import os
+
+# Prefetching on planned-purchase creation would call the real LLM from tests
+# that do not mock it; tests exercising it enable it explicitly.
+os.environ.setdefault("DEAL_PREFETCH_ENABLED", "false")
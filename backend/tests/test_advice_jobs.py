@@ -0,0 +1,121 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+
+from main import app
+from models import AdviceJob, AsyncSessionLocal
+from utils import ai_advisor
+from utils.advice_jobs import AdviceJobQueue, advice_jobs
+
+ADVICE_REPLY = '{"cuts": [], "next_purchases": [{"id": 1, "verdict": "postpone", "suggestion": "wait", "score": 30}]}'
+
+
+def fake_chat(calls):
+    async def chat(messages, **kwargs):
+        calls.append(messages)
+        await asyncio.sleep(0.05)
+        return ADVICE_REPLY
+    return chat
+
+
+def create_user(client, stipend=1500.0):
+    return client.post("/api/user", json={"stipend": stipend, "savings_goal": 200.0, "budget_cycle_start": "2025-01-01"}).json()["id"]
+
+
+def test_job_accepted_then_long_polled(monkeypatch):
+    """Submitting answers 202 at once; a long poll returns the advice when the worker finishes"""
+    calls = []
+    monkeypatch.setattr(ai_advisor, "gemini_chat_async", fake_chat(calls))
+
+    with TestClient(app) as client:
+        user_id = create_user(client, stipend=1501.0)
+        response = client.post(f"/api/advice/{user_id}/jobs")
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] in ("queued", "running")
+        assert response.headers["location"] == f"/api/advice/jobs/{job['id']}"
+
+        done = client.get(response.headers["location"], params={"wait": 5}).json()
+        assert done["status"] == "succeeded"
+        assert done["result"]["next_purchases"][0]["verdict"] == "postpone"
+
+        # Unchanged data: the cached advice completes the next job on submission
+        again = client.post(f"/api/advice/{user_id}/jobs")
+        assert again.status_code == 200
+        assert again.json()["result"] == done["result"]
+        assert len(calls) == 1
+
+        assert client.get("/api/advice/jobs/missing").status_code == 404
+        assert client.get("/api/metrics").json()["advice_jobs"]["cache_hits"] >= 1
+
+
+def test_jobs_deduplicated_and_recovered_on_start(monkeypatch):
+    """A user's active job is reused (priority only rises) and jobs queued before start are run"""
+    calls = []
+    monkeypatch.setattr(ai_advisor, "gemini_chat_async", fake_chat(calls))
+
+    # No lifespan: workers are not running, so jobs stay queued in the table
+    client = TestClient(app)
+    user_id = create_user(client, stipend=1502.0)
+    first = client.post(f"/api/advice/{user_id}/jobs", params={"priority": "low"}).json()
+    second = client.post(f"/api/advice/{user_id}/jobs", params={"priority": "high"}).json()
+    assert second["id"] == first["id"]
+    assert second["priority"] == "high"
+    assert client.get(f"/api/advice/jobs/{first['id']}").json()["status"] == "queued"
+
+    with TestClient(app) as running:
+        done = running.get(f"/api/advice/jobs/{first['id']}", params={"wait": 5}).json()
+    assert done["status"] == "succeeded"
+    assert len(calls) == 1
+
+
+def test_idle_workers_requeue_jobs_whose_worker_died(monkeypatch):
+    """A job left running by a crashed worker is picked up again once stale, without a restart"""
+    calls = []
+    monkeypatch.setattr(ai_advisor, "gemini_chat_async", fake_chat(calls))
+    user_id = create_user(TestClient(app), stipend=1505.0)
+
+    async def scenario():
+        job_id = uuid.uuid4().hex
+        async with AsyncSessionLocal() as db:
+            db.add(AdviceJob(id=job_id, user_id=user_id, priority=1, status="running",
+                             created_at=datetime.utcnow(), started_at=datetime.utcnow() - timedelta(seconds=1)))
+            await db.commit()
+
+        queue = AdviceJobQueue(workers=1, stale_seconds=1.5, sweep_seconds=0.1)
+        await queue.start()
+        try:
+            assert queue.recovered == 0  # not stale yet at startup
+            async with AsyncSessionLocal() as db:
+                return await queue.wait(db, job_id, timeout=5), queue.recovered
+        finally:
+            await queue.stop()
+
+    job, recovered = asyncio.run(scenario())
+    assert job.status == "succeeded"
+    assert recovered == 1
+    assert len(calls) == 1
+
+
+def test_full_queue_rejects_with_retry_after(monkeypatch):
+    """Beyond max_pending waiting jobs, submissions get 503 with Retry-After"""
+    monkeypatch.setattr(advice_jobs, "max_pending", 0)
+    client = TestClient(app)
+    user_id = create_user(client, stipend=1503.0)
+
+    response = client.post(f"/api/advice/{user_id}/jobs")
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "5"
+    assert client.post("/api/advice/999999/jobs").status_code == 404
+
+
+def test_deleting_user_removes_their_jobs():
+    """A user with advice jobs can be deleted; the jobs go with them"""
+    client = TestClient(app)
+    user_id = create_user(client, stipend=1504.0)
+    job = client.post(f"/api/advice/{user_id}/jobs").json()
+
+    assert client.delete(f"/api/user/{user_id}").status_code == 204
+    assert client.get(f"/api/advice/jobs/{job['id']}").status_code == 404
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from datetime import date
+
+import pytest
+
+from utils import ai_client, ai_advisor
+
+def test_async_call_respects_concurrency_cap(monkeypatch):
+    """No more than the pool size of Gemini calls run at once"""
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def fake_generate(model, prompt, **kwargs):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+        return prompt
+
+    monkeypatch.setattr(ai_client, "_safe_generate", fake_generate)
+    monkeypatch.setattr(ai_client, "_executor", ThreadPoolExecutor(max_workers=2))
+
+    async def main():
+        return await asyncio.gather(*(ai_client.gemini_generate_async(f"p{i}") for i in range(6)))
+
+    assert asyncio.run(main()) == [f"p{i}" for i in range(6)]
+    assert state["peak"] == 2
+
+def test_async_call_times_out(monkeypatch):
+    """A slow Gemini call raises TimeoutError instead of hanging the caller"""
+    monkeypatch.setattr(ai_client, "_safe_generate", lambda *a, **k: time.sleep(0.5))
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(ai_client.gemini_chat_async([{"role": "user", "content": "hi"}], timeout=0.05))
+
+def test_generate_advice_falls_back_on_timeout(monkeypatch):
+    """generate_advice awaits the async client and uses the heuristic on timeout"""
+    async def slow_chat(*args, **kwargs):
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr(ai_advisor, "gemini_chat_async", slow_chat)
+    user = SimpleNamespace(id=-1, stipend=1000.0, savings_goal=100.0)
+    plan = SimpleNamespace(id=7, item_name="Lamp", expected_price=20.0, priority="high", desired_date=date.today())
+
+    advice = asyncio.run(ai_advisor.generate_advice(user, [], [plan]))
+    assert advice["cuts"] == []
+    assert advice["next_purchases"][0]["verdict"] == "buy_now"
+
+def test_batched_deals_endpoint(monkeypatch):
+    """All uncached items share one prompt; items the model omits are fetched individually"""
+    from fastapi.testclient import TestClient
+    from main import app
+    from utils import deal_finder
+
+    client = TestClient(app)
+    prompts = []
+
+    def deal(name, price):
+        return {"merchant": "Shop", "item_name": name, "price": price, "url": "https://example.com"}
+
+    async def fake_chat(messages, **kwargs):
+        prompts.append(messages[-1]["content"])
+        if messages[0]["content"] == deal_finder.BATCH_SYSTEM_PROMPT:
+            # Answers two of the three items, with different key casing
+            return json.dumps({"desk lamp z1": [deal("Lamp", 20.0)], "Kettle K2": [deal("Kettle", "AED 35")]})
+        return json.dumps([deal("Chair", 150.0)])
+
+    monkeypatch.setattr(deal_finder, "gemini_chat_async", fake_chat)
+    deal_finder._DEAL_CACHE.clear()
+
+    user_id = client.post("/api/user", json={"stipend": 2000.0, "savings_goal": 300.0, "budget_cycle_start": "2025-01-01"}).json()["id"]
+    for name in ("Desk Lamp Z1", "Kettle K2", "Office Chair C3"):
+        client.post("/api/planned-purchases", json={
+            "user_id": user_id, "item_name": name, "expected_price": 10.0,
+            "priority": "medium", "desired_date": "2025-06-01",
+        })
+
+    response = client.get(f"/api/deals/batch/{user_id}")
+    assert response.status_code == 200
+    deals = {item["item_name"]: item["deals"] for item in response.json()}
+    assert deals["Desk Lamp Z1"][0]["price"] == 20.0
+    assert deals["Kettle K2"][0]["price"] == 35.0
+    assert deals["Office Chair C3"][0]["merchant"] == "Shop"
+    assert len(prompts) == 2  # one batched prompt + one individual fallback
+
+    # Everything is now in the per-item cache
+    client.get(f"/api/deals/batch/{user_id}")
+    assert len(prompts) == 2
+    deal_finder._DEAL_CACHE.clear()
+
+def test_planned_purchase_prefetches_deals(monkeypatch):
+    """Creating a planned purchase warms the deal cache so the first view is a hit"""
+    from fastapi.testclient import TestClient
+    from main import app
+    from utils import deal_finder
+    from utils.prefetch import deal_prefetcher
+
+    client = TestClient(app)
+    calls = []
+
+    async def fake_chat(messages, **kwargs):
+        calls.append(messages)
+        return json.dumps([{"merchant": "Shop", "item_name": "Rice Cooker R5", "price": 120.0, "url": "https://example.com"}])
+
+    monkeypatch.setattr(deal_finder, "gemini_chat_async", fake_chat)
+    monkeypatch.setattr(deal_prefetcher, "enabled", True)
+    deal_finder._DEAL_CACHE.clear()
+    before = deal_prefetcher.stats()
+
+    user_id = client.post("/api/user", json={"stipend": 2000.0, "savings_goal": 300.0, "budget_cycle_start": "2025-01-01"}).json()["id"]
+    payload = {"user_id": user_id, "item_name": "Rice Cooker R5", "expected_price": 100.0, "priority": "low", "desired_date": "2025-06-01"}
+    purchase_id = client.post("/api/planned-purchases", json=payload).json()["id"]
+    # Same item again is already cached, so it is not prefetched twice
+    client.post("/api/planned-purchases", json=payload)
+    assert len(calls) == 1
+
+    response = client.get(f"/api/deals/{purchase_id}")
+    assert response.json()[0]["price"] == 120.0
+    assert len(calls) == 1
+
+    after = deal_prefetcher.stats()
+    assert after["completed"] - before["completed"] == 1
+    assert after["deduplicated"] - before["deduplicated"] == 1
+    assert after["warm_hits"] - before["warm_hits"] == 1
+    assert after["queue_depth"] == 0
+    deal_finder._DEAL_CACHE.clear()
+
+def test_failed_prefetch_is_not_counted_as_warm(monkeypatch):
+    """A prefetch that ends in the uncached fallback is a failure, and the later view is cold"""
+    from utils import deal_finder
+    from utils.prefetch import deal_prefetcher
+
+    async def failing_chat(messages, **kwargs):
+        raise RuntimeError("LLM down")
+
+    monkeypatch.setattr(deal_finder, "gemini_chat_async", failing_chat)
+    monkeypatch.setattr(deal_prefetcher, "enabled", True)
+    deal_finder._DEAL_CACHE.clear()
+    before = deal_prefetcher.stats()
+
+    assert asyncio.run(deal_prefetcher.prefetch("Broken Blender B2")) is False
+    assert deal_prefetcher.record_view("Broken Blender B2") is False
+
+    after = deal_prefetcher.stats()
+    assert after["completed"] == before["completed"]
+    assert after["failed"] - before["failed"] == 1
+    assert after["cold_views"] - before["cold_views"] == 1
+
+def test_app_boots_without_sdk_or_key(tmp_path):
+    """Importing the app neither needs GEMINI_API_KEY nor imports the Gemini SDK"""
+    import os
+    import subprocess
+    import sys
+
+    env = {k: v for k, v in os.environ.items() if k != "GEMINI_API_KEY"}
+    env["DATABASE_URL"] = f"sqlite:///{tmp_path / 'boot.db'}"
+    code = (
+        "import sys\n"
+        "from fastapi.testclient import TestClient\n"
+        "import main\n"
+        "assert TestClient(main.app).get('/health').status_code == 200\n"
+        "print(any(m.startswith('google.generativeai') for m in sys.modules))\n"
+    )
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=backend_dir, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "False"
+
+def test_missing_key_raises_on_first_call(monkeypatch):
+    """Without a key the first call fails (callers fall back) and later calls retry"""
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    monkeypatch.setattr(ai_client, "_model", None)
+
+    with pytest.raises(RuntimeError):
+        ai_client.gemini_generate("hi")
+    assert ai_client._model is None
+
+def test_circuit_breaker_states():
+    """Consecutive failures or slow calls open the breaker; a half-open probe decides recovery"""
+    clock = SimpleNamespace(now=0.0)
+    breaker = ai_client.CircuitBreaker(failure_threshold=2, slow_call_seconds=1.0, reset_seconds=10, clock=lambda: clock.now)
+
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_success(5.0)  # slow call counts as a failure
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success(0.1)
+    assert breaker.state == "closed"
+    assert breaker.stats()["times_opened"] == 2
+
+def test_open_breaker_serves_fallback_immediately(monkeypatch):
+    """Once Gemini keeps failing, advice falls back without calling or waiting for it"""
+    calls = []
+
+    def failing_generate(*args, **kwargs):
+        calls.append(args)
+        raise RuntimeError("503 Service Unavailable")
+
+    monkeypatch.setattr(ai_client, "_safe_generate", failing_generate)
+    monkeypatch.setattr(ai_client, "_get_model", lambda: None)
+    monkeypatch.setattr(ai_client, "_breaker", ai_client.CircuitBreaker(failure_threshold=2, reset_seconds=60))
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            asyncio.run(ai_client.gemini_chat_async([{"role": "user", "content": "hi"}]))
+    with pytest.raises(ai_client.CircuitOpenError):
+        asyncio.run(ai_client.gemini_chat_async([{"role": "user", "content": "hi"}]))
+    assert len(calls) == 2
+
+    user = SimpleNamespace(id=-2, stipend=1000.0, savings_goal=100.0)
+    plan = SimpleNamespace(id=9, item_name="Bike", expected_price=300.0, priority="low", desired_date=date.today())
+    started = time.monotonic()
+    advice = asyncio.run(ai_advisor.generate_advice(user, [], [plan]))
+    assert time.monotonic() - started < 0.5
+    assert advice["next_purchases"][0]["verdict"] == "postpone"
+    assert len(calls) == 2
+    assert ai_client.resilience_stats()["breaker"]["rejected"] == 2
+
+def test_per_endpoint_deadline(monkeypatch):
+    """GEMINI_DEADLINE_<ENDPOINT>_SECONDS overrides the default timeout"""
+    monkeypatch.setenv("GEMINI_DEADLINE_ADVICE_SECONDS", "0.05")
+    monkeypatch.setattr(ai_client, "_safe_generate", lambda *a, **k: time.sleep(0.5))
+    monkeypatch.setattr(ai_client, "_get_model", lambda: None)
+    monkeypatch.setattr(ai_client, "_breaker", ai_client.CircuitBreaker())
+
+    assert ai_client.deadline_for("advice") == 0.05
+    assert ai_client.deadline_for("deals") == ai_client._DEFAULT_TIMEOUT
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(ai_client.gemini_chat_async([{"role": "user", "content": "hi"}], endpoint="advice"))
+    assert ai_client._breaker.consecutive_failures == 1
+
+def test_advice_cache_follows_payload_not_calendar(monkeypatch):
+    """Advice is reused while the model inputs are unchanged and recomputed as soon as they change"""
+    from utils.cache import TTLCache
+
+    calls = []
+
+    async def fake_chat(messages, **kwargs):
+        calls.append(json.loads(messages[1]["content"]))
+        return '{"cuts": [], "next_purchases": []}'
+
+    monkeypatch.setattr(ai_advisor, "gemini_chat_async", fake_chat)
+    monkeypatch.setattr(ai_advisor, "_ADVICE_CACHE", TTLCache("advice-test", max_entries=16))
+    user = SimpleNamespace(id=-3, stipend=1000.0, savings_goal=100.0)
+    plan = SimpleNamespace(id=11, item_name="Desk", expected_price=90.0, priority="low", desired_date=date(2025, 1, 5))
+    coffee = SimpleNamespace(id=1, amount=4.5, category="Food", description="coffee", expense_date=date(2025, 1, 2))
+
+    asyncio.run(ai_advisor.generate_advice(user, [coffee], [plan]))
+    asyncio.run(ai_advisor.generate_advice(user, [coffee], [plan]))
+    assert len(calls) == 1
+
+    rent = SimpleNamespace(id=2, amount=800.0, category="Housing", description="", expense_date=date(2025, 1, 3))
+    asyncio.run(ai_advisor.generate_advice(user, [coffee, rent], [plan]))
+    assert len(calls) == 2
+    assert [e["id"] for e in calls[1]["recent_expenses"]] == [2, 1]
+
+    user.stipend = 1200.0
+    asyncio.run(ai_advisor.generate_advice(user, [coffee, rent], [plan]))
+    assert len(calls) == 3
@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from utils.analytics import ExpenseAggregate
+from utils.calculations import calculate_budget_summary, get_expense_statistics
+from utils.recommendations import generate_recommendations, get_spending_insights
+
+TODAY = date(2025, 3, 17)  # a Monday
+
+def _expense(amount, category, days_ago):
+    return SimpleNamespace(amount=amount, category=category, expense_date=TODAY - timedelta(days=days_ago))
+
+EXPENSES = [
+    _expense(10.0, "food", 0),       # Monday
+    _expense(30.0, "food", 1),       # Sunday
+    _expense(20.0, "transport", 2),  # Saturday
+    _expense(40.0, "shopping", 45),  # outside the 30-day window
+]
+
+def test_aggregate_single_pass_buckets():
+    """Aggregate is built from a one-shot iterator and exposes every bucket"""
+    aggregate = ExpenseAggregate.from_expenses(iter(EXPENSES), today=TODAY)
+
+    assert aggregate.count == 4
+    assert aggregate.total == 100.0
+    assert (aggregate.smallest, aggregate.largest) == (10.0, 40.0)
+    assert aggregate.category_totals() == {"food": 40.0, "transport": 20.0, "shopping": 40.0}
+    assert aggregate.by_month == {"2025-03": 60.0, "2025-01": 40.0}
+    assert (aggregate.weekend_total, aggregate.weekend_count) == (50.0, 2)
+    assert (aggregate.weekday_total, aggregate.weekday_count) == (50.0, 2)
+    assert (aggregate.window_total, aggregate.window_count) == (60.0, 3)
+
+def test_helpers_accept_aggregate():
+    """All dashboard helpers give the same answer for a list and for an aggregate"""
+    user = SimpleNamespace(stipend=200.0, savings_goal=50.0, budget_cycle_start=date.today() - timedelta(days=3))
+    expenses = [_expense(e.amount, e.category, (TODAY - e.expense_date).days) for e in EXPENSES]
+    aggregate = ExpenseAggregate.from_expenses(expenses)
+
+    assert calculate_budget_summary(user, aggregate) == calculate_budget_summary(user, expenses)
+    assert get_expense_statistics(aggregate) == get_expense_statistics(expenses)
+    assert generate_recommendations(user, aggregate) == generate_recommendations(user, expenses)
+    assert get_spending_insights(user, aggregate) == get_spending_insights(user, expenses)
+
+def test_empty_aggregate():
+    """An empty aggregate behaves like an empty expense list"""
+    user = SimpleNamespace(stipend=200.0, savings_goal=50.0, budget_cycle_start=date.today())
+    aggregate = ExpenseAggregate.from_expenses([])
+    assert get_expense_statistics(aggregate)["total_expenses"] == 0
+    assert generate_recommendations(user, aggregate)[0]["type"] == "welcome"
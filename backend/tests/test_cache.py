@@ -0,0 +1,137 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from main import app
+from utils import cache as cache_module
+from utils.cache import SQLiteCache, TTLCache, create_cache, get_cache
+
+client = TestClient(app)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_by_entry_count():
+    """The least recently used entry is evicted once max_entries is exceeded"""
+    cache = TTLCache("test", max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_eviction_by_approximate_bytes():
+    """Entries are evicted until the approximate byte budget fits"""
+    cache = TTLCache("test", max_entries=100, max_bytes=25)
+    cache.set("a", "x" * 10)  # 12 bytes of JSON
+    cache.set("b", "y" * 10)
+    cache.set("c", "z" * 10)
+
+    assert len(cache) == 2
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 24
+
+    cache.set("huge", "w" * 100)
+    assert cache.get("huge") is None
+    assert len(cache) == 2
+
+
+def test_ttl_expiry_and_counters():
+    """Expired entries count as misses and are dropped on access"""
+    clock = FakeClock()
+    cache = TTLCache("test", ttl_seconds=10, clock=clock)
+    cache.set("k", {"v": 1})
+    assert cache.get("k") == {"v": 1}
+
+    clock.now = 11
+    assert cache.get("k") is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["expirations"] == 1
+    assert stats["entries"] == 0
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    """Two handles on one file behave like two workers sharing the cache"""
+    path = str(tmp_path / "cache.db")
+    clock = FakeClock()
+    worker_a = SQLiteCache("advice", path, max_entries=2, touch_interval=1, clock=clock)
+    worker_b = SQLiteCache("advice", path, max_entries=2, touch_interval=1, clock=clock)
+    other = SQLiteCache("deals", path)
+
+    worker_a.set((1, "2025-01-01", "sig"), {"cuts": [], "next_purchases": []})
+    assert worker_b.get((1, "2025-01-01", "sig")) == {"cuts": [], "next_purchases": []}
+    assert other.get((1, "2025-01-01", "sig")) is None
+
+    clock.now = 2
+    worker_b.set("b", 2)
+    clock.now = 4
+    worker_a.get((1, "2025-01-01", "sig"))
+    worker_a.set("c", 3)  # "b" is least recently used across both handles
+    assert "b" not in worker_b
+    assert len(worker_a) == 2
+
+
+def test_sqlite_cache_ttl(tmp_path):
+    """Expired rows are ignored and removed"""
+    clock = FakeClock()
+    cache = SQLiteCache("test", str(tmp_path / "cache.db"), ttl_seconds=5, clock=clock)
+    cache.set("k", [1, 2])
+    assert cache.get("k") == [1, 2]
+    clock.now = 6
+    assert cache.get("k") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_sqlite_cache_hits_touch_recency_coarsely(tmp_path):
+    """A hit rewrites accessed_at only once it is older than touch_interval; async calls match sync ones"""
+    clock = FakeClock()
+    cache = SQLiteCache("test", str(tmp_path / "cache.db"), ttl_seconds=100, clock=clock)
+    assert cache.touch_interval == 10
+    cache.set("k", 1)
+
+    def accessed_at():
+        return cache._connection().execute("SELECT accessed_at FROM cache_entries WHERE key = ?", (cache._key("k"),)).fetchone()[0]
+
+    clock.now = 5
+    assert asyncio.run(cache.get_async("k")) == 1
+    assert accessed_at() == 0
+    clock.now = 12
+    assert cache.get("k") == 1
+    assert accessed_at() == 12
+
+    asyncio.run(cache.set_async("j", [2]))
+    assert cache.get("j") == [2]
+
+
+def test_create_cache_selects_backend(monkeypatch, tmp_path):
+    """CACHE_BACKEND picks the implementation"""
+    monkeypatch.setenv("CACHE_BACKEND", "sqlite")
+    monkeypatch.setenv("CACHE_SQLITE_PATH", str(tmp_path / "shared.db"))
+    # Unregistered again when the test finishes
+    monkeypatch.setitem(cache_module._REGISTRY, "test-backend", None)
+    cache = create_cache("test-backend")
+    assert isinstance(cache, SQLiteCache)
+    assert get_cache("test-backend") is cache
+    assert cache.stats()["backend"] == "sqlite"
+
+
+def test_metrics_endpoint_lists_ai_caches():
+    """The metrics view exposes the advice and deal caches"""
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    caches = response.json()["caches"]
+    assert {"advice", "deals"} <= set(caches)
+    assert {"entries", "bytes", "hits", "misses", "evictions"} <= set(caches["advice"])
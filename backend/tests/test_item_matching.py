@@ -0,0 +1,72 @@
+import asyncio
+import json
+
+from utils import deal_finder
+from utils.item_matching import SimilarityIndex, normalize_item_name
+
+
+def test_normalize_item_name():
+    """Punctuation, case, ordinals, stopwords and word order are canonicalised"""
+    assert normalize_item_name("AirPods Pro 2") == "2 airpods pro"
+    assert normalize_item_name("airpods pro (2nd gen)") == "2 airpods pro"
+    assert normalize_item_name("Sony WH-1000XM5") == normalize_item_name("sony wh1000xm5")
+    assert normalize_item_name("Calculus Textbook") == normalize_item_name("textbook for calculus")
+
+
+def test_similarity_index_threshold_and_numbers():
+    """Near-identical names match; different models or numbers do not"""
+    index = SimilarityIndex("test", threshold=0.8)
+    for name in ("AirPods Pro 2", "MacBook Air M2", "iPhone 14", "Desk Chair"):
+        index.add(normalize_item_name(name))
+
+    assert index.lookup(normalize_item_name("Apple AirPods Pro 2")) == "2 airpods pro"
+    assert index.lookup(normalize_item_name("Apple MacBook Air M2")) == "air m2 macbook"
+    assert index.lookup(normalize_item_name("iPhone 15")) is None
+    assert index.lookup(normalize_item_name("Desk Lamp")) is None
+    assert index.lookup(normalize_item_name("MacBook Pro M2")) is None
+
+    strict = SimilarityIndex("test", threshold=0.95)
+    strict.add(normalize_item_name("AirPods Pro 2"))
+    assert strict.lookup(normalize_item_name("Apple AirPods Pro 2")) is None
+
+
+def test_find_deals_reuses_near_identical_items(monkeypatch):
+    """Differently worded requests for the same product share one Gemini call"""
+    calls = []
+
+    async def fake_chat(messages, **kwargs):
+        calls.append(messages)
+        return json.dumps([{"merchant": "Shop", "item_name": "AirPods Pro 2", "price": 899.0, "url": "https://example.com"}])
+
+    monkeypatch.setattr(deal_finder, "gemini_chat_async", fake_chat)
+    deal_finder._DEAL_CACHE.clear()
+    before = deal_finder._ITEM_INDEX.stats()
+
+    for name in ("AirPods Pro 2", "airpods pro (2nd gen)", "Apple AirPods Pro 2"):
+        assert asyncio.run(deal_finder.find_deals(name))[0]["price"] == 899.0
+    assert len(calls) == 1
+
+    after = deal_finder._ITEM_INDEX.stats()
+    assert after["exact_hits"] - before["exact_hits"] == 1
+    assert after["fuzzy_hits"] - before["fuzzy_hits"] == 1
+    deal_finder._DEAL_CACHE.clear()
+
+
+def test_batch_fallback_counts_each_miss_once(monkeypatch):
+    """An item the batched reply omits is looked up alone without being counted as a second miss"""
+    deal = {"merchant": "Shop", "item_name": "x", "price": 10.0, "url": "https://example.com"}
+
+    async def fake_chat(messages, **kwargs):
+        names = json.loads(messages[-1]["content"]) if messages[-1]["content"].startswith("[") else None
+        if names is not None:
+            return json.dumps({names[0]: [deal]})  # answers only the first item
+        return json.dumps([deal])
+
+    monkeypatch.setattr(deal_finder, "gemini_chat_async", fake_chat)
+    deal_finder._DEAL_CACHE.clear()
+    before = deal_finder._ITEM_INDEX.stats()
+
+    deals = asyncio.run(deal_finder.find_deals_batch(["Batch Kettle", "Batch Toaster Oven"]))
+    assert set(deals) == {"Batch Kettle", "Batch Toaster Oven"}
+    assert deal_finder._ITEM_INDEX.stats()["misses"] - before["misses"] == 2
+    deal_finder._DEAL_CACHE.clear()
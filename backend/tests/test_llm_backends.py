@@ -0,0 +1,189 @@
+import asyncio
+import json
+import random
+
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app
+from utils import ai_client
+from utils.llm_backends import (
+    FixtureMissingError, RecordingBackend, ReplayBackend, StubBackend, StubLLMError, parse_latency,
+)
+
+client = TestClient(app)
+
+
+def test_stub_backend_serves_advice_and_deals_end_to_end(monkeypatch):
+    """With the stub installed the AI routes answer from well-formed local replies"""
+    monkeypatch.setattr(ai_client, "_backend", StubBackend(seed=1))
+    user_id = client.post("/api/user", json={"stipend": 1700.0, "savings_goal": 100.0, "budget_cycle_start": "2025-01-01"}).json()["id"]
+    client.post("/api/expenses", json={"user_id": user_id, "amount": 90.0, "category": "food", "date": "2025-01-03"})
+    for name, priority in (("Stub Kettle", "high"), ("Stub Rug", "low")):
+        client.post("/api/planned-purchases", json={
+            "user_id": user_id, "item_name": name, "expected_price": 30.0, "priority": priority, "desired_date": "2025-03-01",
+        })
+
+    advice = client.get(f"/api/advice/{user_id}").json()
+    assert [p["verdict"] for p in advice["next_purchases"]] == ["buy_now", "postpone"]
+    assert advice["next_purchases"][0]["suggestion"] == "Stub verdict"
+    assert advice["cuts"][0]["amount_saved"] == 45.0
+
+    deals = client.get(f"/api/deals/batch/{user_id}").json()
+    assert {d["item_name"] for d in deals} == {"Stub Kettle", "Stub Rug"}
+    assert all(len(d["deals"]) == 3 for d in deals)
+    assert client.get("/api/metrics").json()["llm"]["backend"]["name"] == "stub"
+
+
+def test_stub_is_deterministic_and_injects_failures():
+    """The same seed yields the same latencies and failures; canned replies match by substring"""
+    def outcomes(backend):
+        results = []
+        for _ in range(20):
+            try:
+                results.append(backend.generate("[USER] hello"))
+            except StubLLMError:
+                results.append("error")
+        return results
+
+    first = outcomes(StubBackend(failure_rate=0.5, seed=3))
+    assert first == outcomes(StubBackend(failure_rate=0.5, seed=3))
+    assert 0 < first.count("error") < 20
+
+    canned = StubBackend(replies=[{"match": "hello", "reply": {"cuts": []}}])
+    assert json.loads(canned.generate("[USER] hello")) == {"cuts": []}
+    assert "".join(canned.stream("[USER] hello there")) == '{"cuts": []}'
+
+    rng = random.Random(0)
+    assert parse_latency("fixed:0.2")(rng) == 0.2
+    assert 0.1 <= parse_latency("uniform:0.1:0.3")(rng) <= 0.3
+    assert parse_latency("lognormal:0.5:0.3")(rng) > 0
+    with pytest.raises(ValueError):
+        parse_latency("gaussian:1")
+
+
+def test_record_then_replay(tmp_path, monkeypatch):
+    """Recorded replies are replayed offline, through the async client, for both call styles"""
+    path = str(tmp_path / "fixtures.jsonl")
+    messages = [{"role": "user", "content": "Find the best deals for: Lamp"}]
+    monkeypatch.setattr(ai_client, "_backend", RecordingBackend(StubBackend(), path))
+    recorded = asyncio.run(ai_client.gemini_chat_async(messages, temperature=0.3))
+
+    async def stream(messages):
+        return "".join([text async for text in ai_client.gemini_stream_async(messages, temperature=0.3)])
+
+    streamed = asyncio.run(stream([{"role": "user", "content": "Find the best deals for: Desk"}]))
+
+    replay = ReplayBackend(path, replay_latency=False)
+    monkeypatch.setattr(ai_client, "_backend", replay)
+    assert asyncio.run(ai_client.gemini_chat_async(messages, temperature=0.3)) == recorded
+    assert asyncio.run(stream([{"role": "user", "content": "Find the best deals for: Desk"}])) == streamed
+    with pytest.raises(FixtureMissingError):
+        replay.generate(ai_client._build_prompt(messages), temperature=0.9)
+    assert replay.stats()["fixtures"] == 2
+    assert replay.stats()["misses"] == 1
+
+
+def test_make_backend_only_builds_a_live_backend_for_record(monkeypatch, tmp_path):
+    """Stand-ins never construct the live backend; record refuses a stand-in to wrap"""
+    monkeypatch.setenv("LLM_FIXTURES_PATH", str(tmp_path / "fixtures.jsonl"))
+    monkeypatch.setattr(ai_client, "GeminiBackend", lambda: pytest.fail("live backend built"))
+    for inner in ("stub", "record", "replay"):
+        monkeypatch.setenv("LLM_RECORD_BACKEND", inner)
+        assert ai_client.make_backend("stub").name == "stub"
+        assert ai_client.make_backend("replay").name == "replay"
+        with pytest.raises(ValueError, match="LLM_RECORD_BACKEND"):
+            ai_client.make_backend("record")
+
+    monkeypatch.setenv("LLM_RECORD_BACKEND", "openai")
+    recorder = ai_client.make_backend("record")
+    assert isinstance(recorder.inner, ai_client.OpenAIBackend)
+
+
+def test_hedged_call_takes_the_faster_backend(monkeypatch):
+    """A slow primary is overtaken by the hedge; a failing primary fails over; a fast one wins alone"""
+    monkeypatch.setattr(ai_client, "_HEDGE_INITIAL_DELAY", 0.05)
+    monkeypatch.setattr(ai_client, "_hedge_counts", {"hedged": 0, "hedge_wins": 0, "failovers": 0})
+    monkeypatch.setattr(ai_client, "_hedge_backend", StubBackend(replies=[{"match": "", "reply": "hedge"}]))
+    messages = [{"role": "user", "content": "hi"}]
+
+    def call():
+        return asyncio.run(ai_client.gemini_chat_async(messages, endpoint="hedge-test", timeout=2))
+
+    monkeypatch.setattr(ai_client, "_backend", StubBackend(latency="fixed:0.5", replies=[{"match": "", "reply": "primary"}]))
+    assert call() == "hedge"
+
+    monkeypatch.setattr(ai_client, "_backend", StubBackend(failure_rate=1.0))
+    assert call() == "hedge"
+
+    monkeypatch.setattr(ai_client, "_backend", StubBackend(replies=[{"match": "", "reply": "primary"}]))
+    assert call() == "primary"
+    assert ai_client._hedge_counts == {"hedged": 1, "hedge_wins": 1, "failovers": 1}
+    assert ai_client.resilience_stats()["hedging"]["backend"]["name"] == "stub"
+
+
+def test_breaker_tracks_the_primary_even_when_the_hedge_answers(monkeypatch, caplog):
+    """Hedge wins do not keep the breaker closed over a dead primary; open-breaker fallbacks are quiet"""
+    from utils import deal_finder
+
+    monkeypatch.setattr(ai_client, "_hedge_backend", StubBackend(replies=[{"match": "", "reply": "[]"}]))
+    monkeypatch.setattr(ai_client, "_backend", StubBackend(failure_rate=1.0))
+    monkeypatch.setattr(ai_client, "_breaker", ai_client.CircuitBreaker(failure_threshold=2, reset_seconds=60))
+    messages = [{"role": "user", "content": "hi"}]
+
+    for _ in range(2):
+        assert asyncio.run(ai_client.gemini_chat_async(messages, endpoint="breaker-test", timeout=2)) == "[]"
+    assert ai_client._breaker.state == "open"
+
+    with caplog.at_level("ERROR"):
+        deals = asyncio.run(deal_finder.find_deals("Breaker Lamp"))
+    assert deals[0]["merchant"] == "Google Shopping"
+    assert not caplog.records
+
+
+def test_hedge_delay_follows_observed_p95(monkeypatch):
+    """Until enough calls were seen the initial delay applies, then the window's p95"""
+    monkeypatch.setattr(ai_client, "_latencies", {})
+    monkeypatch.setattr(ai_client, "_HEDGE_INITIAL_DELAY", 2.0)
+    assert ai_client.hedge_delay("advice") == 2.0
+    window = ai_client._latency_window("advice")
+    for ms in range(1, 101):
+        window.record(ms / 1000)
+    assert ai_client.hedge_delay("advice") == pytest.approx(0.095)
+
+
+def test_openai_backend_reuses_pooled_connections():
+    """The OpenAI-compatible backend talks to a local server over one kept-alive connection"""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    peers = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            peers.append(self.client_address)
+            body = json.dumps({
+                "id": "1", "object": "chat.completion", "created": 0, "model": request["model"],
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": request["messages"][0]["content"].upper()}}],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        backend = ai_client.OpenAIBackend(model="local", base_url=f"http://127.0.0.1:{server.server_port}/v1")
+        assert [backend.generate(f"hi {n}") for n in range(3)] == ["HI 0", "HI 1", "HI 2"]
+        assert len(set(peers)) == 1
+    finally:
+        server.shutdown()
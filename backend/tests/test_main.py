@@ -132,4 +132,261 @@ def test_invalid_expense_data():
     }
     
     response = client.post("/api/expenses", json=expense_data)
-    assert response.status_code == 422  # Validation error 
\ No newline at end of file
+    assert response.status_code == 422  # Validation error 
+
+def test_bulk_create_expenses():
+    """Test bulk expense creation with per-item errors and dedupe"""
+    user_data = {
+        "stipend": 2000.0,
+        "savings_goal": 300.0,
+        "budget_cycle_start": "2025-01-01"
+    }
+    user_id = client.post("/api/user", json=user_data).json()["id"]
+    
+    items = [
+        {"user_id": user_id, "amount": 4.5, "category": "food", "description": "Coffee", "date": "2025-01-15"},
+        {"user_id": user_id, "amount": 4.5, "category": "food", "description": "Coffee", "date": "2025-01-15"},
+        {"user_id": user_id, "amount": -3, "category": "food", "date": "2025-01-15"},  # invalid amount
+        {"user_id": 999999, "amount": 10, "category": "food", "date": "2025-01-15"},  # unknown user
+        {"user_id": user_id, "amount": 12.0, "category": "transport", "date": "2025-01-16"},
+    ]
+    
+    response = client.post("/api/expenses/bulk", json={"items": items, "dedupe": True})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["received"] == 5
+    assert data["created"] == 3  # both identical coffees are kept
+    assert [e["index"] for e in data["errors"]] == [2, 3]
+    
+    # Re-uploading the same batch is idempotent
+    data = client.post("/api/expenses/bulk", json={"items": items, "dedupe": True}).json()
+    assert data["created"] == 0
+    assert data["duplicates"] == 3
+    
+    summary = client.get(f"/api/summary/{user_id}").json()
+    assert summary["total_expenses"] == 21.0
+
+def test_bulk_dedupe_counts_repeated_hashes_once(monkeypatch):
+    """Rows sharing a content hash within one chunk are inserted and rolled up once"""
+    from utils import ingest
+    hash_without_occurrence = ingest.expense_content_hash
+    monkeypatch.setattr(ingest, "expense_content_hash", lambda item, occurrence: hash_without_occurrence(item, 0))
+    user_data = {
+        "stipend": 2000.0,
+        "savings_goal": 300.0,
+        "budget_cycle_start": "2025-01-01"
+    }
+    user_id = client.post("/api/user", json=user_data).json()["id"]
+    
+    coffee = {"user_id": user_id, "amount": 3.5, "category": "food", "description": "Coffee", "date": "2025-01-15"}
+    data = client.post("/api/expenses/bulk", json={"items": [coffee, coffee], "dedupe": True}).json()
+    assert (data["created"], data["duplicates"]) == (1, 1)
+    
+    summary = client.get(f"/api/summary/{user_id}").json()
+    assert summary["total_expenses"] == 3.5
+
+def test_bulk_dedupe_keeps_identical_rows_out_of_date_order():
+    """Identical rows far apart in an unsorted upload are both kept, and the re-upload adds nothing"""
+    user_data = {
+        "stipend": 2000.0,
+        "savings_goal": 300.0,
+        "budget_cycle_start": "2025-01-01"
+    }
+    user_id = client.post("/api/user", json=user_data).json()["id"]
+    
+    coffee = {"user_id": user_id, "amount": 3.5, "category": "food", "description": "Coffee", "date": "2025-01-01"}
+    others = [
+        {"user_id": user_id, "amount": 1.0, "category": "transport", "date": f"2025-{month:02d}-{day:02d}"}
+        for month in range(2, 5) for day in range(1, 25)
+    ][:70]
+    items = [coffee] + others + [coffee]
+    data = client.post("/api/expenses/bulk", json={"items": items, "dedupe": True}).json()
+    assert (data["received"], data["created"], data["duplicates"]) == (72, 72, 0)
+    
+    data = client.post("/api/expenses/bulk", json={"items": items, "dedupe": True}).json()
+    assert (data["created"], data["duplicates"]) == (0, 72)
+    
+    summary = client.get(f"/api/summary/{user_id}").json()
+    assert summary["expenses_by_category"] == {"food": 7.0, "transport": 70.0}
+
+def test_import_csv_statement():
+    """Test streaming CSV bank statement import"""
+    user_data = {
+        "stipend": 2000.0,
+        "savings_goal": 300.0,
+        "budget_cycle_start": "2025-01-01"
+    }
+    user_id = client.post("/api/user", json=user_data).json()["id"]
+    
+    csv_body = (
+        "Transaction Date,Description,Amount,Category\n"
+        "15/01/2025,Campus cafe,-12.50,food\n"
+        "16/01/2025,Stipend,2000.00,\n"         # incoming payment, skipped
+        "17/01/2025,\"Taxi, airport\",-45.00,\n"  # no category -> default
+        "not a date,Broken row,-3.00,food\n"
+    )
+    files = {"file": ("statement.csv", csv_body, "text/csv")}
+    response = client.post("/api/expenses/import", files=files, data={"user_id": user_id})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["format"] == "csv"
+    assert data["created"] == 2
+    assert data["skipped"] == 1
+    assert data["rejected"] == 1 and data["errors"][0]["index"] == 5
+    
+    # Importing the same file again creates nothing new
+    response = client.post("/api/expenses/import", files=files, data={"user_id": user_id})
+    assert response.json()["duplicates"] == 2
+    
+    summary = client.get(f"/api/summary/{user_id}").json()
+    assert summary["expenses_by_category"] == {"food": 12.5, "other": 45.0}
+
+def test_import_ofx_statement():
+    """Test streaming OFX bank statement import"""
+    user_data = {
+        "stipend": 2000.0,
+        "savings_goal": 300.0,
+        "budget_cycle_start": "2025-01-01"
+    }
+    user_id = client.post("/api/user", json=user_data).json()["id"]
+    
+    ofx_body = (
+        "OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n"
+        "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250120120000<TRNAMT>-30.25<NAME>Grocery<MEMO>Weekly shop</STMTTRN>\n"
+        "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20250121<TRNAMT>100.00<NAME>Refund</STMTTRN>\n"
+        "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+    )
+    files = {"file": ("statement.ofx", ofx_body, "application/x-ofx")}
+    response = client.post("/api/expenses/import", files=files, data={"user_id": user_id, "default_category": "groceries"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["format"] == "ofx"
+    assert (data["created"], data["skipped"]) == (1, 1)
+    
+    expenses = client.get(f"/api/expenses/{user_id}").json()
+    assert expenses[0]["description"] == "Grocery - Weekly shop"
+    assert expenses[0]["category"] == "groceries"
+    assert expenses[0]["date"] == "2025-01-20"
+
+def test_expense_cursor_pagination():
+    """Test keyset pagination returns every expense exactly once"""
+    user_data = {
+        "stipend": 2000.0,
+        "savings_goal": 300.0,
+        "budget_cycle_start": "2025-01-01"
+    }
+    user_id = client.post("/api/user", json=user_data).json()["id"]
+    items = [
+        {"user_id": user_id, "amount": 1.0 + i, "category": "food", "date": f"2025-01-{1 + i // 3:02d}"}
+        for i in range(23)
+    ]
+    client.post("/api/expenses/bulk", json={"items": items})
+    
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 5, **({"cursor": cursor} if cursor else {})}
+        response = client.get(f"/api/expenses/{user_id}", params=params)
+        assert response.status_code == 200
+        seen.extend(e["id"] for e in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    
+    by_offset = client.get(f"/api/expenses/{user_id}", params={"limit": 100}).json()
+    assert seen == [e["id"] for e in by_offset]
+    assert len(seen) == 23
+    
+    # Offset paging keeps working for older clients
+    page = client.get(f"/api/expenses/{user_id}", params={"limit": 5, "offset": 5}).json()
+    assert [e["id"] for e in page] == seen[5:10]
+    
+    assert client.get(f"/api/expenses/{user_id}", params={"cursor": "garbage"}).status_code == 400
+
+def test_expense_report_csv_stream():
+    """Test the CSV report is streamed with proper quoting"""
+    user_data = {
+        "stipend": 2000.0,
+        "savings_goal": 300.0,
+        "budget_cycle_start": "2025-01-01"
+    }
+    user_id = client.post("/api/user", json=user_data).json()["id"]
+    items = [
+        {"user_id": user_id, "amount": 12.5, "category": "food", "description": 'Pizza, "large"', "date": "2025-01-02"},
+        {"user_id": user_id, "amount": 3.0, "category": "transport", "date": "2025-01-01"},
+    ]
+    client.post("/api/expenses/bulk", json={"items": items})
+    
+    response = client.get(f"/api/report/{user_id}", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.text.splitlines() == [
+        "Date,Category,Description,Amount",
+        '"2025-01-02","food","Pizza, ""large""",12.5',
+        '"2025-01-01","transport","",3.0',
+    ]
+
+def test_columnar_export():
+    """Test Parquet and Arrow exports round-trip with dictionary-encoded categories"""
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    import io
+    
+    user_data = {
+        "stipend": 2000.0,
+        "savings_goal": 300.0,
+        "budget_cycle_start": "2025-01-01"
+    }
+    user_id = client.post("/api/user", json=user_data).json()["id"]
+    items = [
+        {"user_id": user_id, "amount": 5.0 + i, "category": ["food", "transport"][i % 2], "date": "2025-02-01"}
+        for i in range(6)
+    ]
+    client.post("/api/expenses/bulk", json={"items": items})
+    
+    response = client.get(f"/api/export/{user_id}", params={"format": "parquet"})
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 6
+    assert pa.types.is_dictionary(table.schema.field("category").type)
+    assert sorted(table.column("amount").to_pylist()) == [5.0, 6.0, 7.0, 8.0, 9.0, 10.0]
+    
+    response = client.get("/api/export", params={"table": "users", "format": "arrow"})
+    assert response.status_code == 200
+    users = pa.ipc.open_stream(response.content).read_all()
+    assert user_id in users.column("id").to_pylist()
+    
+    assert client.get("/api/export", params={"table": "secrets"}).status_code == 400
+    assert client.get("/api/export/999999").status_code == 404
+
+def test_ndjson_streaming():
+    """Test NDJSON report and listing stream rows followed by a summary record"""
+    import json
+    
+    user_data = {
+        "stipend": 2000.0,
+        "savings_goal": 300.0,
+        "budget_cycle_start": "2025-01-01"
+    }
+    user_id = client.post("/api/user", json=user_data).json()["id"]
+    items = [
+        {"user_id": user_id, "amount": 10.0 + i, "category": "food", "date": f"2025-03-{1 + i:02d}"}
+        for i in range(7)
+    ]
+    client.post("/api/expenses/bulk", json={"items": items})
+    
+    response = client.get(f"/api/report/{user_id}", params={"format": "ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    report = client.get(f"/api/report/{user_id}").json()
+    assert lines[:-1] == report["expenses"]
+    summary = lines[-1]["summary"]
+    assert summary["total_expenses"] == report["total_expenses"] == 7
+    assert summary["total_amount"] == report["total_amount"]
+    
+    response = client.get(f"/api/expenses/{user_id}", params={"format": "ndjson", "limit": 5})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    listing = client.get(f"/api/expenses/{user_id}", params={"limit": 5})
+    assert lines[:-1] == listing.json()
+    assert lines[-1]["summary"]["next_cursor"] == listing.headers["X-Next-Cursor"]
@@ -0,0 +1,111 @@
+"""
+Run EXPLAIN QUERY PLAN for the SQL each route issues and fail if any of it
+falls back to a full scan of a per-user table.
+"""
+import os
+import re
+import pytest
+from sqlalchemy import create_engine, event, inspect
+from fastapi.testclient import TestClient
+
+from main import app
+from models import Base, async_engine, engine
+
+client = TestClient(app)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FULL_SCAN = re.compile(r"^SCAN (users|expenses|expense_rollups|planned_purchases)\b")
+
+ROUTES = [
+    "/api/expenses?user_id={user_id}",
+    "/api/?user_id={user_id}",
+    "/api/expenses/{user_id}",
+    "/api/expenses/{user_id}?category=food",
+    "/api/expenses/{user_id}?limit=5&cursor={cursor}",
+    "/api/id/{expense_id}",
+    "/api/user/{user_id}/recent",
+    "/api/user/{user_id}/category/food",
+    "/api/summary/{user_id}",
+    "/api/recommendations/{user_id}",
+    "/api/insights/{user_id}",
+    "/api/statistics/{user_id}",
+    "/api/dashboard/{user_id}",
+    "/api/report/{user_id}",
+    "/api/report/{user_id}?format=csv&start_date=2025-01-01&end_date=2025-12-31",
+    "/api/planned-purchases/{user_id}",
+]
+
+ROLLUP_ROUTES = {
+    "/api/summary/{user_id}",
+    "/api/recommendations/{user_id}",
+    "/api/insights/{user_id}",
+    "/api/statistics/{user_id}",
+    "/api/dashboard/{user_id}",
+}
+
+@pytest.fixture(scope="module")
+def seeded():
+    user_id = client.post("/api/user", json={
+        "stipend": 2000.0, "savings_goal": 300.0, "budget_cycle_start": "2025-01-01"
+    }).json()["id"]
+    for day in range(1, 21):
+        response = client.post("/api/expenses", json={
+            "user_id": user_id, "amount": 5.0 + day, "category": "food" if day % 2 else "transport",
+            "description": "plan check", "date": f"2025-02-{day:02d}"
+        })
+    client.post("/api/planned-purchases", json={
+        "user_id": user_id, "item_name": "Desk lamp", "expected_price": 30.0,
+        "priority": "low", "desired_date": "2025-03-01"
+    })
+    cursor = client.get(f"/api/expenses/{user_id}?limit=5").headers["X-Next-Cursor"]
+    return {"user_id": user_id, "expense_id": response.json()["id"], "cursor": cursor}
+
+@pytest.fixture
+def captured_selects():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    # Rollup reads run on the sync engine in a worker thread
+    engines = (async_engine.sync_engine, engine)
+    for target in engines:
+        event.listen(target, "before_cursor_execute", capture)
+    yield statements
+    for target in engines:
+        event.remove(target, "before_cursor_execute", capture)
+
+@pytest.mark.skipif(engine.dialect.name != "sqlite", reason="EXPLAIN QUERY PLAN is SQLite-specific")
+@pytest.mark.parametrize("route", ROUTES)
+def test_route_queries_use_indexes(route, seeded, captured_selects):
+    """Every SELECT a route issues must search an index, not scan the table"""
+    response = client.get(route.format(**seeded))
+    assert response.status_code == 200
+    assert captured_selects, "route issued no SELECT statements"
+    if route in ROLLUP_ROUTES:
+        assert any("expense_rollups" in statement for statement, _ in captured_selects), "rollup query not captured"
+
+    with engine.connect() as conn:
+        for statement, parameters in captured_selects:
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", tuple(parameters)).all()
+            details = [row[-1] for row in plan]
+            scans = [d for d in details if FULL_SCAN.match(d)]
+            assert not scans, f"{route} full scan {scans} in:\n{statement}"
+
+def test_migrations_create_model_indexes(tmp_path):
+    """alembic upgrade head yields the same indexes as the models declare"""
+    from alembic import command
+    from alembic.config import Config
+
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    command.upgrade(config, "head")
+
+    migrated = inspect(create_engine(url))
+    for table in Base.metadata.sorted_tables:
+        expected = {index.name for index in table.indexes}
+        actual = {index["name"] for index in migrated.get_indexes(table.name)}
+        assert expected <= actual, f"{table.name} missing {expected - actual}"
@@ -0,0 +1,109 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select, update
+
+from main import app
+from models import AsyncSessionLocal, SessionLocal, Expense, ExpenseRollup, User
+from utils.calculations import calculate_budget_summary, get_expense_statistics
+from utils.rollups import rebuild_rollups, verify_rollups
+
+client = TestClient(app)
+
+def run_with_session(fn, *args, commit=False):
+    async def runner():
+        async with AsyncSessionLocal() as session:
+            result = await fn(session, *args)
+            if commit:
+                await session.commit()
+            return result
+    return asyncio.run(runner())
+
+def _create_user():
+    return client.post("/api/user", json={
+        "stipend": 1500.0, "savings_goal": 200.0, "budget_cycle_start": "2025-01-01"
+    }).json()["id"]
+
+def _add_expense(user_id, amount, category, day):
+    response = client.post("/api/expenses", json={
+        "user_id": user_id, "amount": amount, "category": category, "date": day
+    })
+    assert response.status_code == 201
+    return response.json()["id"]
+
+def test_rollups_follow_create_update_delete():
+    """Rollups stay in sync with the expenses table through every write path"""
+    user_id = _create_user()
+    first = _add_expense(user_id, 12.5, "food", "2025-01-10")
+    second = _add_expense(user_id, 40.0, "food", "2025-01-10")
+    _add_expense(user_id, 7.0, "transport", "2025-01-11")
+    assert run_with_session(verify_rollups, user_id) == []
+
+    # Move the largest expense to another bucket, then delete the smallest one
+    client.put(f"/api/id/{second}", json={
+        "user_id": user_id, "amount": 41.0, "category": "shopping", "date": "2025-01-12"
+    })
+    client.delete(f"/api/id/{first}")
+    assert run_with_session(verify_rollups, user_id) == []
+
+    with SessionLocal() as db:
+        buckets = {(r.day.isoformat(), r.category): (r.expense_count, r.total_amount)
+                   for r in db.scalars(select(ExpenseRollup).where(ExpenseRollup.user_id == user_id))}
+    assert buckets == {("2025-01-11", "transport"): (1, 7.0), ("2025-01-12", "shopping"): (1, 41.0)}
+
+def test_statistics_from_rollups_match_raw_expenses():
+    """Endpoints reading rollups report the same numbers as the raw rows"""
+    user_id = _create_user()
+    for i in range(30):
+        _add_expense(user_id, 3.0 + i, ["food", "transport", "fun"][i % 3], f"2025-02-{1 + i % 20:02d}")
+
+    with SessionLocal() as db:
+        expenses = db.scalars(select(Expense).where(Expense.user_id == user_id)).all()
+        expected = get_expense_statistics(expenses)
+    actual = client.get(f"/api/statistics/{user_id}").json()["statistics"]
+
+    assert actual["total_expenses"] == expected["total_expenses"]
+    assert actual["total_amount"] == pytest.approx(expected["total_amount"])
+    assert actual["largest_expense"] == expected["largest_expense"]
+    assert actual["smallest_expense"] == expected["smallest_expense"]
+    assert actual["monthly_trend"] == pytest.approx(expected["monthly_trend"])
+
+def test_budget_summary_from_rollups_matches_raw_expenses():
+    """/summary (rollups) agrees with calculate_budget_summary over the raw rows"""
+    user_id = _create_user()
+    for i in range(25):
+        _add_expense(user_id, 2.25 + i, ["food", "transport", "books"][i % 3], f"2025-03-{1 + i % 15:02d}")
+
+    with SessionLocal() as db:
+        user = db.get(User, user_id)
+        expenses = db.scalars(select(Expense).where(Expense.user_id == user_id)).all()
+        expected = calculate_budget_summary(user, expenses)
+    actual = client.get(f"/api/summary/{user_id}").json()
+
+    assert actual["expenses_by_category"] == pytest.approx(expected["expenses_by_category"])
+    for field in ("total_expenses", "remaining_budget", "daily_limit"):
+        assert actual[field] == pytest.approx(expected[field])
+    for field in ("stipend", "savings_goal", "days_elapsed", "days_remaining"):
+        assert actual[field] == expected[field]
+
+def test_rebuild_repairs_drifted_rollups():
+    """rebuild_rollups recomputes buckets that no longer match the raw table"""
+    user_id = _create_user()
+    _add_expense(user_id, 10.0, "food", "2025-03-01")
+    with SessionLocal() as db:
+        db.execute(update(ExpenseRollup).where(ExpenseRollup.user_id == user_id).values(total_amount=999.0))
+        db.commit()
+
+    mismatches = run_with_session(verify_rollups, user_id)
+    assert len(mismatches) == 1 and mismatches[0]["actual"][1] == 999.0
+
+    run_with_session(rebuild_rollups, user_id, commit=True)
+    assert run_with_session(verify_rollups, user_id) == []
+
+def test_deleting_user_removes_rollups():
+    """Deleting a user also clears their rollup rows"""
+    user_id = _create_user()
+    _add_expense(user_id, 10.0, "food", "2025-03-01")
+    assert client.delete(f"/api/user/{user_id}").status_code == 204
+    with SessionLocal() as db:
+        assert db.scalars(select(ExpenseRollup).where(ExpenseRollup.user_id == user_id)).all() == []
@@ -0,0 +1,81 @@
+import asyncio
+
+from utils import deal_finder
+from utils.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    """Callers with the same key await a single in-flight call"""
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work(key):
+        calls.append(key)
+        await asyncio.sleep(0.01)
+        return key.upper()
+
+    async def main():
+        return await asyncio.gather(
+            *(flight.do("a", lambda: work("a")) for _ in range(5)),
+            flight.do("b", lambda: work("b")),
+        )
+
+    assert asyncio.run(main()) == ["A"] * 5 + ["B"]
+    assert calls == ["a", "b"]
+    assert flight.stats() == {"inflight": 0, "executed": 2, "coalesced": 4, "failures": 0}
+
+
+def test_errors_propagate_to_every_waiter():
+    """A failed call raises in all coalesced callers and is not remembered"""
+    flight = SingleFlight("test")
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("gemini down")
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", boom) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert flight.failures == 1
+    assert flight.inflight == 0
+
+
+def test_cancelled_caller_does_not_cancel_shared_call():
+    """The shared call keeps running for other waiters if the first caller goes away"""
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_find_deals_coalesces_gemini_calls(monkeypatch):
+    """Concurrent find_deals calls for one item hit Gemini once"""
+    calls = []
+
+    async def fake_chat(messages, **kwargs):
+        calls.append(messages)
+        await asyncio.sleep(0.01)
+        return '[{"merchant": "Shop", "item_name": "Desk Lamp X", "price": 20.0, "url": "https://example.com"}]'
+
+    monkeypatch.setattr(deal_finder, "gemini_chat_async", fake_chat)
+    deal_finder._DEAL_CACHE.clear()
+
+    async def main():
+        return await asyncio.gather(*(deal_finder.find_deals("Desk Lamp X") for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert all(r == results[0] for r in results)
+    deal_finder._DEAL_CACHE.clear()
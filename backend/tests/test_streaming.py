@@ -0,0 +1,131 @@
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from main import app
+from utils import ai_advisor, ai_client, deal_finder
+from utils.json_stream import JsonStreamParser
+
+client = TestClient(app)
+
+ADVICE_REPLY = (
+    '```json\n{"cuts": [{"expense_id": 1, "reason": "Too many \\"}\\" snacks", "amount_saved": 12.5}],'
+    ' "next_purchases": [{"id": 3, "verdict": "postpone", "suggestion": "wait", "score": 40}]}\n```'
+)
+
+
+def chunked(text, size=7):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def parse_sse(body):
+    events = []
+    for frame in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def create_user_with_purchase(item_name="Desk Lamp", priority="high"):
+    user_id = client.post("/api/user", json={"stipend": 2000.0, "savings_goal": 300.0, "budget_cycle_start": "2025-01-01"}).json()["id"]
+    purchase = client.post("/api/planned-purchases", json={
+        "user_id": user_id, "item_name": item_name, "expected_price": 10.0,
+        "priority": priority, "desired_date": "2025-06-01",
+    }).json()
+    return user_id, purchase["id"]
+
+
+def test_parser_emits_items_as_they_complete():
+    """Array items are emitted the moment their closing brace arrives"""
+    parser = JsonStreamParser()
+    emitted = []
+    for piece in chunked(ADVICE_REPLY, 1):
+        emitted.append(parser.feed(piece))
+    items = [item for batch in emitted for item in batch]
+    assert [key for key, _ in items] == ["cuts", "next_purchases"]
+    assert items[0][1]["reason"] == 'Too many "}" snacks'
+    assert parser.finished
+
+    members = JsonStreamParser(items=False).feed('{"Lamp": [{"price": 1}], "Desk": []}')
+    assert members == [("Lamp", [{"price": 1}]), ("Desk", [])]
+
+
+def test_gemini_stream_async_yields_chunks(monkeypatch):
+    """Chunks from the blocking SDK iterator reach the event loop in order"""
+    monkeypatch.setattr(ai_client, "_get_model", lambda: None)
+    monkeypatch.setattr(ai_client, "_stream_generate", lambda model, prompt, **kw: iter(["a", "b", "c"]))
+
+    async def main():
+        return [text async for text in ai_client.gemini_stream_async([{"role": "user", "content": "hi"}])]
+
+    assert asyncio.run(main()) == ["a", "b", "c"]
+
+
+def test_advice_stream_sends_fallback_then_items(monkeypatch):
+    """SSE advice starts with heuristic verdicts, then streams parsed items, then the full advice"""
+    async def fake_stream(messages, **kwargs):
+        for piece in chunked(ADVICE_REPLY):
+            yield piece
+
+    monkeypatch.setattr(ai_advisor, "gemini_stream_async", fake_stream)
+    ai_advisor._ADVICE_CACHE.clear()
+    user_id, purchase_id = create_user_with_purchase()
+
+    response = client.get(f"/api/advice/{user_id}/stream")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert [name for name, _ in events] == ["fallback", "cut", "next_purchase", "done"]
+    assert events[0][1]["next_purchases"][0] == {
+        "id": purchase_id, "verdict": "buy_now", "suggestion": "AI unavailable, simple heuristic applied.", "score": 80,
+    }
+    assert events[-1][1]["cuts"][0]["amount_saved"] == 12.5
+
+    # The completed advice is cached for the non-streaming endpoint
+    assert client.get(f"/api/advice/{user_id}").json() == events[-1][1]
+    ai_advisor._ADVICE_CACHE.clear()
+
+
+def test_advice_stream_reports_errors(monkeypatch):
+    """A failing stream ends with an error event and the heuristic advice"""
+    async def broken_stream(messages, **kwargs):
+        yield '{"cuts": ['
+        raise asyncio.TimeoutError()
+
+    monkeypatch.setattr(ai_advisor, "gemini_stream_async", broken_stream)
+    ai_advisor._ADVICE_CACHE.clear()
+    user_id, _ = create_user_with_purchase(priority="low")
+
+    events = parse_sse(client.get(f"/api/advice/{user_id}/stream").text)
+    assert [name for name, _ in events] == ["fallback", "error", "done"]
+    assert events[-1][1]["next_purchases"][0]["verdict"] == "postpone"
+
+
+def test_deals_stream(monkeypatch):
+    """Batched deals stream one event per purchase; omitted items fall back to single lookups"""
+    def deal(name):
+        return {"merchant": "Shop", "item_name": name, "price": 10.0, "url": "https://example.com"}
+
+    async def fake_stream(messages, **kwargs):
+        for piece in chunked(json.dumps({"Kettle K7": [deal("Kettle")]})):
+            yield piece
+
+    async def fake_chat(messages, **kwargs):
+        return json.dumps([deal("Toaster")])
+
+    monkeypatch.setattr(deal_finder, "gemini_stream_async", fake_stream)
+    monkeypatch.setattr(deal_finder, "gemini_chat_async", fake_chat)
+    deal_finder._DEAL_CACHE.clear()
+    user_id, _ = create_user_with_purchase("Kettle K7")
+    create_user_with_purchase("Toaster T2")  # another user's item is not included
+    client.post("/api/planned-purchases", json={
+        "user_id": user_id, "item_name": "Toaster T3", "expected_price": 10.0,
+        "priority": "low", "desired_date": "2025-06-01",
+    })
+
+    events = parse_sse(client.get(f"/api/deals/batch/{user_id}/stream").text)
+    assert [name for name, _ in events] == ["deals", "deals", "done"]
+    by_item = {data["item_name"]: data["deals"] for name, data in events if name == "deals"}
+    assert by_item["Kettle K7"][0]["item_name"] == "Kettle"
+    assert by_item["Toaster T3"][0]["item_name"] == "Toaster"
+    deal_finder._DEAL_CACHE.clear()
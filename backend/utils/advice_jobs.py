@@ -0,0 +1,329 @@
+"""
+Asynchronous advice jobs: a persistent queue in the ``advice_jobs`` table
+worked by a bounded pool of in-process workers.
+
+``POST /api/advice/{user_id}/jobs`` answers at once with a job id (202); a
+worker runs ``generate_advice`` (cache, single-flight and heuristic fallback
+included) and stores the result, which clients read from
+``GET /api/advice/jobs/{job_id}``, optionally long-polling with ``?wait=``::
+
+    job, created = await advice_jobs.submit(db, user, priority="high")
+    job = await advice_jobs.wait(db, job.id, timeout=20)
+
+Each user has at most one queued or running job (a partial unique index, so
+this holds across worker processes too); resubmitting returns that job and can
+only raise its priority. Advice already cached for the user's current data
+completes the job on submission. Workers start with the app (lifespan) and
+pick up queued jobs left in the table by an earlier run; while idle they also
+requeue jobs that have been running for longer than ``stale_seconds``, whose
+worker must have died.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import AdviceJob, AsyncSessionLocal, User
+from utils.ai_advisor import cached_advice, generate_advice, load_advice_inputs
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+PRIORITY_NAMES = {rank: name for name, rank in PRIORITIES.items()}
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+
+class QueueFullError(Exception):
+    """Too many jobs are waiting; the client should retry later."""
+
+
+def job_record(job: AdviceJob) -> Dict[str, Any]:
+    """API representation of a job (result decoded, priority by name)."""
+    return {
+        "id": job.id,
+        "user_id": job.user_id,
+        "status": job.status,
+        "priority": PRIORITY_NAMES.get(job.priority, str(job.priority)),
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+class AdviceJobQueue:
+    """Bounded worker pool over the ``advice_jobs`` table."""
+
+    def __init__(self, workers: int = 4, max_pending: int = 500, stale_seconds: float = 300,
+                 retention_seconds: float = 86400, poll_interval: float = 1.0,
+                 sweep_seconds: float = 60, session_factory=AsyncSessionLocal):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.stale_seconds = stale_seconds
+        self.sweep_seconds = sweep_seconds
+        self.retention_seconds = retention_seconds
+        self.poll_interval = poll_interval
+        self._session_factory = session_factory
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running: Set[str] = set()
+        self._waiters: Dict[str, list] = {}  # job id -> [event, waiter count]
+        self._seq = itertools.count()
+        self._last_purge = 0.0
+        self._last_sweep = 0.0
+        self.submitted = 0
+        self.cache_hits = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.recovered = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self) -> None:
+        """Start the workers and queue the jobs an earlier run left behind."""
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._last_sweep = time.monotonic()
+        async with self._session_factory() as db:
+            await self._requeue_stale(db)
+            await self._purge(db)
+            await db.commit()
+            rows = (await db.execute(
+                select(AdviceJob.id, AdviceJob.priority)
+                .where(AdviceJob.status == QUEUED)
+                .order_by(AdviceJob.priority, AdviceJob.created_at)
+            )).all()
+        for job_id, priority in rows:
+            self._enqueue(job_id, priority)
+        self.recovered += len(rows)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancel the workers; jobs they were running are queued again."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._running:
+            async with self._session_factory() as db:
+                await db.execute(
+                    update(AdviceJob)
+                    .where(AdviceJob.id.in_(self._running), AdviceJob.status == RUNNING)
+                    .values(status=QUEUED, started_at=None)
+                )
+                await db.commit()
+            self._running.clear()
+        self._queue = None
+
+    async def submit(self, db: AsyncSession, user: User, priority: str = "normal") -> Tuple[AdviceJob, bool]:
+        """Queue advice for ``user``; returns ``(job, created)``."""
+        rank = PRIORITIES[priority]
+        existing = await self._active_job(db, user.id)
+        if existing is not None:
+            return await self._reuse(db, existing, rank), False
+
+        expenses, planned = await load_advice_inputs(db, user.id)
+        cached = await cached_advice(user, expenses, planned)
+        if cached is None and self.pending >= self.max_pending:
+            self.rejected += 1
+            raise QueueFullError("Too many advice jobs are waiting; retry later")
+
+        now = datetime.utcnow()
+        job = AdviceJob(id=uuid.uuid4().hex, user_id=user.id, priority=rank, created_at=now, status=QUEUED)
+        if cached is not None:
+            job.status, job.result, job.started_at, job.finished_at = SUCCEEDED, json.dumps(cached), now, now
+        db.add(job)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A concurrent request (possibly in another process) queued one first
+            await db.rollback()
+            existing = await self._active_job(db, user.id)
+            if existing is None:
+                raise
+            return await self._reuse(db, existing, rank), False
+
+        self.submitted += 1
+        if cached is not None:
+            self.cache_hits += 1
+        else:
+            self._enqueue(job.id, rank)
+        return job, True
+
+    async def wait(self, db: AsyncSession, job_id: str, timeout: float) -> Optional[AdviceJob]:
+        """The job once it has finished, or as it stands after ``timeout`` seconds."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        event = self._subscribe(job_id)
+        try:
+            while True:
+                # New transaction, so the read sees commits made by any worker
+                await db.rollback()
+                job = await db.get(AdviceJob, job_id, populate_existing=True)
+                remaining = deadline - loop.time()
+                if job is None or job.status not in ACTIVE_STATUSES or remaining <= 0:
+                    return job
+                # Local workers wake us; the timeout re-checks jobs run by other processes
+                try:
+                    await asyncio.wait_for(event.wait(), min(remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._unsubscribe(job_id)
+
+    async def _active_job(self, db: AsyncSession, user_id: int) -> Optional[AdviceJob]:
+        return await db.scalar(
+            select(AdviceJob).where(AdviceJob.user_id == user_id, AdviceJob.status.in_(ACTIVE_STATUSES))
+        )
+
+    async def _reuse(self, db: AsyncSession, job: AdviceJob, rank: int) -> AdviceJob:
+        self.deduplicated += 1
+        if job.status == QUEUED and rank < job.priority:
+            job.priority = rank
+            await db.commit()
+            # The old queue entry is skipped when claimed after this one
+            self._enqueue(job.id, rank)
+        return job
+
+    def _enqueue(self, job_id: str, rank: int) -> None:
+        # Without running workers the job stays queued in the table until start()
+        if self._queue is not None:
+            self._queue.put_nowait((rank, next(self._seq), job_id))
+
+    async def _worker(self) -> None:
+        while True:
+            try:
+                _, _, job_id = await asyncio.wait_for(self._queue.get(), self.sweep_seconds)
+            except asyncio.TimeoutError:
+                # Idle: requeue jobs whose worker died since start (or in another process)
+                if time.monotonic() - self._last_sweep >= self.sweep_seconds:
+                    try:
+                        await self._sweep()
+                    except Exception:
+                        logging.exception("Advice job sweep failed")
+                continue
+            try:
+                await self._run(job_id)
+            except Exception:
+                logging.exception("Advice job %s crashed", job_id)
+
+    async def _run(self, job_id: str) -> None:
+        async with self._session_factory() as db:
+            claimed = await db.execute(
+                update(AdviceJob)
+                .where(AdviceJob.id == job_id, AdviceJob.status == QUEUED)
+                .values(status=RUNNING, started_at=datetime.utcnow())
+            )
+            await db.commit()
+            if claimed.rowcount != 1:
+                return  # finished elsewhere, or a superseded queue entry
+            self._running.add(job_id)
+            job = await db.get(AdviceJob, job_id)
+            user = await db.get(User, job.user_id)
+            if user is not None:
+                expenses, planned = await load_advice_inputs(db, user.id)
+
+        # No session is held while the LLM call runs
+        try:
+            if user is None:
+                raise LookupError("User not found")
+            values = {"status": SUCCEEDED, "result": json.dumps(await generate_advice(user, expenses, planned))}
+            self.completed += 1
+        except Exception as e:
+            logging.exception("Advice job %s failed", job_id)
+            values = {"status": FAILED, "error": str(e) or type(e).__name__}
+            self.failed += 1
+
+        async with self._session_factory() as db:
+            await db.execute(
+                update(AdviceJob).where(AdviceJob.id == job_id).values(finished_at=datetime.utcnow(), **values)
+            )
+            if time.monotonic() - self._last_purge > min(self.retention_seconds, 3600):
+                await self._purge(db)
+            await db.commit()
+        self._running.discard(job_id)
+        self._notify(job_id)
+
+    async def _requeue_stale(self, db: AsyncSession) -> List[Tuple[str, int]]:
+        """Queue again the jobs running for longer than stale_seconds; they lost their worker."""
+        stale = datetime.utcnow() - timedelta(seconds=self.stale_seconds)
+        result = await db.execute(
+            update(AdviceJob)
+            .where(AdviceJob.status == RUNNING, AdviceJob.started_at < stale, AdviceJob.id.not_in(self._running))
+            .values(status=QUEUED, started_at=None)
+            .returning(AdviceJob.id, AdviceJob.priority)
+        )
+        return result.all()
+
+    async def _sweep(self) -> None:
+        self._last_sweep = time.monotonic()
+        async with self._session_factory() as db:
+            rows = await self._requeue_stale(db)
+            await db.commit()
+        for job_id, priority in rows:
+            self._enqueue(job_id, priority)
+        self.recovered += len(rows)
+
+    async def _purge(self, db: AsyncSession) -> None:
+        """Delete finished jobs older than the retention period."""
+        self._last_purge = time.monotonic()
+        expired = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        await db.execute(
+            delete(AdviceJob).where(AdviceJob.status.in_((SUCCEEDED, FAILED)), AdviceJob.finished_at < expired)
+        )
+
+    def _subscribe(self, job_id: str) -> asyncio.Event:
+        entry = self._waiters.setdefault(job_id, [asyncio.Event(), 0])
+        entry[1] += 1
+        return entry[0]
+
+    def _unsubscribe(self, job_id: str) -> None:
+        entry = self._waiters.get(job_id)
+        if entry is not None:
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._waiters[job_id]
+
+    def _notify(self, job_id: str) -> None:
+        entry = self._waiters.get(job_id)
+        if entry is not None:
+            entry[0].set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "queue_depth": self.pending,
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "cache_hits": self.cache_hits,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "recovered": self.recovered,
+        }
+
+
+advice_jobs = AdviceJobQueue(
+    workers=int(os.getenv("ADVICE_JOB_WORKERS", "4")),
+    max_pending=int(os.getenv("ADVICE_JOB_MAX_PENDING", "500")),
+    stale_seconds=float(os.getenv("ADVICE_JOB_STALE_SECONDS", "300")),
+    retention_seconds=float(os.getenv("ADVICE_JOB_RETENTION_SECONDS", "86400")),
+    sweep_seconds=float(os.getenv("ADVICE_JOB_SWEEP_SECONDS", "60")),
+)
@@ -0,0 +1,32 @@
+"""SQL-side aggregation of expenses.
+
+``expense_bucket_query`` pushes the SUM / COUNT / MIN / MAX and GROUP BY work
+into the database; ``utils.rollups`` uses it to build and backfill the
+per-user daily/category rollups that the summary endpoints read.
+"""
+
+from typing import Optional
+
+from sqlalchemy import func, select, Select
+
+from models import Expense
+
+
+def expense_bucket_query(user_id: Optional[int] = None) -> Select:
+    """
+    SELECT user_id, day, category, count, total, min, max grouped per
+    (user, day, category) - the shape of the expense_rollups table.
+    """
+    query = select(
+        Expense.user_id,
+        Expense.expense_date,
+        Expense.category,
+        func.count(Expense.id),
+        func.sum(Expense.amount),
+        func.min(Expense.amount),
+        func.max(Expense.amount),
+    )
+    if user_id is not None:
+        query = query.where(Expense.user_id == user_id)
+    return query.group_by(Expense.user_id, Expense.expense_date, Expense.category)
+
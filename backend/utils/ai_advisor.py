@@ -3,13 +3,19 @@ import logging, traceback
 
 """AI-driven advisor that consults Gemini to analyse spending and planned purchases."""
 
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Optional, Tuple
 import json
-from datetime import date
+import os
 from hashlib import sha256
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from models import User, Expense, PlannedPurchase
-from utils.ai_client import gemini_chat
+from utils.ai_client import CircuitOpenError, gemini_chat_async, gemini_stream_async
+from utils.json_stream import JsonStreamParser
+from utils.cache import create_cache
+from utils.singleflight import create_single_flight
 
 
 SYSTEM_PROMPT = (
@@ -23,18 +29,27 @@ SYSTEM_PROMPT = (
 
 
 # ---------------------------------------------------------------------------
-# Simple in-memory cache to avoid excessive LLM calls. Resets on backend restart.
-# Key: (user_id, day_str, purchases_signature)
+# Bounded cache to avoid excessive LLM calls.
+# Key: (user_id, payload_digest) - advice is reused until the inputs change
 # Value: advice dict
 # ---------------------------------------------------------------------------
 
-_ADVICE_CACHE: dict[tuple, Dict[str, Any]] = {}
+_ADVICE_CACHE = create_cache(
+    "advice",
+    max_entries=int(os.getenv("ADVICE_CACHE_MAX_ENTRIES", "2048")),
+    max_bytes=int(os.getenv("ADVICE_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("ADVICE_CACHE_TTL_SECONDS", str(7 * 86400))),
+)
+_ADVICE_FLIGHTS = create_single_flight("advice")
+
+# Number of expenses the model sees; routes only need to load this many
+ADVICE_EXPENSE_LIMIT = 10
 
 
 def _summarise_expenses(expenses: List[Expense]) -> List[Dict[str, Any]]:
     """Return a lightweight list to send to the LLM (max 10 biggest discretionary)."""
-    # Sort by amount desc
-    top_exp = sorted(expenses, key=lambda e: e.amount, reverse=True)[:10]
+    # Sort by amount desc, ties by id so the payload (and its digest) is stable
+    top_exp = sorted(expenses, key=lambda e: (-e.amount, e.id))[:ADVICE_EXPENSE_LIMIT]
     return [
         {
             "id": e.id,
@@ -60,65 +75,167 @@ def _serialise_purchases(plans: List[PlannedPurchase]) -> List[Dict[str, Any]]:
     ]
 
 
-def generate_advice(user: User, expenses: List[Expense], planned_purchases: List[PlannedPurchase]) -> Dict[str, Any]:
-    """Return structured advice using Gemini; fallback to heuristics on error."""
-    user_profile = {
-        "stipend": user.stipend,
-        "savings_goal": user.savings_goal,
+def _advice_payload(
+    user: User, expenses: List[Expense], planned_purchases: List[PlannedPurchase]
+) -> Dict[str, Any]:
+    """The exact data sent to the model; the cache key is derived from it."""
+    return {
+        "user": {
+            "stipend": user.stipend,
+            "savings_goal": user.savings_goal,
+        },
+        "recent_expenses": _summarise_expenses(expenses),
+        "planned_purchases": _serialise_purchases(planned_purchases),
     }
 
-    # create cache key
-    today_str = date.today().isoformat()
-    sig_src = json.dumps(_serialise_purchases(planned_purchases), sort_keys=True)
-    purchases_sig = sha256(sig_src.encode()).hexdigest()
-    cache_key = (user.id, today_str, purchases_sig)
 
-    if cache_key in _ADVICE_CACHE:
-        return _ADVICE_CACHE[cache_key]
+def _advice_cache_key(user: User, payload: Dict[str, Any]) -> tuple:
+    # Key: (user_id, digest of prompt + payload). Any change to the profile,
+    # the top expenses or the plans yields a new key; nothing else expires it.
+    digest_src = json.dumps({"prompt": SYSTEM_PROMPT, "payload": payload}, sort_keys=True)
+    return (user.id, sha256(digest_src.encode()).hexdigest())
 
-    payload = {
-        "user": user_profile,
-        "recent_expenses": _summarise_expenses(expenses),
-        "planned_purchases": _serialise_purchases(planned_purchases),
-    }
 
-    messages = [
+def _advice_messages(payload: Dict[str, Any]) -> List[Dict[str, str]]:
+    return [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": json.dumps(payload)},
     ]
 
+
+async def load_advice_inputs(
+    db: AsyncSession, user_id: int
+) -> Tuple[List[Expense], List[PlannedPurchase]]:
+    """Load what the advisor sends to the model: the largest expenses and all plans."""
+    expenses = (await db.scalars(
+        select(Expense)
+        .where(Expense.user_id == user_id)
+        .order_by(Expense.amount.desc(), Expense.id)
+        .limit(ADVICE_EXPENSE_LIMIT)
+    )).all()
+    planned = (await db.scalars(select(PlannedPurchase).where(PlannedPurchase.user_id == user_id))).all()
+    return expenses, planned
+
+
+async def cached_advice(
+    user: User, expenses: List[Expense], planned_purchases: List[PlannedPurchase]
+) -> Optional[Dict[str, Any]]:
+    """Advice already cached for exactly these inputs, if any (no LLM call)."""
+    return await _ADVICE_CACHE.get_async(_advice_cache_key(user, _advice_payload(user, expenses, planned_purchases)))
+
+
+def _parse_advice(reply: str) -> Dict[str, Any]:
+    """Parse a Gemini reply into the advice dict; raises on malformed output."""
+    # Gemini may prepend annotations; try strict parse then fallback to extracting first JSON block.
+    try:
+        data = json.loads(reply)
+    except json.JSONDecodeError:
+        start = reply.find('{')
+        end = reply.rfind('}')
+        if start != -1 and end != -1 and start < end:
+            data = json.loads(reply[start:end+1])
+        else:
+            raise
+    # basic structure check
+    if not isinstance(data, dict):
+        raise ValueError("Expected dict")
+    data.setdefault("cuts", [])
+    data.setdefault("next_purchases", [])
+    return data
+
+
+def _fallback_advice(planned_purchases: List[PlannedPurchase]) -> Dict[str, Any]:
+    # naive fallback: mark high-priority plans as buy_now else postpone
+    fallback_next = []
+    for p in planned_purchases:
+        verdict = "buy_now" if p.priority == "high" else "postpone"
+        fallback_next.append({
+            "id": p.id,
+            "verdict": verdict,
+            "suggestion": "AI unavailable, simple heuristic applied.",
+            "score": 80 if verdict == "buy_now" else 40,
+        })
+    return {"cuts": [], "next_purchases": fallback_next}
+
+
+async def generate_advice(user: User, expenses: List[Expense], planned_purchases: List[PlannedPurchase]) -> Dict[str, Any]:
+    """Return structured advice using Gemini; fallback to heuristics on error."""
+    payload = _advice_payload(user, expenses, planned_purchases)
+    cache_key = _advice_cache_key(user, payload)
+    cached = await _ADVICE_CACHE.get_async(cache_key)
+    if cached is not None:
+        return cached
+
+    messages = _advice_messages(payload)
+    # Concurrent misses for the same key (retries, several tabs) share one Gemini call
+    return await _ADVICE_FLIGHTS.do(
+        cache_key, lambda: _request_advice(messages, planned_purchases, cache_key)
+    )
+
+
+async def _request_advice(
+    messages: List[Dict[str, str]],
+    planned_purchases: List[PlannedPurchase],
+    cache_key: tuple,
+) -> Dict[str, Any]:
+    """Ask Gemini for advice and cache the parsed reply; heuristic fallback on error."""
     try:
-        reply = gemini_chat(messages, temperature=0.2)
-        # Gemini may prepend annotations; try strict parse then fallback to extracting first JSON block.
-        try:
-            data = json.loads(reply)
-        except json.JSONDecodeError:
-            start = reply.find('{')
-            end = reply.rfind('}')
-            if start != -1 and end != -1 and start < end:
-                try:
-                    data = json.loads(reply[start:end+1])
-                except Exception:
-                    raise
-            else:
-                raise
-        # basic structure check
-        if not isinstance(data, dict):
-            raise ValueError("Expected dict")
-        data.setdefault("cuts", [])
-        data.setdefault("next_purchases", [])
-        _ADVICE_CACHE[cache_key] = data
+        reply = await gemini_chat_async(messages, temperature=0.2, endpoint="advice")
+        data = _parse_advice(reply)
+        await _ADVICE_CACHE.set_async(cache_key, data)
         return data
+    except CircuitOpenError:
+        # Gemini is known to be down; serve the heuristic without waiting
+        return _fallback_advice(planned_purchases)
     except Exception as e:  # pragma: no cover – fallback when LLM fails
         logging.error("Gemini error:\n%s", traceback.format_exc())
-        # naive fallback: mark high-priority plans as buy_now else postpone
-        fallback_next = []
-        for p in planned_purchases:
-            verdict = "buy_now" if p.priority == "high" else "postpone"
-            fallback_next.append({
-                "id": p.id,
-                "verdict": verdict,
-                "suggestion": "AI unavailable, simple heuristic applied.",
-                "score": 80 if verdict == "buy_now" else 40,
-            })
-        return {"cuts": [], "next_purchases": fallback_next} 
\ No newline at end of file
+        return _fallback_advice(planned_purchases)
+
+
+# Stream event emitted for each item of the advice's top-level arrays
+_STREAM_EVENTS = {"cuts": "cut", "next_purchases": "next_purchase"}
+
+
+async def stream_advice(
+    user: User, expenses: List[Expense], planned_purchases: List[PlannedPurchase]
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Yield ``(event, data)`` pairs while advice is generated.
+
+    The heuristic verdicts come first (``fallback``) so the client has
+    something to show immediately, then every ``cut`` / ``next_purchase``
+    as soon as it parses from Gemini's stream, and finally ``done`` with the
+    full advice (the heuristic one, after an ``error`` event, if Gemini fails).
+    """
+    fallback = _fallback_advice(planned_purchases)
+    yield "fallback", fallback
+
+    payload = _advice_payload(user, expenses, planned_purchases)
+    cache_key = _advice_cache_key(user, payload)
+    cached = await _ADVICE_CACHE.get_async(cache_key)
+    if cached is not None:
+        for key, event in _STREAM_EVENTS.items():
+            for item in cached[key]:
+                yield event, item
+        yield "done", cached
+        return
+
+    parser = JsonStreamParser()
+    chunks = []
+    try:
+        messages = _advice_messages(payload)
+        async for text in gemini_stream_async(messages, temperature=0.2, endpoint="advice"):
+            chunks.append(text)
+            for key, item in parser.feed(text):
+                if key in _STREAM_EVENTS:
+                    yield _STREAM_EVENTS[key], item
+        data = _parse_advice("".join(chunks))
+    except Exception as e:
+        if not isinstance(e, CircuitOpenError):
+            logging.error("Gemini streaming error:\n%s", traceback.format_exc())
+        yield "error", {"detail": "AI unavailable, simple heuristic applied."}
+        yield "done", fallback
+        return
+
+    await _ADVICE_CACHE.set_async(cache_key, data)
+    yield "done", data
@@ -11,15 +11,52 @@ Usage example::
     ])
     print(reply)
 
+Async handlers should use ``gemini_chat_async`` / ``gemini_generate_async``,
+which run the blocking SDK call on a bounded thread pool with a per-call
+timeout so a slow LLM reply never stalls the event loop::
+
+    reply = await gemini_chat_async(messages, timeout=15)
+
+Each async call can name its ``endpoint`` ("advice", "deals") to use that
+endpoint's latency budget (``GEMINI_DEADLINE_<ENDPOINT>_SECONDS``). A shared
+circuit breaker opens after repeated failures or slow calls; while it is open
+calls raise ``CircuitOpenError`` at once so callers serve their heuristic
+fallbacks instead of waiting on a dead dependency.
+
+``gemini_stream_async`` yields the reply in chunks as Gemini generates it::
+
+    async for text in gemini_stream_async(messages):
+        ...
+
+Prompts go to a pluggable backend: Gemini by default, any OpenAI-compatible
+endpoint (``LLM_BACKEND=openai``, e.g. a local server via ``OPENAI_BASE_URL``),
+or a local stand-in (``stub``, ``record``, ``replay``; see
+``utils.llm_backends``) for load tests and offline benchmarks.
+``set_backend`` installs one directly.
+
+With ``LLM_HEDGE_BACKEND`` set, async calls are hedged: if the primary has not
+answered within its recent p95 latency for the endpoint, the same prompt goes
+to the secondary and whichever replies first wins; a primary error fails over
+to the secondary at once. Streams use the primary only.
+
 The module autoloads environment variables from a .env file (if present).
-It will raise ``RuntimeError`` at import-time if *GEMINI_API_KEY* is not found.
+Importing it is cheap: the Gemini SDK is imported, configured and the model
+built on the first call, so non-AI endpoints start (and serve) without the SDK
+or a key. A missing *GEMINI_API_KEY* raises ``RuntimeError`` from that first
+call instead; callers already fall back to heuristics on errors, and the next
+call retries the initialisation.
 """
 
+import asyncio
+import functools
 import os
-from typing import List, Dict, Any
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator, List, Dict, Any, Optional
 
 from dotenv import load_dotenv
-import google.generativeai as genai
 
 # ---------------------------------------------------------------------------
 # Environment & client configuration
@@ -28,31 +65,403 @@ import google.generativeai as genai
 # Load variables from .env file (if it exists) _before_ reading GEMINI_API_KEY.
 load_dotenv()
 
-_GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not _GEMINI_API_KEY:
-    raise RuntimeError(
-        "GEMINI_API_KEY is not set. Create a .env file or export it in your shell."
-    )
-
-# Configure the global client.
-# `genai` handles authentication internally once this is done.
-genai.configure(api_key=_GEMINI_API_KEY)
-
 # Allow overriding the model via environment variable for flexibility. Default
-# to the newer versioned model names. If that fails at runtime, the helper
-# later tries a legacy fallback.
+# to the newer versioned model names. A model the API reports as "not found"
+# is retried once with GEMINI_FALLBACK_MODEL (empty disables the retry); use
+# LLM_HEDGE_BACKEND to fail over to another provider.
 _DEFAULT_MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-1.0-pro")
+_FALLBACK_MODEL_NAME = os.getenv("GEMINI_FALLBACK_MODEL", "gemini-pro")
+
+# Built on first use by _get_model(); guarded so concurrent first calls from
+# the thread pool initialise the SDK only once.
+_model = None
+_fallback_model = None
+_model_lock = threading.Lock()
+
+
+def _genai():
+    """Import the Gemini SDK on demand (it is slow to import)."""
+    import google.generativeai as genai
+    return genai
+
+
+def _get_model():
+    """Return the cached ``GenerativeModel``, configuring the SDK on first use."""
+    global _model
+    if _model is not None:
+        return _model
+    with _model_lock:
+        if _model is None:
+            api_key = os.getenv("GEMINI_API_KEY")
+            if not api_key:
+                raise RuntimeError(
+                    "GEMINI_API_KEY is not set. Create a .env file or export it in your shell."
+                )
+            genai = _genai()
+            # Configure the global client.
+            # `genai` handles authentication internally once this is done.
+            genai.configure(api_key=api_key)
+
+            # Attempt to instantiate the model; if it is not found, fall back to the legacy
+            # name (GEMINI_FALLBACK_MODEL). This keeps the code working across different
+            # SDK / API versions without forcing users to keep track.
+            try:
+                _model = genai.GenerativeModel(_DEFAULT_MODEL_NAME)
+            except Exception as _e:  # pragma: no cover
+                if "not found" in str(_e).lower() and _FALLBACK_MODEL_NAME and _DEFAULT_MODEL_NAME != _FALLBACK_MODEL_NAME:
+                    _model = genai.GenerativeModel(_FALLBACK_MODEL_NAME)
+                else:
+                    raise
+    return _model
+
+
+def _get_fallback_model():
+    """Return the cached ``GEMINI_FALLBACK_MODEL`` model (built once, like the primary)."""
+    global _fallback_model
+    if _fallback_model is None:
+        _get_model()  # configures the SDK
+        with _model_lock:
+            if _fallback_model is None:
+                _fallback_model = _genai().GenerativeModel(_FALLBACK_MODEL_NAME)
+    return _fallback_model
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+class GeminiBackend:
+    """Default backend: blocking Gemini SDK calls (run on the shared pool by the async helpers)."""
+
+    name = "gemini"
+
+    def generate(self, prompt: str, *, temperature: float = 0.7, **kwargs: Any) -> str:
+        return _safe_generate(_get_model(), prompt, temperature=temperature, **kwargs)
+
+    def stream(self, prompt: str, *, temperature: float = 0.7, **kwargs: Any) -> Iterator[str]:
+        return _stream_generate(_get_model(), prompt, temperature=temperature, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "model": _DEFAULT_MODEL_NAME}
+
+
+class OpenAIBackend:
+    """
+    Any OpenAI-compatible chat completions endpoint: OpenAI itself or a local
+    server (vLLM, Ollama, llama.cpp) via ``base_url``. One client, and so one
+    keep-alive connection pool, is built on first use and shared by all calls.
+    """
+
+    name = "openai"
+
+    def __init__(self, model: str, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 max_connections: int = 8, timeout: float = 20.0):
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if not self.api_key and not self.base_url:
+                        raise RuntimeError("OPENAI_API_KEY is not set (or point OPENAI_BASE_URL at a local server).")
+                    import httpx
+                    import openai
+                    limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+                    self._client = openai.OpenAI(
+                        api_key=self.api_key or "unused",  # local servers usually ignore it
+                        base_url=self.base_url,
+                        max_retries=0,  # deadlines, the breaker and hedging decide on retries
+                        timeout=self.timeout,
+                        http_client=httpx.Client(limits=limits, timeout=self.timeout),
+                    )
+        return self._client
+
+    def _create(self, prompt: str, temperature: float, **kwargs: Any):
+        return self._get_client().chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            **kwargs,
+        )
+
+    def generate(self, prompt: str, *, temperature: float = 0.7, **kwargs: Any) -> str:
+        return self._create(prompt, temperature, **kwargs).choices[0].message.content or ""
+
+    def stream(self, prompt: str, *, temperature: float = 0.7, **kwargs: Any) -> Iterator[str]:
+        for chunk in self._create(prompt, temperature, stream=True, **kwargs):
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                yield text
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "model": self.model, "base_url": self.base_url}
+
+
+def make_backend(name: str):
+    """Build a backend by name: gemini, openai, stub, record or replay (configured from the environment)."""
+    name = name.lower()
+    if name == "gemini":
+        return GeminiBackend()
+    if name == "openai":
+        return OpenAIBackend(
+            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            api_key=os.getenv("OPENAI_API_KEY") or None,
+            max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", str(2 * _MAX_CONCURRENCY))),
+            timeout=_DEFAULT_TIMEOUT,
+        )
+    from utils import llm_backends
+    live = None
+    if name == "record":
+        # Only a real backend is worth recording (and stand-ins would recurse)
+        live_name = os.getenv("LLM_RECORD_BACKEND", "gemini").lower()
+        if live_name not in ("gemini", "openai"):
+            raise ValueError(f"Unsupported LLM_RECORD_BACKEND: {live_name!r} (expected gemini or openai)")
+        live = make_backend(live_name)
+    return llm_backends.backend_from_env(name, live)
+
+
+# Chosen from LLM_BACKEND / LLM_HEDGE_BACKEND on first use, like the model
+_backend = None
+_hedge_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The backend every call goes to (``LLM_BACKEND``, Gemini by default)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = make_backend(os.getenv("LLM_BACKEND", "gemini"))
+    return _backend
+
+
+def set_backend(backend):
+    """Install ``backend`` (None: back to the ``LLM_BACKEND`` default); returns the previous one."""
+    global _backend
+    with _backend_lock:
+        previous, _backend = _backend, backend
+    return previous
+
+
+def get_hedge_backend():
+    """The secondary backend for hedged calls (``LLM_HEDGE_BACKEND``), or None when hedging is off."""
+    global _hedge_backend
+    name = os.getenv("LLM_HEDGE_BACKEND", "")
+    if _hedge_backend is None and name:
+        with _backend_lock:
+            if _hedge_backend is None:
+                _hedge_backend = make_backend(name)
+    return _hedge_backend
+
+
+def set_hedge_backend(backend):
+    """Install the secondary backend (None: back to ``LLM_HEDGE_BACKEND``); returns the previous one."""
+    global _hedge_backend
+    with _backend_lock:
+        previous, _hedge_backend = _hedge_backend, backend
+    return previous
+
+# Async calls share a bounded pool: at most GEMINI_MAX_CONCURRENCY requests are
+# in flight per worker, the rest queue. GEMINI_TIMEOUT_SECONDS caps the wait
+# (queueing included) for a single call.
+_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+_DEFAULT_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "20"))
+_executor = ThreadPoolExecutor(max_workers=_MAX_CONCURRENCY, thread_name_prefix="gemini")
+
+
+def deadline_for(endpoint: Optional[str]) -> float:
+    """Latency budget for ``endpoint`` (``GEMINI_DEADLINE_<ENDPOINT>_SECONDS``), else the default timeout."""
+    if endpoint:
+        value = os.getenv(f"GEMINI_DEADLINE_{endpoint.upper()}_SECONDS")
+        if value:
+            return float(value)
+    return _DEFAULT_TIMEOUT
+
+# ---------------------------------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------------------------------
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling Gemini while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency so callers can fall back immediately.
+
+    *closed*: calls go through; ``failure_threshold`` consecutive failures
+    (errors, timeouts, or calls slower than ``slow_call_seconds``) open it.
+    *open*: calls are rejected with ``CircuitOpenError`` for ``reset_seconds``.
+    *half_open*: one probe call is let through; success closes the breaker,
+    failure opens it again.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        slow_call_seconds: Optional[float] = None,
+        reset_seconds: float = 30.0,
+        clock=time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self.calls = 0
+        self.failures = 0
+        self.slow_calls = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == "open" and self._clock() - self._opened_at >= self.reset_seconds:
+            self._state = "half_open"
+        return self._state
+
+    def allow(self) -> bool:
+        """Reserve a call; False means the caller should fall back right away."""
+        with self._lock:
+            state = self._current_state()
+            if state == "closed" or (state == "half_open" and not self._probe_in_flight):
+                self._probe_in_flight = state == "half_open"
+                self.calls += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, duration: float) -> None:
+        if self.slow_call_seconds is not None and duration >= self.slow_call_seconds:
+            with self._lock:
+                self.slow_calls += 1
+            self.record_failure(count_failure=False)
+            return
+        with self._lock:
+            self._probe_in_flight = False
+            self.consecutive_failures = 0
+            self._state = "closed"
+
+    def record_failure(self, count_failure: bool = True) -> None:
+        with self._lock:
+            if count_failure:
+                self.failures += 1
+            self.consecutive_failures += 1
+            if self._probe_in_flight or self.consecutive_failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.times_opened += 1
+                self._state = "open"
+                self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Give back a reserved call that ended without an outcome (caller cancelled)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self.consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "slow_call_seconds": self.slow_call_seconds,
+                "reset_seconds": self.reset_seconds,
+                "calls": self.calls,
+                "failures": self.failures,
+                "slow_calls": self.slow_calls,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+            }
+
+
+_breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", "5")),
+    slow_call_seconds=float(os.getenv("GEMINI_BREAKER_SLOW_SECONDS", "10")),
+    reset_seconds=float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30")),
+)
 
-# Attempt to instantiate the model; if it is not found, fall back to the legacy
-# name used in earlier SDK examples ("gemini-pro"). This keeps the code working
-# across different SDK / API versions without forcing users to keep track.
-try:
-    _model = genai.GenerativeModel(_DEFAULT_MODEL_NAME)
-except Exception as _e:  # pragma: no cover
-    if "not found" in str(_e).lower() and _DEFAULT_MODEL_NAME != "gemini-pro":
-        _model = genai.GenerativeModel("gemini-pro")
-    else:
-        raise
+
+# ---------------------------------------------------------------------------
+# Hedged requests
+# ---------------------------------------------------------------------------
+
+class LatencyWindow:
+    """Durations of the most recent successful calls, for percentile estimates."""
+
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: deque = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """The ``pct`` percentile, or None until ``min_samples`` calls were seen."""
+        with self._lock:
+            ordered = sorted(self._samples)
+        if len(ordered) < self.min_samples:
+            return None
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+# The hedge fires once the primary has taken longer than its recent
+# LLM_HEDGE_PERCENTILE latency for the endpoint (LLM_HEDGE_INITIAL_DELAY_SECONDS
+# until enough calls were seen). Hedges run on their own pool so they never
+# queue behind the slow primaries they are meant to overtake.
+_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+_HEDGE_INITIAL_DELAY = float(os.getenv("LLM_HEDGE_INITIAL_DELAY_SECONDS", "2"))
+_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY_SECONDS", "0.05"))
+_hedge_executor = ThreadPoolExecutor(max_workers=_MAX_CONCURRENCY, thread_name_prefix="llm-hedge")
+_latencies: Dict[str, LatencyWindow] = {}
+_hedge_counts = {"hedged": 0, "hedge_wins": 0, "failovers": 0}
+
+
+def _latency_window(endpoint: Optional[str]) -> LatencyWindow:
+    return _latencies.setdefault(endpoint or "default", LatencyWindow())
+
+
+def hedge_delay(endpoint: Optional[str]) -> float:
+    """Seconds the primary gets for ``endpoint`` before the hedge is sent."""
+    observed = _latency_window(endpoint).percentile(_HEDGE_PERCENTILE)
+    return max(_HEDGE_MIN_DELAY, _HEDGE_INITIAL_DELAY if observed is None else observed)
+
+
+def resilience_stats() -> Dict[str, Any]:
+    """Breaker state, configured deadlines, backend and hedging counters, for the metrics view."""
+    hedge = get_hedge_backend()
+    return {
+        "breaker": _breaker.stats(),
+        "deadlines": {name: deadline_for(name) for name in ("advice", "deals")},
+        "default_timeout": _DEFAULT_TIMEOUT,
+        "backend": get_backend().stats(),
+        "hedging": {
+            "backend": hedge.stats() if hedge is not None else None,
+            "percentile": _HEDGE_PERCENTILE,
+            "delays": {name: round(hedge_delay(name), 4) for name in sorted(_latencies)},
+            **_hedge_counts,
+        },
+    }
 
 # ---------------------------------------------------------------------------
 # Public helper functions
@@ -64,8 +473,8 @@ def _safe_generate(model, prompt, *, temperature: float = 0.7, **kwargs):
         return model.generate_content(prompt, generation_config={"temperature": temperature, **kwargs}).text
     except Exception as e:
         msg = str(e).lower()
-        if "not found" in msg and model.model_name != "gemini-pro":
-            legacy = genai.GenerativeModel("gemini-pro")
+        if "not found" in msg and _FALLBACK_MODEL_NAME and not model.model_name.endswith(_FALLBACK_MODEL_NAME):
+            legacy = _get_fallback_model()
             return legacy.generate_content(prompt, generation_config={"temperature": temperature, **kwargs}).text
         raise
 
@@ -76,6 +485,229 @@ def gemini_chat(messages: List[Dict[str, str]], *, temperature: float = 0.7, **k
     ``messages`` must be a list of dicts with *role* ("system" | "user" | "model")
     and *content* keys, similar to OpenAI's Chat API.
     """
+    return get_backend().generate(_build_prompt(messages), temperature=temperature, **kwargs)
+
+
+def gemini_generate(prompt: str, *, temperature: float = 0.7, **kwargs: Any) -> str:
+    """Shortcut for single-prompt content generation."""
+    return get_backend().generate(prompt, temperature=temperature, **kwargs)
+
+
+async def gemini_chat_async(
+    messages: List[Dict[str, str]],
+    *,
+    temperature: float = 0.7,
+    timeout: Optional[float] = None,
+    endpoint: Optional[str] = None,
+    **kwargs: Any,
+) -> str:
+    """Async counterpart of :func:`gemini_chat`.
+
+    Raises ``asyncio.TimeoutError`` if no reply arrives within ``timeout``
+    seconds (by default the ``endpoint``'s deadline, see :func:`deadline_for`),
+    and ``CircuitOpenError`` without calling Gemini while the breaker is open.
+    """
+    return await gemini_generate_async(
+        _build_prompt(messages), temperature=temperature, timeout=timeout, endpoint=endpoint, **kwargs
+    )
+
+
+class _BreakerCall:
+    """A call reserved with ``_breaker.allow()``; only its first outcome is recorded."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.settled = False
+
+    def _settle(self) -> bool:
+        settled, self.settled = self.settled, True
+        return not settled
+
+    def success(self) -> None:
+        if self._settle():
+            _breaker.record_success(time.monotonic() - self.started)
+
+    def failure(self) -> None:
+        if self._settle():
+            _breaker.record_failure()
+
+    def release(self) -> None:
+        if self._settle():
+            _breaker.release()
+
+    def settle_from(self, future: "asyncio.Future[Any]") -> None:
+        """Done callback for the primary attempt."""
+        if future.cancelled():
+            return  # cancelled with the caller; gemini_generate_async settles the call
+        if future.exception() is not None:
+            self.failure()
+        else:
+            self.success()
+
+
+async def gemini_generate_async(
+    prompt: str,
+    *,
+    temperature: float = 0.7,
+    timeout: Optional[float] = None,
+    endpoint: Optional[str] = None,
+    **kwargs: Any,
+) -> str:
+    """Async counterpart of :func:`gemini_generate` (hedged when a secondary backend is set).
+
+    The circuit breaker only sees the primary backend's outcome, so a hedge
+    answering for a dead primary does not keep the breaker closed.
+    """
+    if not _breaker.allow():
+        raise CircuitOpenError("Gemini circuit breaker is open")
+    call = _BreakerCall()
+    try:
+        return await asyncio.wait_for(
+            _generate_hedged(prompt, endpoint, call, temperature=temperature, **kwargs),
+            deadline_for(endpoint) if timeout is None else timeout,
+        )
+    except asyncio.CancelledError:
+        call.release()
+        raise
+    except Exception:
+        # Missed the deadline, or the primary already failed (then a no-op)
+        call.failure()
+        raise
+
+
+def _timed_generate(endpoint: Optional[str], prompt: str, **kwargs: Any) -> str:
+    # gemini_generate resolves the backend and model inside the worker
+    # thread, so the one-off SDK import never runs on the event loop
+    started = time.monotonic()
+    reply = gemini_generate(prompt, **kwargs)
+    _latency_window(endpoint).record(time.monotonic() - started)
+    return reply
+
+
+def _retrieve_outcome(future: "asyncio.Future[Any]") -> None:
+    # A call that lost the race (or outlived its caller) may still fail;
+    # fetch the error so it is not reported as never retrieved
+    if not future.cancelled():
+        future.exception()
+
+
+async def _generate_hedged(prompt: str, endpoint: Optional[str], call: _BreakerCall, **kwargs: Any) -> str:
+    loop = asyncio.get_running_loop()
+    primary = loop.run_in_executor(_executor, functools.partial(_timed_generate, endpoint, prompt, **kwargs))
+    primary.add_done_callback(_retrieve_outcome)
+    # Settled when the primary finishes, even if the hedge answered first
+    primary.add_done_callback(call.settle_from)
+    hedge = get_hedge_backend()
+    if hedge is None:
+        return await primary
+
+    try:
+        return await asyncio.wait_for(asyncio.shield(primary), hedge_delay(endpoint))
+    except asyncio.TimeoutError:
+        _hedge_counts["hedged"] += 1
+        failed_over = False
+    except Exception:
+        _hedge_counts["failovers"] += 1
+        failed_over = True
+    secondary = loop.run_in_executor(_hedge_executor, functools.partial(hedge.generate, prompt, **kwargs))
+    secondary.add_done_callback(_retrieve_outcome)
+    if failed_over:
+        return await secondary
+
+    # Whichever backend answers first wins; an error waits for the other one
+    pending = {primary, secondary}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is secondary:
+                    _hedge_counts["hedge_wins"] += 1
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def _stream_generate(model, prompt, *, temperature: float = 0.7, **kwargs) -> Iterator[str]:
+    """Yield the text of each chunk of a streamed generation (blocking)."""
+    response = model.generate_content(prompt, generation_config={"temperature": temperature, **kwargs}, stream=True)
+    for chunk in response:
+        text = chunk.text
+        if text:
+            yield text
+
+
+async def gemini_stream_async(
+    messages: List[Dict[str, str]],
+    *,
+    temperature: float = 0.7,
+    timeout: Optional[float] = None,
+    endpoint: Optional[str] = None,
+    **kwargs: Any,
+) -> AsyncIterator[str]:
+    """Stream a chat reply chunk by chunk.
+
+    The blocking SDK iterator runs on the shared pool and hands chunks to the
+    event loop through a queue. ``timeout`` (the ``endpoint``'s deadline by
+    default) bounds the wait for each chunk; ``asyncio.TimeoutError`` is raised
+    if the stream stalls. Closing the iterator early stops the producer. The
+    circuit breaker applies as for :func:`gemini_chat_async`, with the time
+    to the first chunk counting as the call's latency.
+    """
+    if not _breaker.allow():
+        raise CircuitOpenError("Gemini circuit breaker is open")
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = object()
+    stop = threading.Event()
+    prompt = _build_prompt(messages)
+
+    def put(item) -> None:
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:  # loop already closed
+            stop.set()
+
+    def produce() -> None:
+        try:
+            for text in get_backend().stream(prompt, temperature=temperature, **kwargs):
+                if stop.is_set():
+                    return
+                put(text)
+            put(finished)
+        except Exception as e:
+            put(e)
+
+    loop.run_in_executor(_executor, produce)
+    limit = deadline_for(endpoint) if timeout is None else timeout
+    started = time.monotonic()
+    first_chunk = None
+    outcome_recorded = False
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(queue.get(), limit)
+                if isinstance(item, Exception):
+                    raise item
+            except Exception:
+                _breaker.record_failure()
+                outcome_recorded = True
+                raise
+            if item is finished:
+                _breaker.record_success((first_chunk or time.monotonic()) - started)
+                outcome_recorded = True
+                return
+            if first_chunk is None:
+                first_chunk = time.monotonic()
+            yield item
+    finally:
+        stop.set()
+        if not outcome_recorded:
+            # Consumer stopped early (client went away): no verdict on Gemini
+            _breaker.release()
+
+
+def _build_prompt(messages: List[Dict[str, str]]) -> str:
     # Gemini expects either plain strings or *content blocks*. We'll concatenate
     # messages into a single prompt. For richer multi-modal input you may switch
     # to the official chat format in the future.
@@ -85,14 +717,7 @@ def gemini_chat(messages: List[Dict[str, str]], *, temperature: float = 0.7, **k
         content = msg.get("content", "")
         prompt_parts.append(f"[{role.upper()}] {content}")
 
-    prompt = "\n".join(prompt_parts)
-
-    return _safe_generate(_model, prompt, temperature=temperature, **kwargs)
-
-
-def gemini_generate(prompt: str, *, temperature: float = 0.7, **kwargs: Any) -> str:
-    """Shortcut for single-prompt content generation."""
-    return _safe_generate(_model, prompt, temperature=temperature, **kwargs)
+    return "\n".join(prompt_parts)
 
 
 # ---------------------------------------------------------------------------
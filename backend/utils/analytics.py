@@ -0,0 +1,104 @@
+"""Single-pass expense aggregate shared by the analytics helpers.
+
+``calculate_budget_summary``, ``calculate_spending_trends``,
+``get_expense_statistics``, ``generate_recommendations`` and
+``get_spending_insights`` all need the same handful of totals. Building an
+``ExpenseAggregate`` once and handing it to each helper keeps the dashboard
+at a single O(n) walk over the expense list.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional, Union
+
+from models import Expense
+
+WINDOW_DAYS = 30
+
+
+class ExpenseAggregate:
+    """Totals, per-category, per-day, per-weekday, per-month, min/max and 30-day window."""
+
+    def __init__(self, today: Optional[date] = None):
+        self.today = today or date.today()
+        self.window_start = self.today - timedelta(days=WINDOW_DAYS)
+
+        self.count = 0
+        self.total = 0
+        self.smallest = None
+        self.largest = None
+
+        self.by_category: Dict[str, Dict[str, float]] = {}
+        self.by_day: Dict[date, float] = {}
+        self.by_weekday = [0] * 7
+        self.weekday_counts = [0] * 7
+        self.by_month: Dict[str, float] = {}
+
+        self.window_count = 0
+        self.window_total = 0
+
+    @classmethod
+    def from_expenses(cls, expenses: Iterable[Expense], today: Optional[date] = None) -> "ExpenseAggregate":
+        """Build an aggregate in one pass over ``expenses``."""
+        aggregate = cls(today)
+        for expense in expenses:
+            aggregate.add(expense.expense_date, expense.category, expense.amount)
+        return aggregate
+
+    @classmethod
+    def of(cls, expenses: Union["ExpenseAggregate", Iterable[Expense]]) -> "ExpenseAggregate":
+        """Return ``expenses`` unchanged if it is already an aggregate, otherwise aggregate it."""
+        if isinstance(expenses, cls):
+            return expenses
+        return cls.from_expenses(expenses)
+
+    def add(self, day: date, category: str, amount: float) -> None:
+        """Fold a single expense into the aggregate."""
+        self.add_bucket(day, category, 1, amount, amount, amount)
+
+    def add_bucket(self, day: date, category: str, count: int, total: float, smallest: float, largest: float) -> None:
+        """Fold a pre-aggregated (day, category) bucket into the aggregate."""
+        self.count += count
+        self.total += total
+        if self.smallest is None or smallest < self.smallest:
+            self.smallest = smallest
+        if self.largest is None or largest > self.largest:
+            self.largest = largest
+
+        bucket = self.by_category.get(category)
+        if bucket is None:
+            bucket = self.by_category[category] = {"count": 0, "total": 0}
+        bucket["count"] += count
+        bucket["total"] += total
+
+        self.by_day[day] = self.by_day.get(day, 0) + total
+
+        weekday = day.weekday()
+        self.by_weekday[weekday] += total
+        self.weekday_counts[weekday] += count
+
+        month_key = f"{day.year}-{day.month:02d}"
+        self.by_month[month_key] = self.by_month.get(month_key, 0) + total
+
+        if day >= self.window_start:
+            self.window_count += count
+            self.window_total += total
+
+    def category_totals(self) -> Dict[str, float]:
+        """Return ``{category: total}``."""
+        return {category: bucket["total"] for category, bucket in self.by_category.items()}
+
+    @property
+    def weekend_total(self) -> float:
+        return self.by_weekday[5] + self.by_weekday[6]
+
+    @property
+    def weekday_total(self) -> float:
+        return sum(self.by_weekday[:5])
+
+    @property
+    def weekend_count(self) -> int:
+        return self.weekday_counts[5] + self.weekday_counts[6]
+
+    @property
+    def weekday_count(self) -> int:
+        return sum(self.weekday_counts[:5])
@@ -0,0 +1,361 @@
+"""
+Bounded in-process caches with TTL, LRU eviction and hit/miss counters.
+
+Every cache created through ``create_cache`` is kept in a module registry so
+its state can be inspected at runtime (see ``routes/metrics.py``)::
+
+    _ADVICE_CACHE = create_cache("advice", max_entries=1024, ttl_seconds=86400)
+    _ADVICE_CACHE.set(key, advice)
+    advice = _ADVICE_CACHE.get(key)
+
+Sizes are approximate: a value is measured by the length of its JSON
+encoding, which is what the cached LLM payloads are made of.
+
+The backend is chosen with ``CACHE_BACKEND``:
+
+* ``memory`` (default) -- per-process ``TTLCache``.
+* ``sqlite`` -- ``SQLiteCache``, a WAL-mode SQLite file at ``CACHE_SQLITE_PATH``
+  shared by every uvicorn worker on the host and kept across restarts, so one
+  worker's LLM reply serves all of them. Values must be JSON serialisable.
+
+``get_async`` / ``set_async`` are what async code should call: for
+``SQLiteCache`` they run the blocking SQLite calls on a worker thread instead
+of the event loop.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple, Union
+
+_MISSING = object()
+
+
+def approximate_size(value: Any) -> int:
+    """Rough byte size of ``value`` (JSON length, falling back to ``getsizeof``)."""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return sys.getsizeof(value)
+
+
+class TTLCache:
+    """Thread-safe LRU cache bounded by entry count, approximate bytes and age."""
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (expires_at, size, value); order is least -> most recently used
+        self._entries: "OrderedDict[Hashable, Tuple[Optional[float], int, Any]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, _, value = entry
+            if expires_at is not None and expires_at <= self._clock():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        size = approximate_size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Would evict everything else and still not fit
+            return
+        expires_at = self._clock() + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    async def get_async(self, key: Hashable, default: Any = None) -> Any:
+        return self.get(key, default)
+
+    async def set_async(self, key: Hashable, value: Any) -> None:
+        self.set(key, value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                return default
+            return self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable) -> Any:
+        _, size, value = self._entries.pop(key)
+        self._bytes -= size
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteCache:
+    """
+    Cache stored in a shared SQLite file so every worker process sees the same entries.
+
+    Same interface and limits as ``TTLCache``. Recency is tracked with an
+    ``accessed_at`` column, so eviction is LRU across all workers. A hit only
+    rewrites ``accessed_at`` once it is older than ``touch_interval`` seconds
+    (a tenth of the TTL by default), so most reads take no write lock. Hit/miss
+    counters are per process; entry and byte totals come from the shared table.
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS cache_entries ("
+        " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+        " size INTEGER NOT NULL, expires_at REAL, accessed_at REAL NOT NULL,"
+        " PRIMARY KEY (namespace, key))",
+        "CREATE INDEX IF NOT EXISTS ix_cache_entries_lru ON cache_entries (namespace, accessed_at)",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        path: str,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        touch_interval: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.name = name
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        if touch_interval is None:
+            touch_interval = ttl_seconds / 10 if ttl_seconds is not None else 60.0
+        self.touch_interval = touch_interval
+        # Wall clock, not monotonic: expiry times are compared across processes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not be shared across a fork, so reopen per process
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for statement in self._SCHEMA:
+                conn.execute(statement)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return json.dumps(key, default=str)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection().execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?", (self.name,)
+            ).fetchone()[0]
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = self._clock()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, expires_at, accessed_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.name, self._key(key)),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            value, expires_at, accessed_at = row
+            if expires_at is not None and expires_at <= now:
+                conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.name, self._key(key))
+                )
+                self.expirations += 1
+                self.misses += 1
+                return default
+            if now - accessed_at >= self.touch_interval:
+                conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (now, self.name, self._key(key)),
+                )
+            self.hits += 1
+        return json.loads(value)
+
+    async def get_async(self, key: Hashable, default: Any = None) -> Any:
+        return await asyncio.to_thread(self.get, key, default)
+
+    async def set_async(self, key: Hashable, value: Any) -> None:
+        await asyncio.to_thread(self.set, key, value)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        encoded = json.dumps(value, default=str)
+        size = len(encoded)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        now = self._clock()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, size, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.name, self._key(key), encoded, size, expires_at, now),
+                )
+                self._evict(conn, now)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?", (self.name, now)
+        ).rowcount
+        self.expirations += max(expired, 0)
+        count, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?", (self.name,)
+        ).fetchone()
+        while count > self.max_entries or (self.max_bytes is not None and total > self.max_bytes):
+            key, size = conn.execute(
+                "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at LIMIT 1",
+                (self.name,),
+            ).fetchone()
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.name, key))
+            count, total = count - 1, total - size
+            self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.name, self._key(key))
+            )
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM cache_entries WHERE namespace = ?", (self.name,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?", (self.name,)
+            ).fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "backend": "sqlite",
+                "path": self.path,
+                "entries": entries,
+                "bytes": total,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "touch_interval": self.touch_interval,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+CACHE_BACKENDS = ("memory", "sqlite")
+
+_REGISTRY: Dict[str, Union[TTLCache, SQLiteCache]] = {}
+
+
+def create_cache(name: str, backend: Optional[str] = None, **options: Any) -> Union[TTLCache, SQLiteCache]:
+    """
+    Create a cache and register it under ``name`` for the stats view.
+
+    ``backend`` defaults to the ``CACHE_BACKEND`` environment variable.
+    """
+    backend = (backend or os.getenv("CACHE_BACKEND", "memory")).lower()
+    if backend == "sqlite":
+        path = options.pop("path", None) or os.getenv("CACHE_SQLITE_PATH", "./budgetly_cache.db")
+        cache = SQLiteCache(name, path, **options)
+    elif backend == "memory":
+        cache = TTLCache(name, **options)
+    else:
+        raise ValueError(f"Unknown cache backend {backend!r}; expected one of {CACHE_BACKENDS}")
+    _REGISTRY[name] = cache
+    return cache
+
+
+def get_cache(name: str) -> Optional[Union[TTLCache, SQLiteCache]]:
+    return _REGISTRY.get(name)
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats for every registered cache, keyed by name."""
+    return {name: cache.stats() for name, cache in sorted(_REGISTRY.items())}
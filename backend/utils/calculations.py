@@ -1,45 +1,41 @@
 from datetime import date, datetime, timedelta
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
 from sqlalchemy.orm import Session
 from models import User, Expense
+from utils.analytics import ExpenseAggregate
 
-def calculate_budget_summary(user: User, expenses: List[Expense]) -> Dict[str, Any]:
+# Helpers below accept either the raw expense list or a prebuilt ExpenseAggregate
+Expenses = Union[List[Expense], ExpenseAggregate]
+
+def calculate_budget_summary(user: User, expenses: Expenses) -> Dict[str, Any]:
     """
     Calculate comprehensive budget summary for a user
     
     Args:
         user: User object with stipend and savings goal
-        expenses: List of user's expenses
+        expenses: List of user's expenses or an ExpenseAggregate
     
     Returns:
         Dictionary with budget summary data
     """
+    aggregate = ExpenseAggregate.of(expenses)
+    total_expenses = aggregate.total
+    
     today = date.today()
     
     # Calculate days elapsed and remaining in budget cycle
     days_elapsed = (today - user.budget_cycle_start).days
     days_remaining = 30 - days_elapsed  # Assuming monthly cycle
     
-    # Calculate total expenses
-    total_expenses = sum(expense.amount for expense in expenses)
-    
     # Calculate remaining budget
     remaining_budget = user.stipend - total_expenses
     
     # Calculate daily limit
     daily_limit = remaining_budget / max(days_remaining, 1)
     
-    # Group expenses by category
-    expenses_by_category = {}
-    for expense in expenses:
-        category = expense.category
-        if category not in expenses_by_category:
-            expenses_by_category[category] = 0
-        expenses_by_category[category] += expense.amount
-    
     return {
         "stipend": user.stipend,
-        "expenses_by_category": expenses_by_category,
+        "expenses_by_category": aggregate.category_totals(),
         "savings_goal": user.savings_goal,
         "remaining_budget": remaining_budget,
         "daily_limit": daily_limit,
@@ -48,42 +44,37 @@ def calculate_budget_summary(user: User, expenses: List[Expense]) -> Dict[str, A
         "days_remaining": days_remaining
     }
 
-def calculate_spending_trends(expenses: List[Expense]) -> Dict[str, Any]:
+def calculate_spending_trends(expenses: Expenses) -> Dict[str, Any]:
     """Return spending trend metrics expected by recommendations helpers."""
-    if not expenses:
+    aggregate = ExpenseAggregate.of(expenses)
+    if not aggregate.count:
         return {
             "average_daily_spending": 0,
             "total_spending": 0,
             "expense_count": 0,
             "daily_spending": {}
         }
-    total_spent = sum(e.amount for e in expenses)
-    expense_count = len(expenses)
-    # Aggregate by date
-    daily_spending = {}
-    for e in expenses:
-        d = e.expense_date
-        daily_spending[d] = daily_spending.get(d, 0) + e.amount
-    average_daily = total_spent / len(daily_spending)
+    daily_spending = dict(aggregate.by_day)
+    average_daily = aggregate.total / len(daily_spending)
     return {
         "average_daily_spending": average_daily,
-        "total_spending": total_spent,
-        "expense_count": expense_count,
+        "total_spending": aggregate.total,
+        "expense_count": aggregate.count,
         "daily_spending": daily_spending
     }
 
-def calculate_savings_progress(user: User, expenses: List[Expense]) -> Dict[str, Any]:
+def calculate_savings_progress(user: User, expenses: Expenses) -> Dict[str, Any]:
     """
     Calculate savings progress and projections
     
     Args:
         user: User object with savings goal
-        expenses: List of user's expenses
+        expenses: List of user's expenses or an ExpenseAggregate
     
     Returns:
         Dictionary with savings progress data
     """
-    total_expenses = sum(expense.amount for expense in expenses)
+    total_expenses = ExpenseAggregate.of(expenses).total
     actual_savings = user.stipend - total_expenses
     savings_rate = (actual_savings / user.stipend) * 100 if user.stipend > 0 else 0
     
@@ -105,11 +96,12 @@ def calculate_savings_progress(user: User, expenses: List[Expense]) -> Dict[str,
         "deficit": max(0, monthly_savings_goal - actual_savings)
     }
 
-def get_expense_statistics(expenses: List[Expense]) -> Dict[str, Any]:
+def get_expense_statistics(expenses: Expenses) -> Dict[str, Any]:
     """
     Calculate detailed expense statistics
     """
-    if not expenses:
+    aggregate = ExpenseAggregate.of(expenses)
+    if not aggregate.count:
         return {
             "total_expenses": 0,
             "total_amount": 0,
@@ -121,45 +113,17 @@ def get_expense_statistics(expenses: List[Expense]) -> Dict[str, Any]:
             "daily_average": 0
         }
     
-    # Basic statistics
-    total_expenses = len(expenses)
-    total_amount = sum(expense.amount for expense in expenses)
-    amounts = [expense.amount for expense in expenses]
-    average_amount = total_amount / total_expenses
-    largest_expense = max(amounts)
-    smallest_expense = min(amounts)
-    
-    # Category breakdown
-    category_breakdown = {}
-    for expense in expenses:
-        category = expense.category
-        if category not in category_breakdown:
-            category_breakdown[category] = {"count": 0, "total": 0}
-        category_breakdown[category]["count"] += 1
-        category_breakdown[category]["total"] += expense.amount
-    
-    # Monthly trend
-    monthly_trend = {}
-    for expense in expenses:
-        expense_date = expense.expense_date
-        month_key = f"{expense_date.year}-{expense_date.month:02d}"
-        if month_key not in monthly_trend:
-            monthly_trend[month_key] = 0
-        monthly_trend[month_key] += expense.amount
-    
     # Daily average (last 30 days)
-    thirty_days_ago = date.today() - timedelta(days=30)
-    recent_expenses = [exp for exp in expenses if exp.expense_date >= thirty_days_ago]
-    daily_average = sum(exp.amount for exp in recent_expenses) / 30 if recent_expenses else 0
+    daily_average = aggregate.window_total / 30 if aggregate.window_count else 0
     
     return {
-        "total_expenses": total_expenses,
-        "total_amount": total_amount,
-        "average_amount": average_amount,
-        "largest_expense": largest_expense,
-        "smallest_expense": smallest_expense,
-        "category_breakdown": category_breakdown,
-        "monthly_trend": monthly_trend,
+        "total_expenses": aggregate.count,
+        "total_amount": aggregate.total,
+        "average_amount": aggregate.total / aggregate.count,
+        "largest_expense": aggregate.largest,
+        "smallest_expense": aggregate.smallest,
+        "category_breakdown": {category: dict(bucket) for category, bucket in aggregate.by_category.items()},
+        "monthly_trend": dict(aggregate.by_month),
         "daily_average": daily_average
     }
 
@@ -1,14 +1,34 @@
 from __future__ import annotations
 
-from typing import List, Dict, Any
+from typing import AsyncIterator, List, Dict, Any, Tuple
+import asyncio
 import json
+import logging
+import os
+import re
 from datetime import date
 from hashlib import sha256
 
-from utils.ai_client import gemini_chat
+from utils.ai_client import CircuitOpenError, gemini_chat_async, gemini_stream_async
+from utils.json_stream import JsonStreamParser
+from utils.cache import create_cache
+from utils.singleflight import create_single_flight
+from utils.item_matching import create_similarity_index, normalize_item_name
 
-# simple cache daily
-_DEAL_CACHE: dict[tuple, List[Dict[str, Any]]] = {}
+# bounded daily cache, keyed by (normalised item name, day)
+_DEAL_CACHE = create_cache(
+    "deals",
+    max_entries=int(os.getenv("DEAL_CACHE_MAX_ENTRIES", "4096")),
+    max_bytes=int(os.getenv("DEAL_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("DEAL_CACHE_TTL_SECONDS", "86400")),
+)
+_DEAL_FLIGHTS = create_single_flight("deals")
+# Lets near-identical item names from any user reuse cached deals
+_ITEM_INDEX = create_similarity_index(
+    "deals",
+    threshold=float(os.getenv("DEAL_MATCH_THRESHOLD", "0.8")),
+    max_entries=int(os.getenv("DEAL_MATCH_MAX_KEYS", "10000")),
+)
 
 SYSTEM_PROMPT = (
     "You are a helpful shopping assistant. Given a product name, return the three best places (online or Abu Dhabi local stores) to buy it cheaply but with good quality. "
@@ -17,63 +37,241 @@ SYSTEM_PROMPT = (
     "Be specific with merchant names and provide real URLs when possible."
 )
 
-def find_deals(item_name: str) -> List[Dict[str, Any]]:
-    key = (item_name.lower(), date.today().isoformat())
-    if key in _DEAL_CACHE:
-        return _DEAL_CACHE[key]
+BATCH_SYSTEM_PROMPT = (
+    "You are a helpful shopping assistant. You receive a JSON array of product names. For each product, find the three best places "
+    "(online or Abu Dhabi local stores) to buy it cheaply but with good quality. "
+    "Return ONLY a valid JSON object whose keys are the product names exactly as given and whose values are arrays of objects, "
+    "each having merchant, item_name, price, url. "
+    "For price: use a specific number (e.g., 250.0) if you can estimate it reasonably. If the price varies significantly or you cannot estimate, use the string 'Price varies - contact merchant' instead of a number. "
+    "Be specific with merchant names and provide real URLs when possible."
+)
+
+# Max items packed into one batched prompt; larger batches are split and sent concurrently
+_BATCH_MAX_ITEMS = int(os.getenv("DEAL_BATCH_MAX_ITEMS", "10"))
+
+
+def deal_cache_key(item_name: str) -> tuple:
+    """Key under which today's deals for ``item_name`` are cached."""
+    return (normalize_item_name(item_name), date.today().isoformat())
+
+
+async def _cached_deals(item_name: str, record: bool = True) -> List[Dict[str, Any]] | None:
+    """Cached deals for ``item_name`` or a near-identical item, recording the outcome."""
+    key = deal_cache_key(item_name)
+    deals = await _DEAL_CACHE.get_async(key)
+    if deals is not None:
+        if record:
+            _ITEM_INDEX.record("exact")
+        return deals
+
+    match = _ITEM_INDEX.lookup(key[0])
+    if match is not None and match != key[0]:
+        deals = await _DEAL_CACHE.get_async((match, key[1]))
+        if deals is not None:
+            if record:
+                _ITEM_INDEX.record("fuzzy")
+            return deals
+        # Entry expired or was evicted; stop matching against it
+        _ITEM_INDEX.discard(match)
+    if record:
+        _ITEM_INDEX.record("miss")
+    return None
+
+
+async def peek_deals(item_name: str) -> List[Dict[str, Any]] | None:
+    """Cached deals for ``item_name``, without counting the lookup in the hit rate."""
+    return await _cached_deals(item_name, record=False)
 
+
+async def _store_deals(item_name: str, deals: List[Dict[str, Any]]) -> None:
+    key = deal_cache_key(item_name)
+    await _DEAL_CACHE.set_async(key, deals)
+    _ITEM_INDEX.add(key[0])
+
+
+def _extract_json(reply: str, opening: str, closing: str) -> Any:
+    """Parse ``reply``, falling back to the outermost ``opening``...``closing`` block."""
+    try:
+        return json.loads(reply)
+    except json.JSONDecodeError:
+        # Try to extract JSON from response
+        start = reply.find(opening)
+        end = reply.rfind(closing)
+        if start != -1 and end != -1:
+            return json.loads(reply[start:end+1])
+        raise ValueError("No valid JSON found in response")
+
+
+def _clean_deals(deals: Any) -> List[Dict[str, Any]]:
+    """Keep well-formed deals and normalise their price field."""
+    cleaned_deals = []
+    if not isinstance(deals, list):
+        return cleaned_deals
+    for deal in deals:
+        if isinstance(deal, dict) and all(key in deal for key in ['merchant', 'item_name', 'price', 'url']):
+            # Handle price field - ensure it's either a number or a descriptive string
+            if isinstance(deal['price'], str) and any(word in deal['price'].lower() for word in ['varies', 'depending', 'contact', 'call']):
+                deal['price'] = "Price varies - contact merchant"
+            elif isinstance(deal['price'], str):
+                try:
+                    # Try to extract a number from the string
+                    price_match = re.search(r'[\d,]+\.?\d*', deal['price'].replace(',', ''))
+                    if price_match:
+                        deal['price'] = float(price_match.group())
+                    else:
+                        deal['price'] = "Price varies - contact merchant"
+                except:
+                    deal['price'] = "Price varies - contact merchant"
+            
+            cleaned_deals.append(deal)
+    return cleaned_deals
+
+
+def _fallback_deals(item_name: str) -> List[Dict[str, Any]]:
+    # fallback: generic google search link
+    return [
+        {
+            "merchant": "Google Shopping",
+            "item_name": item_name,
+            "price": "Price varies - contact merchant",
+            "url": f"https://www.google.com/search?tbm=shop&q={item_name.replace(' ', '+')}"
+        }
+    ]
+
+
+async def find_deals(item_name: str, record: bool = True) -> List[Dict[str, Any]]:
+    # record=False when the caller already counted this lookup as a miss
+    cached = await _cached_deals(item_name, record=record)
+    if cached is not None:
+        return cached
+
+    # Concurrent lookups for the same item share one Gemini call
+    return await _DEAL_FLIGHTS.do(deal_cache_key(item_name), lambda: _request_deals(item_name))
+
+async def _request_deals(item_name: str) -> List[Dict[str, Any]]:
     messages = [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": f"Find the best deals for: {item_name}"},
     ]
     try:
-        reply = gemini_chat(messages, temperature=0.3)
-        try:
-            deals = json.loads(reply)
-        except json.JSONDecodeError:
-            # Try to extract JSON from response
-            start = reply.find('[')
-            end = reply.rfind(']')
-            if start != -1 and end != -1:
-                deals = json.loads(reply[start:end+1])
-            else:
-                raise ValueError("No valid JSON array found in response")
-        
-        # Validate and clean the deals data
-        cleaned_deals = []
-        for deal in deals:
-            if isinstance(deal, dict) and all(key in deal for key in ['merchant', 'item_name', 'price', 'url']):
-                # Handle price field - ensure it's either a number or a descriptive string
-                if isinstance(deal['price'], str) and any(word in deal['price'].lower() for word in ['varies', 'depending', 'contact', 'call']):
-                    deal['price'] = "Price varies - contact merchant"
-                elif isinstance(deal['price'], str):
-                    try:
-                        # Try to extract a number from the string
-                        import re
-                        price_match = re.search(r'[\d,]+\.?\d*', deal['price'].replace(',', ''))
-                        if price_match:
-                            deal['price'] = float(price_match.group())
-                        else:
-                            deal['price'] = "Price varies - contact merchant"
-                    except:
-                        deal['price'] = "Price varies - contact merchant"
-                
-                cleaned_deals.append(deal)
+        reply = await gemini_chat_async(messages, temperature=0.3, endpoint="deals")
+        cleaned_deals = _clean_deals(_extract_json(reply, '[', ']'))
         
         if not cleaned_deals:
             raise ValueError("No valid deals found in AI response")
             
-        _DEAL_CACHE[key] = cleaned_deals
+        await _store_deals(item_name, cleaned_deals)
         return cleaned_deals
         
+    except CircuitOpenError:
+        # Gemini is known to be down; serve the fallback without waiting
+        return _fallback_deals(item_name)
     except Exception as e:
-        print(f"Error finding deals for {item_name}: {e}")
-        # fallback: generic google search link
-        return [
-            {
-                "merchant": "Google Shopping",
-                "item_name": item_name,
-                "price": "Price varies - contact merchant",
-                "url": f"https://www.google.com/search?tbm=shop&q={item_name.replace(' ', '+')}"
-            }
-        ] 
\ No newline at end of file
+        logging.error("Error finding deals for %s: %s", item_name, e)
+        return _fallback_deals(item_name)
+
+
+async def find_deals_batch(item_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Deals for several items, keyed by item name, using one Gemini call per batch.
+
+    Cached (or near-identical) items are served from the per-item cache; the rest are packed into
+    a single prompt (split every ``_BATCH_MAX_ITEMS``) and the keyed reply
+    fills the per-item cache. Items the model omits or answers badly fall
+    back to individual ``find_deals`` calls.
+    """
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    pending: Dict[str, str] = {}  # normalised name -> name as given
+    for name in item_names:
+        cached = await _cached_deals(name)
+        if cached is not None:
+            results[name] = cached
+        else:
+            pending.setdefault(normalize_item_name(name), name)
+
+    names = list(pending.values())
+    if len(names) > 1:
+        chunks = [names[i:i + _BATCH_MAX_ITEMS] for i in range(0, len(names), _BATCH_MAX_ITEMS)]
+        for batch in await asyncio.gather(*(_request_deals_batch(chunk) for chunk in chunks)):
+            results.update(batch)
+
+    missing = [name for name in names if name not in results]
+    if missing:
+        individual = await asyncio.gather(*(find_deals(name, record=False) for name in missing))
+        results.update(zip(missing, individual))
+
+    # Names that normalise to the same key share the lookup
+    return {name: results.get(name) or results[pending[normalize_item_name(name)]] for name in item_names}
+
+def _batch_messages(item_names: List[str]) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(item_names)},
+    ]
+
+async def _request_deals_batch(item_names: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """One Gemini call for ``item_names``; returns only the items it answered well."""
+    try:
+        reply = await gemini_chat_async(_batch_messages(item_names), temperature=0.3, endpoint="deals")
+        data = _extract_json(reply, '{', '}')
+        if not isinstance(data, dict):
+            raise ValueError("Expected a JSON object keyed by item name")
+    except CircuitOpenError:
+        return {}
+    except Exception as e:
+        logging.error("Error finding batched deals for %d items: %s", len(item_names), e)
+        return {}
+
+    by_name = {normalize_item_name(str(name)): deals for name, deals in data.items()}
+    found = {}
+    for name in item_names:
+        cleaned_deals = _clean_deals(by_name.get(normalize_item_name(name)))
+        if cleaned_deals:
+            await _store_deals(name, cleaned_deals)
+            found[name] = cleaned_deals
+    return found
+
+
+async def stream_deals_batch(item_names: List[str]) -> AsyncIterator[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Streaming variant of ``find_deals_batch``: yield ``(item name, deals)`` as each item is ready.
+
+    Cached items come first. The batched prompt is streamed and every item is
+    yielded as soon as its array parses from the reply; items it misses are
+    then looked up individually and yielded in completion order.
+    """
+    pending: Dict[str, List[str]] = {}  # normalised name -> names as given
+    for name in dict.fromkeys(item_names):
+        cached = await _cached_deals(name)
+        if cached is not None:
+            yield name, cached
+        else:
+            pending.setdefault(normalize_item_name(name), []).append(name)
+
+    names = [group[0] for group in pending.values()]
+    if len(names) > 1:
+        for i in range(0, len(names), _BATCH_MAX_ITEMS):
+            parser = JsonStreamParser(items=False)
+            try:
+                async for text in gemini_stream_async(
+                    _batch_messages(names[i:i + _BATCH_MAX_ITEMS]), temperature=0.3, endpoint="deals"
+                ):
+                    for key, value in parser.feed(text):
+                        group = pending.get(normalize_item_name(str(key)))
+                        cleaned_deals = _clean_deals(value)
+                        if group and cleaned_deals:
+                            await _store_deals(group[0], cleaned_deals)
+                            del pending[normalize_item_name(group[0])]
+                            for name in group:
+                                yield name, cleaned_deals
+            except Exception as e:
+                if not isinstance(e, CircuitOpenError):
+                    logging.error("Error streaming batched deals: %s", e)
+
+    async def lookup(group: List[str]):
+        return group, await find_deals(group[0], record=False)
+
+    for next_done in asyncio.as_completed([lookup(group) for group in pending.values()]):
+        group, deals = await next_done
+        for name in group:
+            yield name, deals
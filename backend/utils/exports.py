@@ -0,0 +1,263 @@
+"""
+Streaming exports of expense data.
+
+Exports iterate the result set server-side with ``yield_per`` and emit each
+partition as soon as it is fetched, so memory stays flat regardless of how
+many years of expenses a report covers:
+
+* CSV: written with the ``csv`` module.
+* NDJSON: one object per line, then a trailing summary record.
+* Parquet and Arrow IPC: columnar exports for analytics, built with pyarrow
+  (imported lazily).
+"""
+
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from sqlalchemy import Select, select
+
+from models import AsyncSessionLocal, Expense, PlannedPurchase, User
+from utils.pagination import encode_cursor
+
+# Rows fetched (and emitted) per round trip to the database
+EXPORT_BATCH_SIZE = 1000
+
+CSV_HEADER = "Date,Category,Description,Amount\n"
+
+
+def _drain(buffer: io.StringIO) -> str:
+    """Return everything written to ``buffer`` and reset it for reuse."""
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return chunk
+
+
+async def stream_expenses_csv(query: Select, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[str]:
+    """
+    Yield a CSV report for ``query`` in chunks of ``batch_size`` rows.
+
+    ``query`` must select (date, category, description, amount) columns. The
+    generator opens its own session because the response body is produced
+    after the request-scoped session has been closed.
+    """
+    yield CSV_HEADER
+
+    buffer = io.StringIO()
+    # Strings (including dates) are quoted, amounts are written bare
+    writer = csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC, lineterminator="\n")
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            writer.writerows(
+                (str(expense_date), category, description or "", amount)
+                for expense_date, category, description, amount in rows
+            )
+            yield _drain(buffer)
+
+
+# ---------------------------------------------------------------------------
+# Columnar (Parquet / Arrow IPC) exports
+# ---------------------------------------------------------------------------
+
+# format -> (media type, file extension). Arrow uses the IPC *stream* format,
+# which allows each batch to carry its own category dictionary.
+COLUMNAR_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+# table -> (user id column, [(output name, column, arrow type)]). Low
+# cardinality strings are dictionary encoded.
+COLUMNAR_TABLES = {
+    "expenses": (Expense.user_id, [
+        ("id", Expense.id, "int64"),
+        ("user_id", Expense.user_id, "int64"),
+        ("date", Expense.expense_date, "date32"),
+        ("category", Expense.category, "dictionary"),
+        ("description", Expense.description, "string"),
+        ("amount", Expense.amount, "float64"),
+        ("created_at", Expense.created_at, "timestamp"),
+    ]),
+    "planned_purchases": (PlannedPurchase.user_id, [
+        ("id", PlannedPurchase.id, "int64"),
+        ("user_id", PlannedPurchase.user_id, "int64"),
+        ("item_name", PlannedPurchase.item_name, "string"),
+        ("expected_price", PlannedPurchase.expected_price, "float64"),
+        ("priority", PlannedPurchase.priority, "dictionary"),
+        ("desired_date", PlannedPurchase.desired_date, "date32"),
+        ("created_at", PlannedPurchase.created_at, "timestamp"),
+    ]),
+    "users": (User.id, [
+        ("id", User.id, "int64"),
+        ("stipend", User.stipend, "float64"),
+        ("savings_goal", User.savings_goal, "float64"),
+        ("budget_cycle_start", User.budget_cycle_start, "date32"),
+        ("created_at", User.created_at, "timestamp"),
+    ]),
+}
+
+
+def import_pyarrow():
+    """Import pyarrow lazily; it is only needed for columnar exports."""
+    try:
+        import pyarrow
+        import pyarrow.parquet  # noqa: F401  (registers pyarrow.parquet)
+    except ImportError as e:
+        raise RuntimeError("Columnar exports require the pyarrow package") from e
+    return pyarrow
+
+
+def _arrow_type(pa, kind: str):
+    if kind == "dictionary":
+        return pa.dictionary(pa.int32(), pa.string())
+    if kind == "timestamp":
+        return pa.timestamp("us")
+    return getattr(pa, kind)()
+
+
+class _ChunkSink:
+    """Write-only file object that collects output until the generator drains it."""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Parquet footers record absolute offsets, so this never resets
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        chunk = b"".join(self._chunks)
+        self._chunks.clear()
+        return chunk
+
+
+async def stream_columnar_export(
+    table: str,
+    format: str,
+    user_id: Optional[int] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Yield ``table`` as Parquet or Arrow IPC, one record batch per cursor partition.
+
+    ``user_id`` restricts the export to a single user; ``None`` dumps every user.
+    """
+    pa = import_pyarrow()
+    user_column, columns = COLUMNAR_TABLES[table]
+    schema = pa.schema([(name, _arrow_type(pa, kind)) for name, _, kind in columns])
+
+    query = select(*(column for _, column, _ in columns)).order_by(columns[0][1])
+    if user_id is not None:
+        query = query.where(user_column == user_id)
+
+    sink = _ChunkSink()
+    if format == "parquet":
+        writer = pa.parquet.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    else:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.stream(query.execution_options(yield_per=batch_size))
+            async for rows in result.partitions():
+                values = list(zip(*rows))
+                batch = pa.record_batch(
+                    [pa.array(values[i], type=field.type) for i, field in enumerate(schema)],
+                    schema=schema,
+                )
+                writer.write_batch(batch)
+                yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+# ---------------------------------------------------------------------------
+# NDJSON exports
+# ---------------------------------------------------------------------------
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+NDJSON_COLUMNS = (
+    Expense.id, Expense.user_id, Expense.amount, Expense.category,
+    Expense.description, Expense.expense_date, Expense.created_at,
+)
+
+
+def report_record(row) -> dict:
+    """Expense as it appears in the JSON report."""
+    return {
+        "id": row.id,
+        "date": row.expense_date.isoformat(),
+        "category": row.category,
+        "description": row.description,
+        "amount": row.amount,
+    }
+
+
+def listing_record(row) -> dict:
+    """Expense in the same shape as the ``Expense`` response schema."""
+    return {
+        "amount": row.amount,
+        "category": row.category,
+        "description": row.description,
+        "date": row.expense_date.isoformat(),
+        "id": row.id,
+        "user_id": row.user_id,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
+
+
+async def stream_expenses_ndjson(
+    query: Select,
+    record: Callable = report_record,
+    summary: Optional[Dict[str, Any]] = None,
+    page_limit: Optional[int] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[str]:
+    """
+    Yield one JSON object per expense, then a ``{"summary": {...}}`` trailer.
+
+    Totals are accumulated while streaming so the full result is never held.
+    The trailer carries ``summary`` plus ``total_expenses``/``total_amount``;
+    when ``page_limit`` is given it also carries the keyset ``next_cursor``.
+    """
+    count = 0
+    total_amount = 0.0
+    last = None
+
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(query.with_only_columns(*NDJSON_COLUMNS).execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            lines = []
+            for row in rows:
+                count += 1
+                total_amount += row.amount
+                lines.append(json.dumps(record(row)))
+            last = rows[-1]
+            yield "\n".join(lines) + "\n"
+
+    trailer = {**(summary or {}), "total_expenses": count, "total_amount": total_amount}
+    if page_limit is not None:
+        trailer["next_cursor"] = encode_cursor(last.expense_date, last.id) if last and count >= page_limit else None
+    yield json.dumps({"summary": trailer}, default=str) + "\n"
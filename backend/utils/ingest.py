@@ -0,0 +1,196 @@
+"""Batched expense ingestion shared by the bulk endpoint and file imports.
+
+Rows are validated in one pass, users are looked up once per distinct id,
+and inserts go out as executemany batches of ``CHUNK_SIZE`` rows inside the
+caller's transaction. Rollups are updated per chunk with one upsert.
+"""
+
+import json
+from collections import Counter
+from hashlib import sha256
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import Expense, User
+from schemas import ExpenseCreate
+from utils.rollups import increment_rollups
+
+CHUNK_SIZE = 500
+
+
+def format_validation_error(error: ValidationError) -> str:
+    """Flatten a pydantic error into ``field: message; ...``."""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'item'}: {err['msg']}" for err in error.errors()
+    )
+
+
+def validate_items(raw_items: Iterable[Any]) -> Iterator[Tuple[int, Union[ExpenseCreate, str]]]:
+    """Yield ``(index, ExpenseCreate)`` or ``(index, error message)`` for each raw item."""
+    for index, raw in enumerate(raw_items):
+        try:
+            yield index, ExpenseCreate.model_validate(raw)
+        except ValidationError as error:
+            yield index, format_validation_error(error)
+
+
+def expense_content_hash(item: ExpenseCreate, occurrence: int) -> str:
+    """
+    Stable hash of an expense's content. ``occurrence`` numbers identical
+    rows within one upload so two genuine identical coffees are both kept,
+    while uploading the same file twice inserts nothing new.
+    """
+    source = json.dumps(
+        [item.user_id, round(item.amount, 2), item.category, item.description or "", item.expense_date.isoformat(), occurrence]
+    )
+    return sha256(source.encode()).hexdigest()
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class ExpenseIngestor:
+    """Accumulates results while chunks of validated rows are inserted."""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        *,
+        dedupe: bool = False,
+        chunk_size: int = CHUNK_SIZE,
+        max_errors: Optional[int] = None,
+    ):
+        self.db = db
+        self.dedupe = dedupe
+        self.chunk_size = chunk_size
+        # Cap the stored error details so huge imports stay in constant memory
+        self.max_errors = max_errors
+        self.received = 0
+        self.created = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.errors: List[Dict[str, Any]] = []
+        self._known_users: Dict[int, bool] = {}
+        # Occurrences seen so far per content, keyed by the first 64 bits of
+        # its hash (a full hex digest per row would double the footprint)
+        self._occurrences: Counter = Counter()
+
+    def result(self) -> Dict[str, Any]:
+        return {
+            "received": self.received,
+            "created": self.created,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "errors": self.errors,
+        }
+
+    def _reject(self, index: int, error: str) -> None:
+        self.rejected += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append({"index": index, "error": error})
+
+    async def ingest(self, validated: Iterable[Tuple[int, Union[ExpenseCreate, str]]]) -> Dict[str, Any]:
+        """Insert every valid row from ``validated``, chunk by chunk."""
+        for chunk in _chunks(validated, self.chunk_size):
+            await self._ingest_chunk(chunk)
+        return self.result()
+
+    async def _ingest_chunk(self, chunk: List[Tuple[int, Union[ExpenseCreate, str]]]) -> None:
+        self.received += len(chunk)
+        valid: List[Tuple[int, ExpenseCreate]] = []
+        for index, item in chunk:
+            if isinstance(item, str):
+                self._reject(index, item)
+            else:
+                valid.append((index, item))
+
+        await self._load_users({item.user_id for _, item in valid})
+
+        rows = []
+        for index, item in valid:
+            if not self._known_users[item.user_id]:
+                self._reject(index, "user_id: User not found")
+                continue
+            row = {
+                "user_id": item.user_id,
+                "amount": item.amount,
+                "category": item.category,
+                "description": item.description,
+                "expense_date": item.expense_date,
+                "content_hash": None,
+            }
+            if self.dedupe:
+                base = int(expense_content_hash(item, 0)[:16], 16)
+                row["content_hash"] = expense_content_hash(item, self._occurrences[base])
+                self._occurrences[base] += 1
+            rows.append(row)
+
+        if not rows:
+            return
+        if self.dedupe:
+            rows = await self._insert_new(rows)
+            if not rows:
+                return
+        else:
+            await self.db.execute(insert(Expense), rows)
+        await increment_rollups(self.db, _bucket_rows(rows))
+        self.created += len(rows)
+
+    async def _load_users(self, user_ids: set) -> None:
+        unknown = user_ids - self._known_users.keys()
+        if not unknown:
+            return
+        found = set((await self.db.scalars(select(User.id).where(User.id.in_(unknown)))).all())
+        for user_id in unknown:
+            self._known_users[user_id] = user_id in found
+
+    async def _insert_new(self, rows: List[dict]) -> List[dict]:
+        """
+        Insert rows whose content hash is not stored yet and return them.
+
+        ON CONFLICT DO NOTHING on the unique (user_id, content_hash) index
+        also skips rows a concurrent upload of the same file inserted first.
+        Repeated hashes within ``rows`` are dropped up front, so each
+        returned hash stands for exactly one inserted row.
+        """
+        unique: Dict[Tuple[int, str], dict] = {}
+        for row in rows:
+            unique.setdefault((row["user_id"], row["content_hash"]), row)
+        self.duplicates += len(rows) - len(unique)
+        rows = list(unique.values())
+        if self.db.bind.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = (
+            dialect_insert(Expense)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[Expense.user_id, Expense.content_hash])
+            .returning(Expense.user_id, Expense.content_hash)
+        )
+        inserted = set((await self.db.execute(stmt)).tuples().all())
+        self.duplicates += len(rows) - len(inserted)
+        return [row for key, row in unique.items() if key in inserted]
+
+
+def _bucket_rows(rows: List[dict]) -> Dict[Tuple, Tuple[int, float, float, float]]:
+    buckets: Dict[Tuple, List] = {}
+    for row in rows:
+        key = (row["user_id"], row["expense_date"], row["category"])
+        amount = row["amount"]
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [1, amount, amount, amount]
+        else:
+            bucket[0] += 1
+            bucket[1] += amount
+            bucket[2] = min(bucket[2], amount)
+            bucket[3] = max(bucket[3], amount)
+    return {key: tuple(value) for key, value in buckets.items()}
@@ -0,0 +1,166 @@
+"""
+Normalisation and fuzzy matching of planned-purchase item names.
+
+Many students plan the same purchases but spell them differently
+("AirPods Pro 2", "airpods pro (2nd gen)", "Apple AirPods Pro 2"). Deal
+lookups key their cache on ``normalize_item_name`` and, on an exact miss,
+ask a ``SimilarityIndex`` for a previously seen name that is close enough::
+
+    key = normalize_item_name("AirPods Pro (2nd Gen)")   # "2 airpods pro"
+    match = index.lookup(key)                            # best key >= threshold, or None
+
+Similarity is the Dice coefficient of character trigrams of the normalised
+names. Tokens containing digits (sizes, generations, model numbers) must
+match exactly, so "iphone 14" never reuses deals for "iphone 15".
+"""
+
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Set
+
+# Words that do not change which product is meant
+STOPWORDS = frozenset({
+    "a", "an", "and", "the", "for", "with", "of", "new", "brand",
+    "gen", "generation", "edition", "version", "model",
+})
+
+_ORDINAL = re.compile(r"\b(\d+)(?:st|nd|rd|th)\b")
+_INNER_HYPHEN = re.compile(r"(?<=[a-z0-9])-(?=[a-z0-9])")
+_NON_WORD = re.compile(r"[^a-z0-9.]+")
+
+
+def normalize_item_name(name: str) -> str:
+    """
+    Canonical form of an item name: ASCII, lower case, punctuation and
+    stopwords removed, ordinals reduced to numbers, tokens de-duplicated and
+    sorted so word order does not matter.
+    """
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    text = _ORDINAL.sub(r"\1", text)
+    text = _INNER_HYPHEN.sub("", text)  # "wh-1000xm5" -> "wh1000xm5"
+    tokens = {token.strip(".") for token in _NON_WORD.sub(" ", text).split()}
+    tokens = {token for token in tokens if token and token not in STOPWORDS}
+    # Fall back to the lower-cased name rather than collapsing everything to ""
+    return " ".join(sorted(tokens)) or name.strip().lower()
+
+
+def _trigrams(key: str) -> FrozenSet[str]:
+    grams: Set[str] = set()
+    for token in key.split():
+        padded = f" {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def _numeric_tokens(key: str) -> FrozenSet[str]:
+    return frozenset(token for token in key.split() if any(ch.isdigit() for ch in token))
+
+
+def similarity(a: str, b: str) -> float:
+    """Dice coefficient of the trigram sets of two normalised names."""
+    grams_a, grams_b = _trigrams(a), _trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+
+
+class SimilarityIndex:
+    """
+    Bounded inverted trigram index over normalised item names.
+
+    ``lookup`` scores only keys sharing at least one trigram with the query,
+    so cost grows with the number of similar names rather than index size.
+    """
+
+    def __init__(self, name: str, threshold: float = 0.8, max_entries: int = 10000):
+        self.name = name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._keys: "OrderedDict[str, FrozenSet[str]]" = OrderedDict()  # key -> trigrams
+        self._postings: Dict[str, Set[str]] = {}
+        self.exact_hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                return
+            grams = _trigrams(key)
+            self._keys[key] = grams
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(key)
+            while len(self._keys) > self.max_entries:
+                self._remove(next(iter(self._keys)))
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            if key in self._keys:
+                self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        for gram in self._keys.pop(key):
+            postings = self._postings.get(gram)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self._postings[gram]
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Most similar indexed key at or above the threshold (``key`` itself wins)."""
+        grams = _trigrams(key)
+        numbers = _numeric_tokens(key)
+        with self._lock:
+            if key in self._keys:
+                return key
+            shared = Counter(other for gram in grams for other in self._postings.get(gram, ()))
+            best, best_score = None, self.threshold
+            for other, overlap in shared.items():
+                score = 2 * overlap / (len(grams) + len(self._keys[other]))
+                if score >= best_score and _numeric_tokens(other) == numbers:
+                    best, best_score = other, score
+            return best
+
+    def record(self, outcome: str) -> None:
+        """Count a cache lookup outcome: ``exact``, ``fuzzy`` or ``miss``."""
+        with self._lock:
+            if outcome == "exact":
+                self.exact_hits += 1
+            elif outcome == "fuzzy":
+                self.fuzzy_hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.exact_hits + self.fuzzy_hits + self.misses
+            return {
+                "keys": len(self._keys),
+                "threshold": self.threshold,
+                "exact_hits": self.exact_hits,
+                "fuzzy_hits": self.fuzzy_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.exact_hits + self.fuzzy_hits) / lookups, 4) if lookups else None,
+            }
+
+
+_REGISTRY: Dict[str, SimilarityIndex] = {}
+
+
+def create_similarity_index(name: str, **options: Any) -> SimilarityIndex:
+    """Create an index and register it under ``name`` for the stats view."""
+    index = SimilarityIndex(name, **options)
+    _REGISTRY[name] = index
+    return index
+
+
+def similarity_index_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats for every registered index, keyed by name."""
+    return {name: index.stats() for name, index in sorted(_REGISTRY.items())}
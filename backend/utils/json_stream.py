@@ -0,0 +1,98 @@
+"""
+Incremental parsing of a JSON object that arrives in chunks (LLM streaming).
+
+``JsonStreamParser`` scans each chunk once and returns the values that became
+complete, so callers can act on them before the reply has finished::
+
+    parser = JsonStreamParser()                 # items of top-level arrays
+    for key, item in parser.feed(chunk):        # e.g. ("cuts", {...})
+        ...
+
+    parser = JsonStreamParser(items=False)      # whole top-level members
+    for key, value in parser.feed(chunk):       # e.g. ("Desk Lamp", [...])
+        ...
+
+Anything before the first ``{`` (markdown fences, annotations) is ignored.
+Only object/array values are emitted; malformed fragments are skipped and left
+for the caller's final full parse to report.
+"""
+
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class JsonStreamParser:
+    """Emit completed values from a streamed top-level JSON object."""
+
+    def __init__(self, items: bool = True):
+        # items=True: elements of top-level arrays (emitted at depth 3)
+        # items=False: top-level member values (emitted at depth 2)
+        self._emit_depth = 3 if items else 2
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._capture_start: Optional[int] = None
+
+    @property
+    def finished(self) -> bool:
+        """True once the top-level object has been closed."""
+        return self._finished
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        self._buffer += text
+        completed: List[Tuple[str, Any]] = []
+        buffer = self._buffer
+
+        for i in range(self._pos, len(buffer)):
+            if self._finished:
+                break
+            ch = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = json.loads(buffer[self._string_start:i + 1])
+                continue
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._expect_key = True
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == self._emit_depth and self._capture_start is None:
+                    self._capture_start = i
+            elif ch in "}]":
+                if self._depth == self._emit_depth and self._capture_start is not None:
+                    try:
+                        completed.append((self._key, json.loads(buffer[self._capture_start:i + 1])))
+                    except json.JSONDecodeError:
+                        pass
+                    self._capture_start = None
+                self._depth -= 1
+                if self._depth == 0:
+                    self._finished = True
+            elif self._depth == 1:
+                if ch == ":":
+                    self._expect_key = False
+                elif ch == ",":
+                    self._expect_key = True
+
+        self._pos = len(buffer)
+        return completed
@@ -0,0 +1,282 @@
+"""
+Stand-ins for the Gemini backend, for load tests and offline benchmarks.
+
+``utils.ai_client`` sends every prompt to a backend: any object with blocking
+``generate(prompt, *, temperature, **kwargs) -> str`` and
+``stream(prompt, *, temperature, **kwargs) -> Iterator[str]`` methods plus a
+``stats()`` dict. The async wrappers (thread pool, deadlines, circuit
+breaker) stay in front of it, so a stand-in exercises the same paths as
+Gemini. ``LLM_BACKEND`` selects one at startup:
+
+* ``stub``: deterministic local replies with configurable latency and
+  failure rate (``LLM_STUB_LATENCY``, ``LLM_STUB_FAILURE_RATE``,
+  ``LLM_STUB_SEED``). Canned replies come from ``LLM_STUB_REPLIES`` (a
+  JSON list of ``{"match": "<substring>", "reply": ...}``), else a
+  well-formed reply is built from the prompt's own payload.
+* ``record``: calls ``LLM_RECORD_BACKEND`` (``gemini`` by default, or
+  ``openai``) and appends every reply, with its latency, to
+  ``LLM_FIXTURES_PATH`` (JSON lines).
+* ``replay``: answers only from that file, sleeping the recorded latency
+  unless ``LLM_REPLAY_LATENCY=false``; an unknown prompt raises
+  ``FixtureMissingError``.
+
+Tests can install one directly::
+
+    ai_client.set_backend(StubBackend(latency="fixed:0.05", failure_rate=0.1, seed=1))
+"""
+
+import json
+import math
+import os
+import random
+import threading
+import time
+from hashlib import sha256
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Stream replies are cut into chunks of this many characters
+STREAM_CHUNK_CHARS = 24
+
+
+class StubLLMError(RuntimeError):
+    """Failure injected by ``StubBackend``."""
+
+
+class FixtureMissingError(LookupError):
+    """``ReplayBackend`` has no recorded reply for the prompt."""
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """
+    Latency sampler (seconds) from ``fixed:S``, ``uniform:LOW:HIGH`` or
+    ``lognormal:MEDIAN:SIGMA``; ``""`` or ``0`` means no delay.
+    """
+    kind, _, rest = (spec or "0").partition(":")
+    args = [float(part) for part in rest.split(":") if part]
+    if kind in ("0", "none"):
+        return lambda rng: 0.0
+    if kind == "fixed" and len(args) == 1:
+        return lambda rng: args[0]
+    if kind == "uniform" and len(args) == 2:
+        return lambda rng: rng.uniform(args[0], args[1])
+    if kind == "lognormal" and len(args) == 2:
+        mu = math.log(args[0])
+        return lambda rng: rng.lognormvariate(mu, args[1])
+    raise ValueError(f"Unsupported latency spec: {spec!r}")
+
+
+def _user_content(prompt: str) -> str:
+    # ai_client._build_prompt joins messages as "[ROLE] content" lines
+    marker = prompt.rfind("[USER] ")
+    return prompt[marker + len("[USER] "):] if marker != -1 else prompt
+
+
+def _stub_deals(item_name: str) -> List[Dict[str, Any]]:
+    base = 10 + int(sha256(item_name.encode()).hexdigest()[:4], 16) % 490
+    slug = "-".join(item_name.lower().split()) or "item"
+    return [
+        {"merchant": merchant, "item_name": item_name, "price": float(base + offset),
+         "url": f"https://{domain}/search?q={slug}"}
+        for merchant, domain, offset in (
+            ("Amazon.ae", "www.amazon.ae", 0), ("Noon", "www.noon.com", 5), ("Sharaf DG", "uae.sharafdg.com", 12),
+        )
+    ]
+
+
+def default_reply(prompt: str) -> str:
+    """A well-formed reply for the app's prompts, derived only from the prompt."""
+    content = _user_content(prompt)
+    if content.startswith("Find the best deals for: "):
+        return json.dumps(_stub_deals(content[len("Find the best deals for: "):]))
+    try:
+        payload = json.loads(content)
+    except json.JSONDecodeError:
+        return "{}"
+    if isinstance(payload, list):  # batched deal lookup
+        return json.dumps({name: _stub_deals(name) for name in payload if isinstance(name, str)})
+    if isinstance(payload, dict) and "planned_purchases" in payload:  # advice
+        expenses = payload.get("recent_expenses") or []
+        return json.dumps({
+            "cuts": [
+                {"expense_id": e["id"], "reason": "Largest discretionary expense", "amount_saved": round(e["amount"] / 2, 2)}
+                for e in expenses[:2]
+            ],
+            "next_purchases": [
+                {"id": p["id"], "verdict": "buy_now" if p.get("priority") == "high" else "postpone",
+                 "suggestion": "Stub verdict", "score": 80 if p.get("priority") == "high" else 40}
+                for p in payload["planned_purchases"]
+            ],
+        })
+    return "{}"
+
+
+def _chunks(text: str) -> Iterator[str]:
+    for i in range(0, len(text), STREAM_CHUNK_CHARS):
+        yield text[i:i + STREAM_CHUNK_CHARS]
+
+
+class StubBackend:
+    """Local, seeded stand-in: sampled latency, injected failures, canned or generated replies."""
+
+    name = "stub"
+
+    def __init__(self, latency: str = "0", failure_rate: float = 0.0, seed: Optional[int] = None,
+                 replies: Optional[List[Dict[str, Any]]] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._sample = parse_latency(latency)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()  # calls arrive from the ai_client thread pool
+        self._replies = [
+            (rule["match"], rule["reply"] if isinstance(rule["reply"], str) else json.dumps(rule["reply"]))
+            for rule in replies or []
+        ]
+        self.calls = 0
+        self.failures = 0
+
+    def _next(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            delay = self._sample(self._rng)
+            fail = self._rng.random() < self.failure_rate
+            if fail:
+                self.failures += 1
+        time.sleep(delay)
+        if fail:
+            raise StubLLMError("Injected stub failure")
+        for match, reply in self._replies:
+            if match in prompt:
+                return reply
+        return default_reply(prompt)
+
+    def generate(self, prompt: str, *, temperature: float = 0.7, **kwargs: Any) -> str:
+        return self._next(prompt)
+
+    def stream(self, prompt: str, *, temperature: float = 0.7, **kwargs: Any) -> Iterator[str]:
+        # The sampled latency is the time to the first chunk
+        yield from _chunks(self._next(prompt))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "latency": self.latency,
+            "failure_rate": self.failure_rate,
+            "calls": self.calls,
+            "failures": self.failures,
+        }
+
+
+def fixture_key(prompt: str, temperature: float) -> str:
+    return sha256(json.dumps({"prompt": prompt, "temperature": temperature}, sort_keys=True).encode()).hexdigest()
+
+
+class RecordingBackend:
+    """Pass calls to ``inner`` and append each reply and its latency to a JSON-lines file."""
+
+    name = "record"
+
+    def __init__(self, inner: Any, path: str):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def _save(self, prompt: str, temperature: float, reply: str, latency: float) -> None:
+        line = json.dumps({
+            "key": fixture_key(prompt, temperature),
+            "prompt": prompt,
+            "temperature": temperature,
+            "reply": reply,
+            "latency": round(latency, 4),
+        })
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self.recorded += 1
+
+    def generate(self, prompt: str, *, temperature: float = 0.7, **kwargs: Any) -> str:
+        started = time.monotonic()
+        reply = self.inner.generate(prompt, temperature=temperature, **kwargs)
+        self._save(prompt, temperature, reply, time.monotonic() - started)
+        return reply
+
+    def stream(self, prompt: str, *, temperature: float = 0.7, **kwargs: Any) -> Iterator[str]:
+        started = time.monotonic()
+        first_chunk = None
+        parts = []
+        for text in self.inner.stream(prompt, temperature=temperature, **kwargs):
+            first_chunk = first_chunk or time.monotonic()
+            parts.append(text)
+            yield text
+        # Only complete streams are worth replaying
+        self._save(prompt, temperature, "".join(parts), (first_chunk or time.monotonic()) - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "path": self.path, "recorded": self.recorded, "inner": self.inner.stats()}
+
+
+class ReplayBackend:
+    """Answer from recorded fixtures only; never touches the network."""
+
+    name = "replay"
+
+    def __init__(self, path: str, replay_latency: bool = True):
+        self.path = path
+        self.replay_latency = replay_latency
+        self._fixtures: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        fixture = json.loads(line)
+                        self._fixtures[fixture["key"]] = fixture  # latest recording wins
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, prompt: str, temperature: float) -> str:
+        fixture = self._fixtures.get(fixture_key(prompt, temperature))
+        if fixture is None:
+            self.misses += 1
+            raise FixtureMissingError(f"No recorded reply in {self.path} for this prompt")
+        self.hits += 1
+        if self.replay_latency:
+            time.sleep(fixture.get("latency", 0.0))
+        return fixture["reply"]
+
+    def generate(self, prompt: str, *, temperature: float = 0.7, **kwargs: Any) -> str:
+        return self._lookup(prompt, temperature)
+
+    def stream(self, prompt: str, *, temperature: float = 0.7, **kwargs: Any) -> Iterator[str]:
+        yield from _chunks(self._lookup(prompt, temperature))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "path": self.path,
+            "fixtures": len(self._fixtures),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def backend_from_env(mode: str, live: Any = None) -> Any:
+    """Build the ``LLM_BACKEND`` stand-in; ``live`` is the real backend that ``record`` wraps."""
+    path = os.getenv("LLM_FIXTURES_PATH", "./llm_fixtures.jsonl")
+    if mode == "stub":
+        replies_path = os.getenv("LLM_STUB_REPLIES")
+        replies = None
+        if replies_path:
+            with open(replies_path, encoding="utf-8") as f:
+                replies = json.load(f)
+        seed = os.getenv("LLM_STUB_SEED")
+        return StubBackend(
+            latency=os.getenv("LLM_STUB_LATENCY", "0"),
+            failure_rate=float(os.getenv("LLM_STUB_FAILURE_RATE", "0")),
+            seed=int(seed) if seed else None,
+            replies=replies,
+        )
+    if mode == "record":
+        return RecordingBackend(live, path)
+    if mode == "replay":
+        return ReplayBackend(path, replay_latency=os.getenv("LLM_REPLAY_LATENCY", "true").lower() in ("1", "true", "yes"))
+    raise ValueError(f"Unknown LLM_BACKEND: {mode!r} (expected gemini, openai, stub, record or replay)")
@@ -0,0 +1,51 @@
+"""Opaque keyset (cursor) pagination for expense listings.
+
+Listings are ordered by ``(expense_date DESC, id DESC)``. The cursor encodes
+the last row of a page, and the next page starts strictly after it, so deep
+pages cost the same index seek as the first one instead of an OFFSET scan.
+"""
+
+import base64
+import json
+from datetime import date
+from typing import Optional, Sequence, Tuple
+
+from sqlalchemy import Select, tuple_
+
+from models import Expense
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(expense_date: date, expense_id: int) -> str:
+    raw = json.dumps([expense_date.isoformat(), expense_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[date, int]:
+    """Inverse of ``encode_cursor``; raises ``ValueError`` for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        day, expense_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return date.fromisoformat(day), int(expense_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def paginate_expenses(query: Select, limit: int, cursor: Optional[str] = None, offset: int = 0) -> Select:
+    """Apply keyset ordering, the optional cursor bound, offset and limit."""
+    if cursor:
+        day, expense_id = decode_cursor(cursor)
+        query = query.where(tuple_(Expense.expense_date, Expense.id) < tuple_(day, expense_id))
+    query = query.order_by(Expense.expense_date.desc(), Expense.id.desc())
+    if offset:
+        query = query.offset(offset)
+    return query.limit(limit)
+
+
+def next_cursor(page: Sequence[Expense], limit: int) -> Optional[str]:
+    """Cursor for the page after ``page``, or None when it was the last one."""
+    if len(page) < limit or not page:
+        return None
+    last = page[-1]
+    return encode_cursor(last.expense_date, last.id)
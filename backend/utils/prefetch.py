@@ -0,0 +1,131 @@
+"""
+Background warming of the deal cache for newly planned purchases.
+
+``create_planned_purchase`` schedules ``deal_prefetcher.prefetch(item_name)``
+as a FastAPI background task, so the LLM call happens after the response has
+been sent and the user's first ``GET /api/deals/{id}`` is a cache hit::
+
+    background_tasks.add_task(deal_prefetcher.prefetch, purchase.item_name)
+
+Prefetches are de-duplicated by normalised cache key (an item already cached
+or already queued is skipped) and at most ``max_concurrency`` run at once;
+beyond ``max_pending`` waiting items new requests are dropped rather than
+queued without bound.
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from utils import deal_finder
+
+
+class DealPrefetcher:
+    """Bounded, de-duplicating warm-up queue for ``find_deals``."""
+
+    def __init__(self, max_concurrency: int = 2, max_pending: int = 100, enabled: bool = True,
+                 remember: int = 10000):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.enabled = enabled
+        self._remember = remember
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._scheduled: Set[tuple] = set()  # queued or running
+        self._warmed: "OrderedDict[tuple, None]" = OrderedDict()
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.deduplicated = 0
+        self.dropped = 0
+        self.failed = 0
+        self.warm_hits = 0
+        self.cold_views = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores bind to one event loop; recreate if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def prefetch(self, item_name: str) -> bool:
+        """Warm the deal cache for ``item_name``; returns False if it was skipped."""
+        if not self.enabled:
+            return False
+        key = deal_finder.deal_cache_key(item_name)
+        if key in self._scheduled or await deal_finder.peek_deals(item_name) is not None:
+            self.deduplicated += 1
+            return False
+        if self.waiting >= self.max_pending:
+            self.dropped += 1
+            return False
+
+        self._scheduled.add(key)
+        self.waiting += 1
+        acquired = False
+        try:
+            semaphore = self._get_semaphore()
+            await semaphore.acquire()
+            acquired = True
+            self.waiting -= 1
+            self.running += 1
+            try:
+                await deal_finder.find_deals(item_name)
+            finally:
+                self.running -= 1
+                semaphore.release()
+            # A failed LLM call returns the uncached fallback; nothing was warmed
+            warmed = await deal_finder.peek_deals(item_name) is not None
+        except Exception:
+            self.failed += 1
+            logging.exception("Deal prefetch failed for %r", item_name)
+            return False
+        finally:
+            if not acquired:
+                self.waiting -= 1
+            self._scheduled.discard(key)
+
+        if not warmed:
+            self.failed += 1
+            return False
+        self.completed += 1
+        self._warmed[key] = None
+        while len(self._warmed) > self._remember:
+            self._warmed.popitem(last=False)
+        return True
+
+    def record_view(self, item_name: str) -> bool:
+        """Note that deals for ``item_name`` were requested; True if a prefetch had warmed them."""
+        warm = deal_finder.deal_cache_key(item_name) in self._warmed
+        if warm:
+            self.warm_hits += 1
+        else:
+            self.cold_views += 1
+        return warm
+
+    def stats(self) -> Dict[str, Any]:
+        views = self.warm_hits + self.cold_views
+        return {
+            "enabled": self.enabled,
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "max_concurrency": self.max_concurrency,
+            "completed": self.completed,
+            "deduplicated": self.deduplicated,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "warm_hits": self.warm_hits,
+            "cold_views": self.cold_views,
+            "warm_hit_ratio": round(self.warm_hits / views, 4) if views else None,
+        }
+
+
+deal_prefetcher = DealPrefetcher(
+    max_concurrency=int(os.getenv("DEAL_PREFETCH_CONCURRENCY", "2")),
+    max_pending=int(os.getenv("DEAL_PREFETCH_MAX_PENDING", "100")),
+    enabled=os.getenv("DEAL_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes"),
+)
@@ -1,22 +1,24 @@
 from typing import List, Dict, Any
 from models import User, Expense
-from utils.calculations import calculate_budget_summary, calculate_spending_trends, calculate_savings_progress
+from utils.calculations import calculate_budget_summary, calculate_spending_trends, calculate_savings_progress, Expenses
+from utils.analytics import ExpenseAggregate
 from datetime import date, datetime, timedelta
 
-def generate_recommendations(user: User, expenses: List[Expense]) -> List[Dict[str, Any]]:
+def generate_recommendations(user: User, expenses: Expenses) -> List[Dict[str, Any]]:
     """
     Generate personalized financial recommendations based on user's spending patterns
     
     Args:
         user: User object with stipend and savings goal
-        expenses: List of user's expenses
+        expenses: List of user's expenses or an ExpenseAggregate
     
     Returns:
         List of recommendation dictionaries
     """
     recommendations = []
+    aggregate = ExpenseAggregate.of(expenses)
     
-    if not expenses:
+    if not aggregate.count:
         recommendations.append({
             "type": "welcome",
             "message": "Welcome to NYUAD Budgetly! Start tracking your expenses to get personalized recommendations.",
@@ -25,9 +27,9 @@ def generate_recommendations(user: User, expenses: List[Expense]) -> List[Dict[s
         return recommendations
     
     # Get budget summary and spending trends
-    budget_summary = calculate_budget_summary(user, expenses)
-    spending_trends = calculate_spending_trends(expenses)
-    savings_progress = calculate_savings_progress(user, expenses)
+    budget_summary = calculate_budget_summary(user, aggregate)
+    spending_trends = calculate_spending_trends(aggregate)
+    savings_progress = calculate_savings_progress(user, aggregate)
     
     # Check if over budget
     if budget_summary["remaining_budget"] < 0:
@@ -103,7 +105,7 @@ def generate_recommendations(user: User, expenses: List[Expense]) -> List[Dict[s
         })
     
     # General tips based on spending patterns
-    if len(expenses) < 5:
+    if aggregate.count < 5:
         recommendations.append({
             "type": "tracking",
             "message": "Start tracking all your expenses, even small ones. It helps identify spending patterns.",
@@ -111,7 +113,7 @@ def generate_recommendations(user: User, expenses: List[Expense]) -> List[Dict[s
         })
     
     # Check for large individual expenses
-    largest_expense = max(expense.amount for expense in expenses)
+    largest_expense = aggregate.largest
     if largest_expense > user.stipend * 0.1:  # More than 10% of stipend
         recommendations.append({
             "type": "large_expense",
@@ -128,26 +130,27 @@ def generate_recommendations(user: User, expenses: List[Expense]) -> List[Dict[s
     
     return recommendations[:5]  # Limit to top 5 recommendations
 
-def get_spending_insights(user: User, expenses: List[Expense]) -> Dict[str, Any]:
+def get_spending_insights(user: User, expenses: Expenses) -> Dict[str, Any]:
     """
     Get detailed spending insights and analysis
     
     Args:
         user: User object
-        expenses: List of user's expenses
+        expenses: List of user's expenses or an ExpenseAggregate
     
     Returns:
         Dictionary with spending insights
     """
-    if not expenses:
+    aggregate = ExpenseAggregate.of(expenses)
+    if not aggregate.count:
         return {
             "insights": ["No expenses recorded yet. Start tracking to get insights!"],
             "patterns": {},
             "suggestions": ["Begin by recording your first expense"]
         }
     
-    budget_summary = calculate_budget_summary(user, expenses)
-    spending_trends = calculate_spending_trends(expenses)
+    budget_summary = calculate_budget_summary(user, aggregate)
+    spending_trends = calculate_spending_trends(aggregate)
     
     insights = []
     patterns = {}
@@ -169,12 +172,9 @@ def get_spending_insights(user: User, expenses: List[Expense]) -> Dict[str, Any]
             insights.append("Your daily spending varies significantly. Consider setting daily spending limits.")
     
     # Check for weekend vs weekday spending
-    weekend_expenses = [e for e in expenses if e.expense_date.weekday() >= 5]
-    weekday_expenses = [e for e in expenses if e.expense_date.weekday() < 5]
-    
-    if weekend_expenses and weekday_expenses:
-        weekend_total = sum(e.amount for e in weekend_expenses)
-        weekday_total = sum(e.amount for e in weekday_expenses)
+    if aggregate.weekend_count and aggregate.weekday_count:
+        weekend_total = aggregate.weekend_total
+        weekday_total = aggregate.weekday_total
         
         if weekend_total > weekday_total * 1.5:
             insights.append("You spend more on weekends. Consider planning weekend activities with budgets in mind.")
@@ -193,7 +193,7 @@ def get_spending_insights(user: User, expenses: List[Expense]) -> Dict[str, Any]
         "patterns": {
             "most_expensive_category": max(expenses_by_category.items(), key=lambda x: x[1])[0] if expenses_by_category else None,
             "average_daily_spending": spending_trends["average_daily_spending"],
-            "total_expenses": len(expenses)
+            "total_expenses": aggregate.count
         },
         "suggestions": suggestions
     }
@@ -0,0 +1,206 @@
+"""Incrementally maintained per-user (day, category) expense rollups.
+
+Expense writes update ``expense_rollups`` in the same transaction, so the
+analytics endpoints can read O(days x categories) rows instead of every
+expense. Rollups can always be recomputed from the raw ``expenses`` table::
+
+    python -m utils.rollups verify [--user-id N]
+    python -m utils.rollups rebuild [--user-id N]
+"""
+
+import argparse
+import asyncio
+import sys
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import AsyncSessionLocal, Expense, ExpenseRollup, engine
+from utils.aggregations import expense_bucket_query
+from utils.analytics import ExpenseAggregate
+
+# (user_id, day, category)
+BucketKey = Tuple[int, date, str]
+# (count, total, smallest, largest)
+BucketValue = Tuple[int, float, float, float]
+
+# Incremental float sums drift slightly from a fresh SUM(); ignore noise below this.
+TOLERANCE = 1e-6
+
+
+def _upsert(db: AsyncSession):
+    """Dialect-specific INSERT that supports ON CONFLICT DO UPDATE."""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(ExpenseRollup)
+
+
+def _rows(buckets: Dict[BucketKey, BucketValue]) -> List[dict]:
+    return [
+        {
+            "user_id": user_id,
+            "day": day,
+            "category": category,
+            "expense_count": count,
+            "total_amount": total,
+            "min_amount": smallest,
+            "max_amount": largest,
+        }
+        for (user_id, day, category), (count, total, smallest, largest) in buckets.items()
+    ]
+
+
+async def increment_rollups(db: AsyncSession, buckets: Dict[BucketKey, BucketValue]) -> None:
+    """Add pre-aggregated buckets of newly inserted expenses to the rollups."""
+    if not buckets:
+        return
+    stmt = _upsert(db).values(_rows(buckets))
+    new = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ExpenseRollup.user_id, ExpenseRollup.day, ExpenseRollup.category],
+        set_={
+            "expense_count": ExpenseRollup.expense_count + new.expense_count,
+            "total_amount": ExpenseRollup.total_amount + new.total_amount,
+            "min_amount": case((new.min_amount < ExpenseRollup.min_amount, new.min_amount), else_=ExpenseRollup.min_amount),
+            "max_amount": case((new.max_amount > ExpenseRollup.max_amount, new.max_amount), else_=ExpenseRollup.max_amount),
+        },
+    )
+    await db.execute(stmt)
+
+
+async def record_expense_added(db: AsyncSession, expense: Expense) -> None:
+    """Fold a single new expense into its rollup bucket."""
+    key = (expense.user_id, expense.expense_date, expense.category)
+    await increment_rollups(db, {key: (1, expense.amount, expense.amount, expense.amount)})
+
+
+async def refresh_rollup_buckets(db: AsyncSession, keys: Iterable[BucketKey]) -> None:
+    """
+    Recompute the given buckets from the raw expenses table.
+
+    Used after updates and deletes, where min/max cannot be maintained by
+    arithmetic alone. Pending ORM changes must be flushed first.
+    """
+    for user_id, day, category in set(keys):
+        count, total, smallest, largest = (await db.execute(
+            select(func.count(Expense.id), func.sum(Expense.amount), func.min(Expense.amount), func.max(Expense.amount))
+            .where(Expense.user_id == user_id, Expense.expense_date == day, Expense.category == category)
+        )).one()
+        if not count:
+            await db.execute(delete(ExpenseRollup).where(
+                ExpenseRollup.user_id == user_id, ExpenseRollup.day == day, ExpenseRollup.category == category
+            ))
+            continue
+        stmt = _upsert(db).values(_rows({(user_id, day, category): (count, total, smallest, largest)}))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ExpenseRollup.user_id, ExpenseRollup.day, ExpenseRollup.category],
+            set_={
+                "expense_count": stmt.excluded.expense_count,
+                "total_amount": stmt.excluded.total_amount,
+                "min_amount": stmt.excluded.min_amount,
+                "max_amount": stmt.excluded.max_amount,
+            },
+        )
+        await db.execute(stmt)
+
+
+def _load_expense_aggregate_sync(user_id: int) -> ExpenseAggregate:
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(
+                ExpenseRollup.day,
+                ExpenseRollup.category,
+                ExpenseRollup.expense_count,
+                ExpenseRollup.total_amount,
+                ExpenseRollup.min_amount,
+                ExpenseRollup.max_amount,
+            )
+            .where(ExpenseRollup.user_id == user_id)
+            .order_by(ExpenseRollup.day, ExpenseRollup.category)
+        )
+        aggregate = ExpenseAggregate()
+        for day, category, count, total, smallest, largest in rows:
+            aggregate.add_bucket(day, category, count, total, smallest, largest)
+    return aggregate
+
+
+async def load_expense_aggregate(user_id: int) -> ExpenseAggregate:
+    """Build the analytics aggregate for a user from rollup rows.
+
+    Decoding and folding the rows is CPU-bound (thousands of buckets for a
+    long history), so it runs on a worker thread over the sync engine rather
+    than on the event loop.
+    """
+    return await asyncio.to_thread(_load_expense_aggregate_sync, user_id)
+
+
+async def rebuild_rollups(db: AsyncSession, user_id: Optional[int] = None) -> None:
+    """Discard and recompute rollups (for one user or everyone) from raw expenses."""
+    clear = delete(ExpenseRollup)
+    if user_id is not None:
+        clear = clear.where(ExpenseRollup.user_id == user_id)
+    await db.execute(clear)
+    await db.execute(
+        _upsert(db).from_select(
+            ["user_id", "day", "category", "expense_count", "total_amount", "min_amount", "max_amount"],
+            expense_bucket_query(user_id),
+        )
+    )
+
+
+async def verify_rollups(db: AsyncSession, user_id: Optional[int] = None) -> List[dict]:
+    """Return the buckets where rollups disagree with the raw expenses table."""
+    expected = {
+        (uid, day, category): (count, total, smallest, largest)
+        for uid, day, category, count, total, smallest, largest in await db.execute(expense_bucket_query(user_id))
+    }
+    query = select(
+        ExpenseRollup.user_id,
+        ExpenseRollup.day,
+        ExpenseRollup.category,
+        ExpenseRollup.expense_count,
+        ExpenseRollup.total_amount,
+        ExpenseRollup.min_amount,
+        ExpenseRollup.max_amount,
+    )
+    if user_id is not None:
+        query = query.where(ExpenseRollup.user_id == user_id)
+    actual = {(uid, day, category): tuple(values) for uid, day, category, *values in await db.execute(query)}
+
+    mismatches = []
+    for key in expected.keys() | actual.keys():
+        want, got = expected.get(key), actual.get(key)
+        if want is None or got is None or want[0] != got[0] or any(
+            abs(a - b) > TOLERANCE for a, b in zip(want[1:], got[1:])
+        ):
+            mismatches.append({
+                "user_id": key[0],
+                "day": key[1],
+                "category": key[2],
+                "expected": want,
+                "actual": got,
+            })
+    return mismatches
+
+
+async def _main(args) -> int:
+    async with AsyncSessionLocal() as db:
+        if args.command == "rebuild":
+            await rebuild_rollups(db, args.user_id)
+            await db.commit()
+        mismatches = await verify_rollups(db, args.user_id)
+    for mismatch in mismatches[:20]:
+        print(f"mismatch: {mismatch}")
+    print(f"{args.command}: {len(mismatches)} mismatched bucket(s)")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify or rebuild expense rollups from the expenses table")
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--user-id", type=int, default=None, help="limit to a single user")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
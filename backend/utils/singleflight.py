@@ -0,0 +1,75 @@
+"""
+Single-flight coalescing of concurrent identical async calls.
+
+When several requests miss the cache for the same key at once, only the first
+one calls the LLM; the others await that call and share its result::
+
+    _FLIGHTS = create_single_flight("advice")
+    advice = await _FLIGHTS.do(cache_key, lambda: _request_advice(payload))
+
+The shared call runs as its own task, so a caller that disconnects (and is
+cancelled) does not cancel the work the other callers are waiting on.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Deduplicates in-flight calls by key and counts how many were coalesced."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await ``fn()``, or the already running call for ``key`` if there is one."""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: "asyncio.Future[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieve the exception so it is not reported as unhandled when
+        # every waiter was cancelled before the call finished
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inflight": self.inflight,
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+        }
+
+
+_REGISTRY: Dict[str, SingleFlight] = {}
+
+
+def create_single_flight(name: str) -> SingleFlight:
+    """Create a coalescer and register it under ``name`` for the stats view."""
+    flight = SingleFlight(name)
+    _REGISTRY[name] = flight
+    return flight
+
+
+def single_flight_stats() -> Dict[str, Dict[str, Any]]:
+    """Stats for every registered coalescer, keyed by name."""
+    return {name: flight.stats() for name, flight in sorted(_REGISTRY.items())}
@@ -0,0 +1,26 @@
+"""
+Server-Sent Events encoding.
+
+Streaming endpoints turn ``(event, data)`` pairs into an SSE body::
+
+    return StreamingResponse(encode_events(stream_advice(...)),
+                             media_type=SSE_MEDIA_TYPE, headers=SSE_HEADERS)
+"""
+
+import json
+from typing import Any, AsyncIterator, Tuple
+
+SSE_MEDIA_TYPE = "text/event-stream"
+
+# Stop proxies (nginx) and browsers from buffering or caching the stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def sse_event(event: str, data: Any) -> str:
+    """One SSE frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def encode_events(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[str]:
+    async for event, data in events:
+        yield sse_event(event, data)
@@ -0,0 +1,234 @@
+"""Streaming parsers for bank statement exports (CSV and OFX).
+
+Both parsers read the upload incrementally and yield one
+``(row_number, ExpenseCreate | error message)`` pair per transaction, so an
+import of any size runs in constant memory when fed to ``ExpenseIngestor``.
+
+Bank exports record money leaving the account as negative amounts; those
+rows become expenses (with the sign dropped) and incoming payments are
+skipped. Pass ``negative_is_expense=False`` for exports that list spending
+as positive numbers.
+"""
+
+import codecs
+import csv
+import re
+from datetime import date, datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+
+from schemas import ExpenseCreate
+from utils.ingest import format_validation_error
+
+READ_SIZE = 64 * 1024
+DEFAULT_CATEGORY = "other"
+
+# Tried in order when no explicit date format is given (day-first, as used in the UAE)
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y", "%d %b %Y", "%Y%m%d"]
+
+# Header names recognised when no column mapping is supplied
+COLUMN_ALIASES = {
+    "date": ["date", "transaction date", "posted date", "posting date", "booking date", "value date"],
+    "amount": ["amount", "transaction amount", "debit", "withdrawal", "value"],
+    "description": ["description", "memo", "payee", "narrative", "details", "name"],
+    "category": ["category", "type"],
+}
+
+ParsedRow = Tuple[int, Union[ExpenseCreate, str]]
+
+
+class SkippedRow(Exception):
+    """Raised for rows that are valid but not expenses (e.g. incoming payments)."""
+
+
+def parse_amount(raw: str) -> float:
+    """Parse ``-1,234.50``, ``(12.00)`` or ``AED 15`` into a float."""
+    text = raw.strip()
+    negative = text.startswith("(") and text.endswith(")")
+    cleaned = re.sub(r"[^\d.\-]", "", text)
+    if not cleaned or cleaned in {"-", "."}:
+        raise ValueError(f"invalid amount {raw!r}")
+    value = float(cleaned)
+    return -abs(value) if negative else value
+
+
+def parse_date(raw: str, date_format: Optional[str] = None) -> date:
+    text = raw.strip()
+    if not date_format:
+        # Fast path for ISO dates, which most exports use; strptime is ~10x slower
+        try:
+            return date.fromisoformat(text)
+        except ValueError:
+            pass
+    for fmt in [date_format] if date_format else DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date {raw!r}")
+
+
+def _expense_amount(amount: float, negative_is_expense: bool) -> float:
+    if negative_is_expense:
+        if amount >= 0:
+            raise SkippedRow()
+        return -amount
+    if amount <= 0:
+        raise SkippedRow()
+    return amount
+
+
+def _count_skipped(stats: Optional[Dict[str, int]]) -> None:
+    if stats is not None:
+        stats["skipped"] = stats.get("skipped", 0) + 1
+
+
+def _build(row_number: int, fields: Dict, user_id: int) -> ParsedRow:
+    try:
+        return row_number, ExpenseCreate.model_validate({"user_id": user_id, **fields})
+    except ValidationError as error:
+        return row_number, format_validation_error(error)
+
+
+def _text_lines(stream: BinaryIO, encoding: str) -> Iterator[str]:
+    """Decode ``stream`` incrementally and yield lines (keeping line endings for csv)."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    pending = ""
+    while True:
+        block = stream.read(READ_SIZE)
+        text = decoder.decode(block or b"", final=not block)
+        if text:
+            lines = (pending + text).splitlines(keepends=True)
+            pending = lines.pop() if not lines[-1].endswith(("\n", "\r")) else ""
+            yield from lines
+        if not block:
+            break
+    if pending:
+        yield pending
+
+
+def resolve_columns(header: List[str], mapping: Dict[str, Optional[str]]) -> Dict[str, Optional[int]]:
+    """Map expense fields onto header positions using explicit names or known aliases."""
+    normalised = [name.strip().lower() for name in header]
+    positions: Dict[str, Optional[int]] = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        wanted = mapping.get(field)
+        candidates = [wanted.strip().lower()] if wanted else aliases
+        positions[field] = next((normalised.index(c) for c in candidates if c in normalised), None)
+        if wanted and positions[field] is None:
+            raise ValueError(f"column {wanted!r} not found in header")
+    for required in ("date", "amount"):
+        if positions[required] is None:
+            raise ValueError(f"could not find a {required} column; pass {required}_column")
+    return positions
+
+
+def iter_csv_expenses(
+    stream: BinaryIO,
+    user_id: int,
+    *,
+    mapping: Optional[Dict[str, Optional[str]]] = None,
+    date_format: Optional[str] = None,
+    default_category: str = DEFAULT_CATEGORY,
+    negative_is_expense: bool = True,
+    encoding: str = "utf-8-sig",
+    stats: Optional[Dict[str, int]] = None,
+) -> Iterator[ParsedRow]:
+    """Yield parsed expenses from a CSV export, one row at a time."""
+    reader = csv.reader(_text_lines(stream, encoding))
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = resolve_columns(header, mapping or {})
+
+    def cell(row, field):
+        position = columns[field]
+        return row[position].strip() if position is not None and position < len(row) else ""
+
+    for row_number, row in enumerate(reader, start=2):
+        if not any(value.strip() for value in row):
+            continue
+        try:
+            amount = _expense_amount(parse_amount(cell(row, "amount")), negative_is_expense)
+            expense_date = parse_date(cell(row, "date"), date_format)
+        except SkippedRow:
+            _count_skipped(stats)
+            continue
+        except ValueError as error:
+            yield row_number, str(error)
+            continue
+        yield _build(row_number, {
+            "amount": amount,
+            "category": (cell(row, "category") or default_category)[:50],
+            "description": cell(row, "description")[:500] or None,
+            "date": expense_date,
+        }, user_id)
+
+
+def _ofx_tokens(stream: BinaryIO, encoding: str) -> Iterator[Tuple[str, str]]:
+    """Yield ``(TAG, text)`` pairs from SGML (OFX 1.x) or XML (OFX 2.x) markup."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    buffer = ""
+    while True:
+        block = stream.read(READ_SIZE)
+        buffer += decoder.decode(block or b"", final=not block)
+        parts = buffer.split("<")
+        # The last part may be an incomplete tag; keep it for the next block
+        buffer = parts.pop() if block else ""
+        for part in parts + ([buffer] if not block and buffer else []):
+            tag, _, text = part.partition(">")
+            if tag:
+                yield tag.strip().upper(), text.strip()
+        if not block:
+            break
+
+
+def iter_ofx_expenses(
+    stream: BinaryIO,
+    user_id: int,
+    *,
+    default_category: str = DEFAULT_CATEGORY,
+    negative_is_expense: bool = True,
+    encoding: str = "latin-1",
+    stats: Optional[Dict[str, int]] = None,
+) -> Iterator[ParsedRow]:
+    """Yield parsed expenses from the STMTTRN blocks of an OFX export."""
+    transaction: Optional[Dict[str, str]] = None
+    number = 0
+    for tag, text in _ofx_tokens(stream, encoding):
+        if tag == "STMTTRN":
+            transaction = {}
+        elif tag == "/STMTTRN" and transaction is not None:
+            number += 1
+            try:
+                amount = _expense_amount(parse_amount(transaction.get("TRNAMT", "")), negative_is_expense)
+                expense_date = parse_date(transaction.get("DTPOSTED", "")[:8], "%Y%m%d")
+            except SkippedRow:
+                _count_skipped(stats)
+                transaction = None
+                continue
+            except ValueError as error:
+                yield number, str(error)
+                transaction = None
+                continue
+            description = " - ".join(v for v in (transaction.get("NAME"), transaction.get("MEMO")) if v)
+            yield _build(number, {
+                "amount": amount,
+                "category": default_category,
+                "description": description[:500] or None,
+                "date": expense_date,
+            }, user_id)
+            transaction = None
+        elif transaction is not None and not tag.startswith("/"):
+            transaction[tag] = text
+
+
+def detect_format(filename: Optional[str], head: bytes) -> str:
+    """Guess ``csv`` or ``ofx`` from the file name, then the first bytes."""
+    name = (filename or "").lower()
+    if name.endswith((".ofx", ".qfx")):
+        return "ofx"
+    if name.endswith(".csv"):
+        return "csv"
+    return "ofx" if b"OFXHEADER" in head.upper() or b"<OFX>" in head.upper() else "csv"
@@ -69,9 +69,25 @@ export const plannedPurchaseAPI = {
   delete: (purchaseId) => api.delete(`/planned-purchases/${purchaseId}`),
 }
 
-// Advice API
+// Stop waiting for an advice job after this long
+const ADVICE_MAX_WAIT_MS = 3 * 60 * 1000
+
+// Advice API: queue a job, then long-poll until it finishes (or we give up)
 export const adviceAPI = {
-  getAdvice: (userId) => api.get(`/advice/${userId}`),
+  getAdvice: async (userId) => {
+    const deadline = Date.now() + ADVICE_MAX_WAIT_MS
+    let { data: job } = await api.post(`/advice/${userId}/jobs`)
+    while (job.status === 'queued' || job.status === 'running') {
+      if (Date.now() >= deadline) {
+        throw new Error('Advice is taking too long, please try again later')
+      }
+      ;({ data: job } = await api.get(`/advice/jobs/${job.id}`, { params: { wait: 20 } }))
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Advice job failed')
+    }
+    return { data: job.result }
+  },
 }
 
 export const dealsAPI = {